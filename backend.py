@@ -0,0 +1,294 @@
+import hashlib
+import marshal
+import os
+import sys
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import intermediate
+from intermediate import BINARY_OPERATORS, LoweredProgram
+from storage import atomic_write, source_version
+
+FORMAT_TAG = b"TPY1"
+FUNCTION_NAME = "programa"
+
+
+# The generated source follows the lowering and this translator, and a code
+# object only loads on the interpreter that marshalled it.
+BACKEND_VERSION = source_version(intermediate, sys.modules[__name__])
+
+
+class _Unstructured(Exception):
+    pass
+
+
+class PythonTranslator:
+    # Writes a lowered program as the source of one Python function. Registers
+    # become locals r<n>, variables v<n> with a written flag b<n>, so every
+    # operand is a local read. Loops and conditionals the TAC generator emits
+    # become while/if statements; anything else (a stray goto, a label reached
+    # from two places) makes the whole program a block-numbered state machine.
+    def __init__(self, program: LoweredProgram) -> None:
+        self.program = program
+        self.code = program.code
+        self.labels: Dict[int, List[int]] = {}
+        for idx, inst in enumerate(self.code):
+            if inst[0] in {"goto", "if_false"}:
+                self.labels.setdefault(inst[4], []).append(idx)
+        # A jump to a missing label lands on the next instruction instead.
+        self.structured = all(t < len(self.code) and self.code[t][0] == "label" for t in self.labels)
+
+    def translate(self) -> str:
+        try:
+            if not self.structured:
+                raise _Unstructured()
+            body = self._structure(0, len(self.code), 1)
+        except (_Unstructured, RecursionError):
+            body = self._state_machine()
+        return self._function(body)
+
+    def _function(self, body: List[str]) -> str:
+        registers = len(self.program.registers)
+        variables = len(self.program.variable_names)
+        lines = [f"def {FUNCTION_NAME}(R, D, N, read_input, emit, write, errors):"]
+        if registers:
+            lines.append("    " + "".join(f"r{i}, " for i in range(registers)) + "= R")
+        if variables:
+            lines.append("    " + "".join(f"v{i}, " for i in range(variables)) + "= D")
+            lines.append("    " + "".join(f"b{i} = " for i in range(variables)) + "0")
+        lines.extend(body)
+        values = "".join(f"v{i}, " for i in range(variables))
+        flags = "".join(f"b{i}, " for i in range(variables))
+        lines.append(f"    return ({values}), ({flags})")
+        return "\n".join(lines) + "\n"
+
+    def _operand(self, operand: int) -> str:
+        return f"r{operand}" if operand >= 0 else f"v{~operand}"
+
+    def _statement(self, inst: Tuple[str, int, int, int, Any], pad: str) -> List[str]:
+        op, arg1, arg2, result, _ = inst
+        if op == "label":
+            return []
+        if op == "declare":
+            return [f"{pad}if not b{~result}:", f"{pad}    v{~result} = None", f"{pad}    b{~result} = 1"]
+        if op == "print":
+            return [f"{pad}emit({self._operand(arg1)})"]
+        if op == "print_nl":
+            return [f"{pad}write('\\n')"]
+        target = self._operand(result)
+        lines = []
+        if op == "input":
+            lines.append(f"{pad}{target} = read_input(N[{~result}])")
+        elif op == "=":
+            lines.append(f"{pad}{target} = {self._operand(arg1)}")
+        elif op == "!":
+            lines.append(f"{pad}{target} = not bool({self._operand(arg1)})")
+        elif op not in BINARY_OPERATORS:
+            lines.append(f"{pad}{target} = None")
+        else:
+            a, b = self._operand(arg1), self._operand(arg2)
+            if op == "&&":
+                expression = f"bool({a}) and bool({b})"
+            elif op == "||":
+                expression = f"bool({a}) or bool({b})"
+            else:
+                expression = f"{a} {'**' if op == '^' else op} {b}"
+            lines += [
+                f"{pad}try:",
+                f"{pad}    {target} = {expression}",
+                f"{pad}except Exception as exc:",
+                f"{pad}    errors.append(str(exc))",
+                f"{pad}    {target} = None",
+            ]
+        if result < 0:
+            lines.append(f"{pad}b{~result} = 1")
+        return lines
+
+    def _structure(self, lo: int, hi: int, depth: int) -> List[str]:
+        # Translates code[lo:hi], which no jump may enter or leave except the
+        # ones the recognised shapes consume.
+        pad = "    " * depth
+        code = self.code
+        lines: List[str] = []
+        idx = lo
+        while idx < hi:
+            op, arg1 = code[idx][0], code[idx][1]
+            if op == "goto":
+                raise _Unstructured()
+            if op == "label" and idx in self.labels:
+                refs = self.labels[idx]
+                end = refs[0]
+                if len(refs) != 1 or not idx < end < hi:
+                    raise _Unstructured()
+                if code[end][0] == "if_false":
+                    # do ... until: the body, then loop while the condition is false.
+                    lines.append(f"{pad}while True:")
+                    lines += self._structure(idx + 1, end, depth + 1)
+                    lines.append(f"{pad}    if {self._operand(code[end][1])}:")
+                    lines.append(f"{pad}        break")
+                    idx = end + 1
+                    continue
+                # while: condition code, the exit test, the body, the back edge.
+                test = next((k for k in range(idx + 1, end) if code[k][0] == "if_false" and code[k][4] == end + 1), None)
+                if test is None or end + 1 >= hi or self.labels.get(end + 1) != [test]:
+                    raise _Unstructured()
+                lines.append(f"{pad}while True:")
+                lines += self._structure(idx + 1, test, depth + 1)
+                lines.append(f"{pad}    if not {self._operand(code[test][1])}:")
+                lines.append(f"{pad}        break")
+                lines += self._structure(test + 1, end, depth + 1)
+                idx = end + 2
+                continue
+            if op == "if_false":
+                other = code[idx][4]
+                if not idx < other < hi or self.labels.get(other) != [idx]:
+                    raise _Unstructured()
+                lines.append(f"{pad}if {self._operand(arg1)}:")
+                jump = code[other - 1]
+                if jump[0] == "goto" and other < jump[4] < hi and self.labels.get(jump[4]) == [other - 1]:
+                    lines += self._structure(idx + 1, other - 1, depth + 1) or [f"{pad}    pass"]
+                    lines.append(f"{pad}else:")
+                    lines += self._structure(other + 1, jump[4], depth + 1) or [f"{pad}    pass"]
+                    idx = jump[4] + 1
+                else:
+                    lines += self._structure(idx + 1, other, depth + 1) or [f"{pad}    pass"]
+                    idx = other + 1
+                continue
+            lines += self._statement(code[idx], pad)
+            idx += 1
+        return lines
+
+    def _state_machine(self) -> List[str]:
+        code = self.code
+        n = len(code)
+        leaders = {0}
+        for idx, inst in enumerate(code):
+            if inst[0] in {"goto", "if_false"}:
+                leaders.update((inst[4], idx + 1))
+            elif inst[0] == "label":
+                leaders.add(idx)
+        starts = sorted(leader for leader in leaders if leader < n)
+        lines = ["    pc = 0", f"    while pc != {n}:"]
+        for position, start in enumerate(starts):
+            stop = starts[position + 1] if position + 1 < len(starts) else n
+            lines.append(f"        {'if' if position == 0 else 'elif'} pc == {start}:")
+            body: List[str] = []
+            last = code[stop - 1]
+            for inst in code[start:stop - 1]:
+                body += self._statement(inst, " " * 12)
+            if last[0] == "goto":
+                body.append(f"            pc = {last[4]}")
+            elif last[0] == "if_false":
+                body.append(f"            pc = {stop} if {self._operand(last[1])} else {last[4]}")
+            else:
+                body += self._statement(last, " " * 12)
+                body.append(f"            pc = {stop}")
+            lines += body
+        if not starts:
+            lines = []
+        return lines
+
+
+def translate(program: LoweredProgram) -> str:
+    return PythonTranslator(program).translate()
+
+
+def program_key(program: LoweredProgram) -> str:
+    # The source depends only on the code and the frame sizes; register and
+    # variable values are passed in when the function is called.
+    shape = (program.code, len(program.registers), len(program.variable_names))
+    return hashlib.sha256(BACKEND_VERSION.encode() + b"\0" + repr(shape).encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class CodeObjectCache:
+    # Compiled programs by key: functions in memory, marshalled code objects in
+    # `directory` when one is given, written the same atomic way as CompileCache.
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = None if directory is None else os.fspath(directory)
+        self.functions: Dict[str, Callable[..., Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".code")
+
+    def _load(self, key: str) -> Optional[CodeType]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            if not data.startswith(FORMAT_TAG):
+                return None
+            code = marshal.loads(data[len(FORMAT_TAG):])
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        return code if isinstance(code, CodeType) else None
+
+    def _store(self, key: str, code: CodeType) -> None:
+        if self.directory is None:
+            return
+        try:
+            atomic_write(self._path(key), FORMAT_TAG + marshal.dumps(code))
+        except OSError:
+            pass
+
+    def function(self, program: LoweredProgram) -> Callable[..., Any]:
+        key = program_key(program)
+        function = self.functions.get(key)
+        if function is not None:
+            self.hits += 1
+            return function
+        code = self._load(key)
+        if code is None:
+            self.misses += 1
+            code = compile_program(program)
+            self._store(key, code)
+        else:
+            self.hits += 1
+        namespace: Dict[str, Any] = {}
+        exec(code, namespace)
+        function = self.functions[key] = namespace[FUNCTION_NAME]
+        return function
+
+
+def compile_program(program: LoweredProgram) -> CodeType:
+    translator = PythonTranslator(program)
+    source = translator.translate()
+    try:
+        return compile(source, "<programa>", "exec")
+    except (SyntaxError, RecursionError, MemoryError):
+        # Too many nested loops or ifs for CPython's compiler; the state
+        # machine has a fixed nesting depth.
+        return compile(translator._function(translator._state_machine()), "<programa>", "exec")
+
+
+_caches: Dict[Optional[str], CodeObjectCache] = {}
+
+
+def cache_for(directory: Optional[str] = None) -> CodeObjectCache:
+    cache = _caches.get(directory)
+    if cache is None:
+        cache = _caches[directory] = CodeObjectCache(directory)
+    return cache
+
+
+def run_compiled(executor, cache_dir: Optional[str] = None) -> None:
+    # Runs the executor's program as Python and leaves the variables in its
+    # frame, so ExecutionResult is built exactly as for the other modes.
+    program = executor.program
+    function = cache_for(cache_dir).function(program)
+    values, written = function(
+        tuple(program.registers),
+        tuple(program.variable_defaults),
+        tuple(program.variable_names),
+        executor._read_input,
+        executor._print,
+        executor._write,
+        executor.errors,
+    )
+    for var, value in enumerate(values):
+        if written[var]:
+            executor.store(var, value)
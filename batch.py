@@ -0,0 +1,175 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from cache import Compilation, CompileCache
+from intermediate import TACInstruction, analizar_y_generar
+from lexical import LazyTokenStream, analizar_flujo, iter_tokens
+from semantic import analizar_semantica
+from syntactic import analizar_sintacticamente
+
+STAGES = ("lexical", "syntactic", "semantic", "intermediate")
+DEFAULT_CHUNKSIZE = 64
+
+
+@dataclass
+class CompileResult:
+    # Only counts, diagnostics and the generated code cross the process
+    # boundary; tokens and trees stay in the worker.
+    path: str
+    stages: tuple
+    token_count: int = 0
+    lexical_errors: List[Dict[str, Any]] = field(default_factory=list)
+    syntactic_errors: List[str] = field(default_factory=list)
+    has_ast: bool = False
+    semantic_errors: List[str] = field(default_factory=list)
+    symbol_count: int = 0
+    instructions: Optional[List[TACInstruction]] = None
+    failure: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.failure is None and not (self.lexical_errors or self.syntactic_errors or self.semantic_errors)
+
+
+def _normalize_stages(stages: Iterable[str]) -> tuple:
+    requested = set(stages)
+    unknown = requested.difference(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}. Options: {', '.join(STAGES)}")
+    if not requested:
+        raise ValueError("At least one stage is required")
+    # Each stage needs the previous ones, so run everything up to the deepest requested.
+    depth = max(STAGES.index(stage) for stage in requested)
+    return STAGES[: depth + 1]
+
+
+def _run_semantic(result: CompileResult, ast) -> CompileResult:
+    if "semantic" not in result.stages or result.lexical_errors or ast is None:
+        return result
+    if "intermediate" in result.stages:
+        # One fused walk; nobody reads the annotated tree, so it is never rendered.
+        fused = analizar_y_generar(ast)
+        result.semantic_errors = fused.errors
+        result.symbol_count = len(fused.entries)
+        if not result.syntactic_errors:
+            result.instructions = fused.instructions
+        return result
+    semantic_result = analizar_semantica(ast)
+    result.semantic_errors = semantic_result.errors
+    result.symbol_count = len(semantic_result.entries)
+    return result
+
+
+def compile_source(source: str, path: str = "<source>", stages: Sequence[str] = STAGES) -> CompileResult:
+    stages = _normalize_stages(stages)
+    result = CompileResult(path=path, stages=stages)
+    tokens, lexical_errors = analizar_flujo(source)
+    result.token_count = len(tokens)
+    result.lexical_errors = lexical_errors
+    if "syntactic" not in stages:
+        return result
+
+    ast, syntactic_errors = analizar_sintacticamente(tokens.filtrar(("COMENTARIO", "ERROR")))
+    result.syntactic_errors = syntactic_errors
+    result.has_ast = ast is not None
+    return _run_semantic(result, ast)
+
+
+def _from_compilation(path: str, stages: tuple, compilation: Compilation) -> CompileResult:
+    result = CompileResult(path=path, stages=stages, token_count=len(compilation.tokens))
+    result.lexical_errors = compilation.lexical_errors
+    if "syntactic" in stages:
+        result.syntactic_errors = compilation.syntactic_errors
+        result.has_ast = compilation.ast is not None
+    if "semantic" in stages and compilation.semantic is not None:
+        result.semantic_errors = compilation.semantic.errors
+        result.symbol_count = len(compilation.semantic.entries)
+    if "intermediate" in stages:
+        result.instructions = compilation.tac
+    return result
+
+
+_caches: Dict[str, CompileCache] = {}
+
+
+def _cache_for(cache_dir: str) -> CompileCache:
+    # One instance per directory and process, so pool workers reuse their index.
+    cache = _caches.get(cache_dir)
+    if cache is None:
+        cache = _caches[cache_dir] = CompileCache(cache_dir)
+    return cache
+
+
+def compile_file(path: str, stages: Sequence[str] = STAGES, cache_dir: Optional[str] = None) -> CompileResult:
+    stages = _normalize_stages(stages)
+    try:
+        return _compile_file(path, stages, cache_dir)
+    except (OSError, UnicodeDecodeError) as exc:
+        return CompileResult(path=path, stages=stages, failure=str(exc))
+    except Exception as exc:
+        # A crash in any stage fails this file only, never the whole batch.
+        return CompileResult(path=path, stages=stages, failure=f"{type(exc).__name__}: {exc}")
+
+
+def _compile_file(path: str, stages: tuple, cache_dir: Optional[str]) -> CompileResult:
+    with open(path, "r", encoding="utf-8") as f:
+        if cache_dir is not None:
+            # A cached entry always holds the whole pipeline; a miss runs it all.
+            source = f.read()
+            return _from_compilation(path, stages, _cache_for(cache_dir).compile(source))
+        if "syntactic" not in stages:
+            return compile_source(f.read(), path, stages)
+        # The parser pulls tokens straight from the chunked lexer, so the file
+        # is never held as text or as a token list.
+        tokens = LazyTokenStream(iter_tokens(f))
+        ast, syntactic_errors = analizar_sintacticamente(tokens)
+        # Drain the rest so the token count and lexical errors cover the whole file.
+        for _ in tokens:
+            pass
+    result = CompileResult(
+        path=path,
+        stages=stages,
+        token_count=tokens.leidos,
+        lexical_errors=tokens.errores,
+        syntactic_errors=syntactic_errors,
+        has_ast=ast is not None,
+    )
+    return _run_semantic(result, ast)
+
+
+def _compile_chunk(paths: List[str], stages: tuple, cache_dir: Optional[str] = None) -> List[CompileResult]:
+    return [compile_file(path, stages, cache_dir) for path in paths]
+
+
+def compile_many(
+    paths: Iterable[str],
+    stages: Sequence[str] = STAGES,
+    workers: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    cache_dir: Optional[str] = None,
+) -> List[CompileResult]:
+    # Results come back in input order. With workers=1 everything runs in this
+    # process; otherwise paths go to the pool in chunks, with at most two chunks
+    # per worker in flight so huge listings are not queued all at once.
+    stages = _normalize_stages(stages)
+    paths = [os.fspath(path) for path in paths]
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= chunksize:
+        return _compile_chunk(paths, stages, cache_dir)
+
+    chunks = (paths[i : i + chunksize] for i in range(0, len(paths), chunksize))
+    results: List[CompileResult] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_compile_chunk, chunk, stages, cache_dir))
+            if len(pending) >= 2 * workers:
+                results.extend(pending.popleft().result())
+        while pending:
+            results.extend(pending.popleft().result())
+    return results
@@ -0,0 +1,550 @@
+import io
+import mmap
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from intermediate import BINARY_OPERATORS, ExecutionResult, LoweredProgram, ProgramIO, TACInstruction, lower_instructions
+from storage import atomic_write
+
+# Opcodes. The ones in WITH_OPERAND are followed by one operand word, the ones
+# in WITH_TWO_OPERANDS by three.
+PUSH_CONST = 1
+PUSH_REG = 2
+PUSH_VAR = 3
+STORE_REG = 4
+STORE_VAR = 5
+BINARY = 6
+BINARY_SWAPPED = 7
+NOT = 8
+JUMP = 9
+JUMP_IF_FALSE = 10
+DECLARE = 11
+INPUT = 12
+PRINT = 13
+PRINT_NL = 14
+# Superinstructions for the most common binary shapes: operator, variable, and
+# a constant or a second variable, pushing the result.
+BINARY_VAR_CONST = 15
+BINARY_VAR_VAR = 16
+
+OPCODE_NAMES = {
+    PUSH_CONST: "PUSH_CONST",
+    PUSH_REG: "PUSH_REG",
+    PUSH_VAR: "PUSH_VAR",
+    STORE_REG: "STORE_REG",
+    STORE_VAR: "STORE_VAR",
+    BINARY: "BINARY",
+    BINARY_SWAPPED: "BINARY_SWAPPED",
+    NOT: "NOT",
+    JUMP: "JUMP",
+    JUMP_IF_FALSE: "JUMP_IF_FALSE",
+    DECLARE: "DECLARE",
+    INPUT: "INPUT",
+    PRINT: "PRINT",
+    PRINT_NL: "PRINT_NL",
+    BINARY_VAR_CONST: "BINARY_VAR_CONST",
+    BINARY_VAR_VAR: "BINARY_VAR_VAR",
+}
+WITH_TWO_OPERANDS = {BINARY_VAR_CONST, BINARY_VAR_VAR}
+WITH_OPERAND = {PUSH_CONST, PUSH_REG, PUSH_VAR, STORE_REG, STORE_VAR, BINARY, BINARY_SWAPPED, JUMP, JUMP_IF_FALSE, DECLARE, INPUT}
+
+# The operand of BINARY is an index into this tuple; the order is part of the
+# file format, so new operators go at the end.
+OPERATORS = ("+", "-", "*", "/", "%", "^", "<", "<=", ">", ">=", "==", "!=", "&&", "||")
+
+TBC_MAGIC = b"TBC\0"
+TBC_VERSION = 1
+# magic, version, flags, code words, temp registers, variables, offset of the
+# constant pool, offset of the register and variable tables, reserved.
+_HEADER = struct.Struct("<4sHHIIIIII")
+
+_VALUE_OPS = set(BINARY_OPERATORS) | {"=", "!"}
+_CONSUMERS = _VALUE_OPS | {"if_false", "print"}
+
+
+@dataclass
+class BytecodeProgram:
+    # `code` is an array('i'), or an int32 memoryview over a mapped .tbc file.
+    # Jumps hold absolute word offsets; labels are gone.
+    code: Sequence[int]
+    constants: List[Any]
+    register_defaults: List[Any]
+    variable_names: List[Any]
+    variable_defaults: List[Any]
+
+
+class Assembler:
+    # Turns the lowered TAC into stack code. A temp written and read once
+    # inside one basic block stays on the stack between the two instructions
+    # instead of going through a register, as long as the stack order allows;
+    # BINARY_SWAPPED takes its operands from the stack in the opposite order.
+    def __init__(self, program: LoweredProgram) -> None:
+        self.program = program
+        self.temps = program.temp_registers
+        self.constants = list(program.registers[self.temps:])
+        self.code = array("i")
+
+    def _stackable(self) -> Dict[Tuple[int, int], int]:
+        # (use, operand position) -> defining instruction, for every temp value
+        # read exactly once in the block that wrote it. A register read with no
+        # write before it in its block carries values across blocks and is left
+        # alone entirely.
+        code = self.program.code
+        escaping: Set[int] = set()
+        pairs: Dict[Tuple[int, int], int] = {}
+        reads: Dict[int, List[Tuple[int, int]]] = {}
+        last_write: Dict[int, int] = {}
+
+        def close(register: int) -> None:
+            d = last_write.pop(register, None)
+            found = reads.pop(register, [])
+            if d is not None and len(found) == 1:
+                pairs[found[0]] = d
+
+        for idx, (op, arg1, arg2, result, _) in enumerate(code):
+            if op == "label":
+                for register in list(last_write):
+                    close(register)
+            if op in _CONSUMERS:
+                operands = (arg1, arg2) if op in BINARY_OPERATORS else (arg1,)
+                for position, operand in enumerate(operands):
+                    if 0 <= operand < self.temps:
+                        if operand in last_write:
+                            reads.setdefault(operand, []).append((idx, position))
+                        else:
+                            escaping.add(operand)
+            if op not in {"label", "goto", "if_false", "print", "print_nl", "declare", "input"} and 0 <= result < self.temps:
+                close(result)
+                last_write[result] = idx
+            if op in {"goto", "if_false"}:
+                for register in list(last_write):
+                    close(register)
+        for register in list(last_write):
+            close(register)
+        return {key: d for key, d in pairs.items() if code[d][3] not in escaping}
+
+    def _plan(self) -> Dict[Tuple[int, int], int]:
+        # Drops pairs whose values would not be on top of the stack when they
+        # are used, until a whole pass keeps the stack in order.
+        pairs = self._stackable()
+        while True:
+            stack: List[int] = []
+            bad: Optional[List[Tuple[int, int]]] = None
+            kept = set(pairs.values())
+            for idx, inst in enumerate(self.program.code):
+                op = inst[0]
+                if op in _CONSUMERS:
+                    arity = 2 if op in BINARY_OPERATORS else 1
+                    keys = [(idx, p) for p in range(arity) if (idx, p) in pairs]
+                    wanted = [pairs[key] for key in keys]
+                    top = stack[len(stack) - len(wanted):] if wanted else []
+                    if top != wanted and top != wanted[::-1]:
+                        bad = keys
+                        break
+                    del stack[len(stack) - len(wanted):]
+                if idx in kept:
+                    stack.append(idx)
+            if bad is None:
+                return pairs
+            for key in bad:
+                del pairs[key]
+
+    def _constant(self, value: Any) -> int:
+        for index, existing in enumerate(self.constants):
+            if type(existing) is type(value) and existing == value:
+                return index
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def _push(self, operand: int) -> None:
+        if operand < 0:
+            self.code.extend((PUSH_VAR, ~operand))
+        elif operand < self.temps:
+            self.code.extend((PUSH_REG, operand))
+        else:
+            self.code.extend((PUSH_CONST, operand - self.temps))
+
+    def assemble(self) -> BytecodeProgram:
+        lowered = self.program.code
+        pairs = self._plan()
+        kept = set(pairs.values())
+        offsets: List[int] = []
+        patches: List[Tuple[int, int]] = []
+        emit = self.code.extend
+        for idx, (op, arg1, arg2, result, target) in enumerate(lowered):
+            offsets.append(len(self.code))
+            if op == "label":
+                continue
+            if op == "goto":
+                emit((JUMP, 0))
+                patches.append((len(self.code) - 1, target))
+                continue
+            if op == "if_false":
+                if (idx, 0) not in pairs:
+                    self._push(arg1)
+                emit((JUMP_IF_FALSE, 0))
+                patches.append((len(self.code) - 1, target))
+                continue
+            if op == "declare":
+                emit((DECLARE, ~result))
+                continue
+            if op == "input":
+                emit((INPUT, ~result))
+                continue
+            if op == "print":
+                if (idx, 0) not in pairs:
+                    self._push(arg1)
+                emit((PRINT,))
+                continue
+            if op == "print_nl":
+                emit((PRINT_NL,))
+                continue
+            if op in BINARY_OPERATORS:
+                first, second = (idx, 0) in pairs, (idx, 1) in pairs
+                swapped = second and (not first or pairs[(idx, 0)] > pairs[(idx, 1)])
+                if not first and not second and arg1 < 0 and (arg2 < 0 or arg2 >= self.temps):
+                    if arg2 < 0:
+                        emit((BINARY_VAR_VAR, OPERATORS.index(op), ~arg1, ~arg2))
+                    else:
+                        emit((BINARY_VAR_CONST, OPERATORS.index(op), ~arg1, arg2 - self.temps))
+                else:
+                    if not first:
+                        self._push(arg1)
+                    if not second:
+                        self._push(arg2)
+                    emit((BINARY_SWAPPED if swapped else BINARY, OPERATORS.index(op)))
+            elif op in {"=", "!"}:
+                if (idx, 0) not in pairs:
+                    self._push(arg1)
+                if op == "!":
+                    emit((NOT,))
+            else:
+                emit((PUSH_CONST, self._constant(None)))
+            if idx not in kept:
+                emit((STORE_REG, result) if result >= 0 else (STORE_VAR, ~result))
+        offsets.append(len(self.code))
+        for position, target in patches:
+            self.code[position] = offsets[target]
+        return BytecodeProgram(
+            code=self.code,
+            constants=self.constants,
+            register_defaults=list(self.program.registers[:self.temps]),
+            variable_names=list(self.program.variable_names),
+            variable_defaults=list(self.program.variable_defaults),
+        )
+
+
+def assemble(instructions: List[TACInstruction]) -> BytecodeProgram:
+    return Assembler(lower_instructions(instructions)).assemble()
+
+
+def disassemble(program: BytecodeProgram) -> str:
+    out = io.StringIO()
+    code = program.code
+    pc = 0
+    while pc < len(code):
+        op = code[pc]
+        name = OPCODE_NAMES.get(op, f"?{op}")
+        if op in WITH_TWO_OPERANDS:
+            operator_index, var, other = code[pc + 1], code[pc + 2], code[pc + 3]
+            right = repr(program.constants[other]) if op == BINARY_VAR_CONST else str(program.variable_names[other])
+            note = f"{program.variable_names[var]} {OPERATORS[operator_index]} {right}"
+            out.write(f"{pc:6}  {name:<17}{operator_index} {var} {other}  {note}\n")
+            pc += 4
+            continue
+        if op not in WITH_OPERAND:
+            out.write(f"{pc:6}  {name}\n")
+            pc += 1
+            continue
+        operand = code[pc + 1]
+        if op == PUSH_CONST:
+            note = repr(program.constants[operand])
+        elif op in {PUSH_VAR, STORE_VAR, DECLARE, INPUT}:
+            note = str(program.variable_names[operand])
+        elif op in {BINARY, BINARY_SWAPPED}:
+            note = OPERATORS[operand]
+        else:
+            note = ""
+        out.write(f"{pc:6}  {name:<17}{operand:<8}{note}".rstrip() + "\n")
+        pc += 2
+    return out.getvalue()
+
+
+class BytecodeVM(ProgramIO):
+    def __init__(
+        self,
+        program: BytecodeProgram,
+        inputs: Optional[List[str]] = None,
+        input_callback: Optional[callable] = None,
+        output_callback: Optional[callable] = None,
+    ) -> None:
+        super().__init__(inputs, input_callback, output_callback)
+        self.program = program
+        self.registers: List[Any] = list(program.register_defaults)
+        self.values: List[Any] = list(program.variable_defaults)
+        self.bound = bytearray(len(program.variable_names))
+
+    def run(self) -> ExecutionResult:
+        code = self.program.code
+        constants = self.program.constants
+        names = self.program.variable_names
+        operators = [BINARY_OPERATORS[op] for op in OPERATORS]
+        registers, values, bound, errors = self.registers, self.values, self.bound, self.errors
+        stack: List[Any] = []
+        push, pop = stack.append, stack.pop
+        # Opcodes as locals: the dispatch compares against each in turn.
+        (push_var, push_const, binary, binary_swapped, store_var, jump_if_false, push_reg, store_reg, jump, not_, print_,
+         print_nl, input_, declare, binary_var_const, binary_var_var) = (
+            PUSH_VAR, PUSH_CONST, BINARY, BINARY_SWAPPED, STORE_VAR, JUMP_IF_FALSE, PUSH_REG, STORE_REG, JUMP, NOT, PRINT,
+            PRINT_NL, INPUT, DECLARE, BINARY_VAR_CONST, BINARY_VAR_VAR)
+        pc = 0
+        n = len(code)
+        while pc < n:
+            op = code[pc]
+            if op == binary_var_const or op == binary_var_var:
+                a = values[code[pc + 2]]
+                b = constants[code[pc + 3]] if op == binary_var_const else values[code[pc + 3]]
+                try:
+                    push(operators[code[pc + 1]](a, b))
+                except Exception as exc:
+                    errors.append(str(exc))
+                    push(None)
+                pc += 4
+            elif op == push_var:
+                push(values[code[pc + 1]])
+                pc += 2
+            elif op == push_const:
+                push(constants[code[pc + 1]])
+                pc += 2
+            elif op == binary or op == binary_swapped:
+                b = pop()
+                a = pop()
+                if op == binary_swapped:
+                    a, b = b, a
+                try:
+                    push(operators[code[pc + 1]](a, b))
+                except Exception as exc:
+                    errors.append(str(exc))
+                    push(None)
+                pc += 2
+            elif op == store_var:
+                var = code[pc + 1]
+                values[var] = pop()
+                bound[var] = 1
+                pc += 2
+            elif op == jump_if_false:
+                pc = code[pc + 1] if not pop() else pc + 2
+            elif op == push_reg:
+                push(registers[code[pc + 1]])
+                pc += 2
+            elif op == store_reg:
+                registers[code[pc + 1]] = pop()
+                pc += 2
+            elif op == jump:
+                pc = code[pc + 1]
+            elif op == not_:
+                push(not bool(pop()))
+                pc += 1
+            elif op == print_:
+                self._print(pop())
+                pc += 1
+            elif op == print_nl:
+                self._write("\n")
+                pc += 1
+            elif op == input_:
+                var = code[pc + 1]
+                values[var] = self._read_input(names[var])
+                bound[var] = 1
+                pc += 2
+            elif op == declare:
+                var = code[pc + 1]
+                if not bound[var]:
+                    values[var] = None
+                    bound[var] = 1
+                pc += 2
+            else:
+                raise ValueError(f"Opcode desconocido {op} en la posicion {pc}")
+        variables = {names[var]: values[var] for var, written in enumerate(bound) if written}
+        return ExecutionResult(output="".join(self.output_parts), variables=variables, errors=errors)
+
+
+def ejecutar_bytecode(
+    program: BytecodeProgram,
+    inputs: Optional[List[str]] = None,
+    input_callback: Optional[callable] = None,
+    output_callback: Optional[callable] = None,
+) -> ExecutionResult:
+    return BytecodeVM(program, inputs=inputs, input_callback=input_callback, output_callback=output_callback).run()
+
+
+# .tbc files: the header, the code as little-endian int32 words, then the
+# constant pool and the register and variable tables as tagged values. The
+# layout does not depend on the Python version.
+
+def _write_value(out: io.BytesIO, value: Any) -> None:
+    if value is None:
+        out.write(b"N")
+    elif value is True:
+        out.write(b"T")
+    elif value is False:
+        out.write(b"F")
+    elif type(value) is int:
+        text = str(value).encode("ascii")
+        out.write(b"i" + struct.pack("<I", len(text)) + text)
+    elif type(value) is float:
+        out.write(b"f" + struct.pack("<d", value))
+    elif type(value) is str:
+        text = value.encode("utf-8", "surrogatepass")
+        out.write(b"s" + struct.pack("<I", len(text)) + text)
+    else:
+        raise ValueError(f"Valor no representable en un archivo .tbc: {value!r}")
+
+
+def _read_value(data, pos: int) -> Tuple[Any, int]:
+    tag = bytes(data[pos:pos + 1])
+    pos += 1
+    if tag == b"N":
+        return None, pos
+    if tag == b"T":
+        return True, pos
+    if tag == b"F":
+        return False, pos
+    if tag == b"f":
+        return struct.unpack_from("<d", data, pos)[0], pos + 8
+    if tag in {b"i", b"s"}:
+        (length,) = struct.unpack_from("<I", data, pos)
+        raw = bytes(data[pos + 4:pos + 4 + length])
+        if len(raw) != length:
+            raise ValueError("Archivo .tbc truncado")
+        value = int(raw.decode("ascii")) if tag == b"i" else raw.decode("utf-8", "surrogatepass")
+        return value, pos + 4 + length
+    raise ValueError(f"Etiqueta de valor desconocida {tag!r} en la posicion {pos - 1}")
+
+
+def _write_values(out: io.BytesIO, values: Sequence[Any]) -> None:
+    out.write(struct.pack("<I", len(values)))
+    for value in values:
+        _write_value(out, value)
+
+
+def _read_values(data, pos: int) -> Tuple[List[Any], int]:
+    (count,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    values = []
+    for _ in range(count):
+        value, pos = _read_value(data, pos)
+        values.append(value)
+    return values, pos
+
+
+def dumps(program: BytecodeProgram) -> bytes:
+    code = array("i", program.code)
+    if sys.byteorder != "little":
+        code.byteswap()
+    code_bytes = code.tobytes()
+    constants = io.BytesIO()
+    _write_values(constants, program.constants)
+    tables = io.BytesIO()
+    _write_values(tables, program.register_defaults)
+    _write_values(tables, program.variable_names)
+    _write_values(tables, program.variable_defaults)
+    constants_offset = _HEADER.size + len(code_bytes)
+    tables_offset = constants_offset + len(constants.getvalue())
+    header = _HEADER.pack(
+        TBC_MAGIC,
+        TBC_VERSION,
+        0,
+        len(code),
+        len(program.register_defaults),
+        len(program.variable_names),
+        constants_offset,
+        tables_offset,
+        0,
+    )
+    return header + code_bytes + constants.getvalue() + tables.getvalue()
+
+
+def _validate_code(code: Sequence[int], constants: int, registers: int, variables: int) -> None:
+    # The VM trusts its operands, so a damaged file is rejected here instead of
+    # failing, or reading the wrong slot, halfway through a run.
+    n = len(code)
+    starts = set()
+    jumps = []
+    pc = 0
+    while pc < n:
+        op = code[pc]
+        starts.add(pc)
+        width = 4 if op in WITH_TWO_OPERANDS else 2 if op in WITH_OPERAND else 1
+        if op not in OPCODE_NAMES:
+            raise ValueError(f"Archivo .tbc corrupto: opcode desconocido {op} en la posicion {pc}")
+        if pc + width > n:
+            raise ValueError(f"Archivo .tbc corrupto: faltan operandos de {OPCODE_NAMES[op]} en la posicion {pc}")
+        if op in WITH_TWO_OPERANDS:
+            checks = [(code[pc + 1], len(OPERATORS)), (code[pc + 2], variables)]
+            checks.append((code[pc + 3], constants if op == BINARY_VAR_CONST else variables))
+        elif op in {JUMP, JUMP_IF_FALSE}:
+            jumps.append(pc)
+            checks = [(code[pc + 1], n + 1)]
+        elif op == PUSH_CONST:
+            checks = [(code[pc + 1], constants)]
+        elif op in {PUSH_REG, STORE_REG}:
+            checks = [(code[pc + 1], registers)]
+        elif op in {PUSH_VAR, STORE_VAR, DECLARE, INPUT}:
+            checks = [(code[pc + 1], variables)]
+        elif op in {BINARY, BINARY_SWAPPED}:
+            checks = [(code[pc + 1], len(OPERATORS))]
+        else:
+            checks = []
+        for operand, limit in checks:
+            if not 0 <= operand < limit:
+                raise ValueError(f"Archivo .tbc corrupto: operando {operand} fuera de rango en {OPCODE_NAMES[op]} (posicion {pc})")
+        pc += width
+    starts.add(n)
+    for pc in jumps:
+        if code[pc + 1] not in starts:
+            raise ValueError(f"Archivo .tbc corrupto: el salto en la posicion {pc} no cae en una instruccion")
+
+
+def loads(data) -> BytecodeProgram:
+    # `data` is any buffer. On a little-endian host the code is a view into it,
+    # so a mapped file is executed in place.
+    if len(data) < _HEADER.size:
+        raise ValueError("Archivo .tbc truncado")
+    magic, version, _, words, temps, variables, constants_offset, tables_offset, _ = _HEADER.unpack_from(data, 0)
+    if magic != TBC_MAGIC:
+        raise ValueError("No es un archivo .tbc")
+    if version != TBC_VERSION:
+        raise ValueError(f"Version de .tbc no soportada: {version} (se esperaba {TBC_VERSION})")
+    end = _HEADER.size + 4 * words
+    if end > constants_offset or constants_offset > tables_offset or tables_offset > len(data):
+        raise ValueError("Archivo .tbc truncado o corrupto")
+    view = memoryview(data)[_HEADER.size:end]
+    if sys.byteorder == "little" and array("i").itemsize == 4:
+        code = view.cast("i")
+    else:
+        code = array("i", struct.unpack(f"<{words}i", view))
+    try:
+        constants, _ = _read_values(data, constants_offset)
+        register_defaults, pos = _read_values(data, tables_offset)
+        variable_names, pos = _read_values(data, pos)
+        variable_defaults, pos = _read_values(data, pos)
+    except struct.error as exc:
+        raise ValueError("Archivo .tbc truncado") from exc
+    if len(register_defaults) != temps or len(variable_names) != variables or len(variable_defaults) != variables:
+        raise ValueError("Archivo .tbc corrupto: las tablas no coinciden con la cabecera")
+    _validate_code(code, len(constants), temps, variables)
+    return BytecodeProgram(code, constants, register_defaults, variable_names, variable_defaults)
+
+
+def write_tbc(program: BytecodeProgram, path: str) -> None:
+    atomic_write(path, dumps(program))
+
+
+def read_tbc(path: str) -> BytecodeProgram:
+    # The file stays mapped for as long as the returned program's code is alive.
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(mapping)
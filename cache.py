@@ -0,0 +1,248 @@
+import hashlib
+import marshal
+import os
+import sys
+import zlib
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import intermediate
+import lexical
+import semantic
+import syntactic
+import visitor
+from intermediate import TACInstruction, analizar_y_generar
+from lexical import TokenStream, analizar_flujo
+from semantic import SemanticAnalysisResult, SymbolTableEntry
+from storage import atomic_write, source_version
+from syntactic import ArenaAST, analizar_sintacticamente
+
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+FORMAT_TAG = b"CCH1"
+
+
+# Any edit to a pipeline module yields new keys instead of stale hits.
+COMPILER_VERSION = source_version(lexical, syntactic, semantic, intermediate, visitor, sys.modules[__name__])
+
+
+@dataclass
+class Compilation:
+    tokens: TokenStream
+    lexical_errors: List[Dict[str, Any]]
+    ast: Optional[ArenaAST] = None
+    syntactic_errors: List[str] = field(default_factory=list)
+    semantic: Optional[SemanticAnalysisResult] = None
+    tac: Optional[List[TACInstruction]] = None
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    # Source bytes whose lexing, parsing, analysis and TAC generation were skipped.
+    bytes_saved: int = 0
+    bytes_written: int = 0
+    evictions: int = 0
+
+
+def compile_pipeline(source: str) -> Compilation:
+    # Same gating as the IDE: semantics need a clean lexer and an AST, TAC also
+    # needs a clean parse.
+    tokens, lexical_errors = analizar_flujo(source)
+    result = Compilation(tokens=tokens, lexical_errors=lexical_errors)
+    ast, result.syntactic_errors = analizar_sintacticamente(tokens.filtrar(("COMENTARIO", "ERROR")))
+    annotations = None
+    if not lexical_errors and ast is not None:
+        fused = analizar_y_generar(ast)
+        result.semantic = fused.semantic_result()
+        annotations = fused.annotations
+        if not result.syntactic_errors:
+            result.tac = fused.instructions
+    # The arena carries the semantic annotations next to each node.
+    result.ast = ArenaAST.desde_nodo(ast, annotations) if ast is not None else None
+    return result
+
+
+_ARENA_COLUMNS = ("tipos", "gramaticas", "valores", "lineas", "columnas", "primeros", "cantidades", "hijos", "finales")
+
+
+def _dump_tokens(tokens: TokenStream) -> tuple:
+    return (tokens.lexemas, tokens.tipos.tobytes(), tokens.inicios.tobytes(),
+            tokens.lineas.tobytes(), tokens.columnas.tobytes())
+
+
+def _load_tokens(data: tuple) -> TokenStream:
+    lexemas, tipos, inicios, lineas, columnas = data
+    tokens = TokenStream()
+    tokens.lexemas = [sys.intern(lexema) for lexema in lexemas]
+    tokens.tipos.frombytes(tipos)
+    tokens.inicios.frombytes(inicios)
+    tokens.lineas = array("i", lineas)
+    tokens.columnas = array("i", columnas)
+    return tokens
+
+
+def _dump_arena(arena: Optional[ArenaAST]) -> Optional[tuple]:
+    if arena is None:
+        return None
+    columns = tuple(getattr(arena, name).tobytes() for name in _ARENA_COLUMNS)
+    return (arena.nombres, arena.constantes, columns, arena.tipos_semanticos, arena.valores_semanticos)
+
+
+def _load_arena(data: Optional[tuple]) -> Optional[ArenaAST]:
+    if data is None:
+        return None
+    nombres, constantes, columns, tipos_semanticos, valores_semanticos = data
+    arena = ArenaAST()
+    arena.nombres = nombres
+    arena._codigo_nombre = {nombre: i for i, nombre in enumerate(nombres)}
+    arena.constantes = constantes
+    arena._codigo_constante = {valor: i for i, valor in enumerate(constantes)}
+    for name, raw in zip(_ARENA_COLUMNS, columns):
+        getattr(arena, name).frombytes(raw)
+    arena.tipos_semanticos = tipos_semanticos
+    arena.valores_semanticos = valores_semanticos
+    return arena
+
+
+def _dump_semantic(result: Optional[SemanticAnalysisResult]) -> Optional[tuple]:
+    if result is None:
+        return None
+    entries = [(e.name, e.type, e.scope, e.level, e.offset, e.line, e.column, e.value, e.lines) for e in result.entries]
+    return (result.annotated_tree, result.symbol_table_text, result.errors, entries)
+
+
+def _load_semantic(data: Optional[tuple]) -> Optional[SemanticAnalysisResult]:
+    if data is None:
+        return None
+    annotated_tree, symbol_table_text, errors, entries = data
+    return SemanticAnalysisResult(
+        errors=errors,
+        entries=[SymbolTableEntry(*entry) for entry in entries],
+        tree_text=annotated_tree,
+        table_text=symbol_table_text,
+    )
+
+
+def encode(compilation: Compilation) -> bytes:
+    payload = (
+        _dump_tokens(compilation.tokens),
+        compilation.lexical_errors,
+        _dump_arena(compilation.ast),
+        compilation.syntactic_errors,
+        _dump_semantic(compilation.semantic),
+        None if compilation.tac is None else [(i.op, i.arg1, i.arg2, i.result) for i in compilation.tac],
+    )
+    return FORMAT_TAG + zlib.compress(marshal.dumps(payload))
+
+
+def decode(data: bytes) -> Compilation:
+    if not data.startswith(FORMAT_TAG):
+        raise ValueError("Not a compilation cache record")
+    tokens, lexical_errors, arena, syntactic_errors, semantic_data, tac = marshal.loads(zlib.decompress(data[len(FORMAT_TAG):]))
+    return Compilation(
+        tokens=_load_tokens(tokens),
+        lexical_errors=lexical_errors,
+        ast=_load_arena(arena),
+        syntactic_errors=syntactic_errors,
+        semantic=_load_semantic(semantic_data),
+        tac=None if tac is None else [TACInstruction(*inst) for inst in tac],
+    )
+
+
+class CompileCache:
+    # One file per key in `directory`. Recency is the file's mtime, so several
+    # processes can share a directory; each keeps its own view of the sizes and
+    # tolerates files that another one already evicted.
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        os.makedirs(self.directory, exist_ok=True)
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin") and entry.is_file():
+                info = entry.stat()
+                found.append((info.st_mtime_ns, entry.name[:-4], info.st_size))
+        for _, key, size in sorted(found):
+            self._sizes[key] = size
+        self.total_bytes = sum(self._sizes.values())
+
+    @staticmethod
+    def key(source: str) -> str:
+        return hashlib.sha256(COMPILER_VERSION.encode() + b"\0" + source.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".bin")
+
+    def _forget(self, key: str) -> None:
+        self.total_bytes -= self._sizes.pop(key, 0)
+
+    def get(self, source: str) -> Optional[Compilation]:
+        key = self.key(source)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            compilation = decode(data)
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            self._forget(key)
+            self.stats.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if key not in self._sizes:
+            self.total_bytes += len(data)
+        self._sizes[key] = len(data)
+        self._sizes.move_to_end(key)
+        self.stats.hits += 1
+        self.stats.bytes_saved += len(source.encode("utf-8", "surrogatepass"))
+        return compilation
+
+    def put(self, source: str, compilation: Compilation) -> None:
+        key = self.key(source)
+        try:
+            data = encode(compilation)
+        except ValueError:
+            # A semantic value marshal cannot store; such a result is not cached.
+            return
+        try:
+            atomic_write(self._path(key), data)
+        except OSError:
+            return
+        self._forget(key)
+        self._sizes[key] = len(data)
+        self.total_bytes += len(data)
+        self.stats.bytes_written += len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self.stats.evictions += 1
+
+    def compile(self, source: str) -> Compilation:
+        compilation = self.get(source)
+        if compilation is None:
+            compilation = compile_pipeline(source)
+            self.put(source, compilation)
+        return compilation
+
+    def clear(self) -> None:
+        for key in list(self._sizes):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        self._sizes.clear()
+        self.total_bytes = 0
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
+import heapq
+import io
+import operator
+from array import array
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from functools import partial
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from semantic import TYPE_SIZES, SemanticAnalysisResult, SemanticAnalyzer, SemanticAnnotations, SymbolTable, SymbolTableEntry
+from visitor import Visitor
 
 @dataclass
 class TACInstruction:
@@ -37,7 +45,8 @@ class ExecutionResult:
     errors: List[str]
 
 
-class TACGenerator:
+class TACGenerator(Visitor):
+    handler_tables = {"dispatch": "_gen_", "expressions": "_expr_"}
     expression_nodes = {
         "arit_op",
         "rel_op",
@@ -76,37 +85,27 @@ class TACGenerator:
         self.instructions.clear()
         self.temp_counter = 0
         self.label_counter = 0
-        self._gen_node(ast_root)
+        self.visit(ast_root)
         return list(self.instructions)
 
-    def _gen_node(self, node):
-        if node is None:
-            return
-        handler = getattr(self, f"_gen_{node.tipo}", None)
-        if handler:
-            handler(node)
-            return
-        for child in getattr(node, "hijos", []):
-            self._gen_node(child)
-
     def _gen_programa(self, node):
         for child in node.hijos:
-            self._gen_node(child)
+            self.visit(child)
 
     def _gen_lista_declaracion(self, node):
         for child in node.hijos:
-            self._gen_node(child)
+            self.visit(child)
 
     def _gen_int(self, node):
-        self._gen_declaracion_tipo(node, "int")
+        self._declaracion_tipo(node, "int")
 
     def _gen_float(self, node):
-        self._gen_declaracion_tipo(node, "float")
+        self._declaracion_tipo(node, "float")
 
     def _gen_bool(self, node):
-        self._gen_declaracion_tipo(node, "bool")
+        self._declaracion_tipo(node, "bool")
 
-    def _gen_declaracion_tipo(self, node, tipo: str):
+    def _declaracion_tipo(self, node, tipo: str):
         for child in node.hijos:
             if child.tipo == "ID":
                 self.emit("declare", tipo, None, child.valor)
@@ -116,17 +115,17 @@ class TACGenerator:
             return
         target = node.hijos[0]
         expr_node = node.hijos[1] if len(node.hijos) > 1 else None
-        value_temp = self._gen_expr(expr_node)
+        value_temp = self._expr(expr_node)
         self.emit("=", value_temp, None, target.valor)
 
     def _gen_lista_sentencias(self, node):
         for child in node.hijos:
-            self._gen_node(child)
+            self.visit(child)
 
     def _gen_sent_expresion(self, node):
         for child in node.hijos:
             if child.tipo in self.expression_nodes:
-                self._gen_expr(child)
+                self._expr(child)
 
     def _gen_seleccion(self, node):
         expr_node = None
@@ -143,17 +142,17 @@ class TACGenerator:
         if len(temp_blocks) > 1:
             else_block = temp_blocks[1]
 
-        cond_temp = self._gen_expr(expr_node)
+        cond_temp = self._expr(expr_node)
         label_else = self.new_label("Lelse")
         label_end = self.new_label("Lendif") if else_block else label_else
         self.emit("if_false", cond_temp, None, label_else)
         if then_block:
-            self._gen_node(then_block)
+            self.visit(then_block)
         if else_block:
             self.emit("goto", None, None, label_end)
         self.emit("label", None, None, label_else)
         if else_block:
-            self._gen_node(else_block)
+            self.visit(else_block)
             self.emit("label", None, None, label_end)
 
     def _gen_iteracion(self, node):
@@ -167,10 +166,10 @@ class TACGenerator:
                 body = child
             elif child.tipo not in {"while", "end"}:
                 expr_node = expr_node or child
-        cond_temp = self._gen_expr(expr_node)
+        cond_temp = self._expr(expr_node)
         self.emit("if_false", cond_temp, None, end)
         if body:
-            self._gen_node(body)
+            self.visit(body)
         self.emit("goto", None, None, start)
         self.emit("label", None, None, end)
 
@@ -185,8 +184,8 @@ class TACGenerator:
             elif child.tipo not in {"do", "until"}:
                 expr_node = expr_node or child
         if body:
-            self._gen_node(body)
-        cond_temp = self._gen_expr(expr_node)
+            self.visit(body)
+        cond_temp = self._expr(expr_node)
         self.emit("if_false", cond_temp, None, start)
 
     def _gen_sent_in(self, node):
@@ -198,40 +197,43 @@ class TACGenerator:
     def _gen_sent_out(self, node):
         for child in node.hijos:
             if child.tipo in self.expression_nodes:
-                temp = self._gen_expr(child)
+                temp = self._expr(child)
                 self.emit("print", temp)
             elif child.tipo == "cadena":
                 literal = f'"{child.valor}"'
                 self.emit("print", literal)
         self.emit("print_nl")
 
-    def _gen_expr(self, node) -> Any:
+    def _expr(self, node) -> Any:
         if node is None:
             return None
-        tipo = node.tipo
-        if tipo in {"num_entero", "num_flotante", "bool_val"}:
-            return self._literal_value(node)
-        if tipo == "cadena":
-            return f'"{node.valor}"'
-        if tipo in {"id", "ID"}:
-            return node.valor
-        if tipo in {"arit_op", "rel_op", "op_logico", "log_op", "pot_op"}:
-            op = node.valor
-            if tipo == "log_op" or (op == "!" and len(node.hijos) == 1):
-                operand = self._gen_expr(node.hijos[0]) if node.hijos else None
-                temp = self.new_temp()
-                self.emit(op, operand, None, temp)
-                return temp
-            left = self._gen_expr(node.hijos[0]) if node.hijos else None
-            right = self._gen_expr(node.hijos[1]) if node.hijos and len(node.hijos) > 1 else None
-            temp = self.new_temp()
-            self.emit(op, left, right, temp)
-            return temp
+        handler = self.expressions.get(node.tipo)
+        if handler is not None:
+            return handler(self, node)
         last = None
         for child in node.hijos:
-            last = self._gen_expr(child)
+            last = self._expr(child)
         return last
 
+    def _expr_cadena(self, node) -> str:
+        return f'"{node.valor}"'
+
+    def _expr_id(self, node) -> Any:
+        return node.valor
+
+    def _operation(self, node) -> str:
+        op = node.valor
+        if node.tipo == "log_op" or (op == "!" and len(node.hijos) == 1):
+            operand = self._expr(node.hijos[0]) if node.hijos else None
+            temp = self.new_temp()
+            self.emit(op, operand, None, temp)
+            return temp
+        left = self._expr(node.hijos[0]) if node.hijos else None
+        right = self._expr(node.hijos[1]) if node.hijos and len(node.hijos) > 1 else None
+        temp = self.new_temp()
+        self.emit(op, left, right, temp)
+        return temp
+
     def _literal_value(self, node):
         if node.tipo == "num_entero":
             try:
@@ -247,6 +249,208 @@ class TACGenerator:
             return True if str(node.valor).lower() == "true" else False
         return node.valor
 
+    _expr_num_entero = _expr_num_flotante = _expr_bool_val = _literal_value
+    _expr_ID = _expr_id
+    _expr_arit_op = _expr_rel_op = _expr_op_logico = _expr_log_op = _expr_pot_op = _operation
+
+
+
+@dataclass
+class FusedResult:
+    # Diagnostics and code come out of the walk; the annotated tree and the
+    # symbol table are only rendered when read.
+    errors: List[str]
+    entries: List[SymbolTableEntry]
+    instructions: List[TACInstruction]
+    root: Any = None
+    symbol_table: Optional[SymbolTable] = None
+    annotations: Optional[SemanticAnnotations] = None
+
+    def semantic_result(self) -> SemanticAnalysisResult:
+        return SemanticAnalysisResult(
+            errors=list(self.errors),
+            entries=list(self.entries),
+            annotations=self.annotations,
+            root=self.root,
+            symbol_table=self.symbol_table,
+        )
+
+    @property
+    def annotated_tree(self) -> str:
+        return self.semantic_result().annotated_tree
+
+    @property
+    def symbol_table_text(self) -> str:
+        return self.semantic_result().symbol_table_text
+
+
+class FusedCompiler(SemanticAnalyzer):
+    # Type-checks and emits TAC in the same walk. Each statement handler does
+    # what SemanticAnalyzer and TACGenerator do for that node, in their order;
+    # `self.code` owns the instructions, temps and labels. An expression whose
+    # shape the two passes walk differently is handed to each one in turn.
+    # Where they would pick different children of a statement (several loop
+    # bodies or conditions), the parser never builds such a node.
+    handler_tables = {**SemanticAnalyzer.handler_tables, "binary": "_binary_"}
+    leaf_nodes = {"num_entero", "num_flotante", "bool_val", "cadena", "id", "ID"}
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.code = TACGenerator()
+
+    def compile(self, ast_root) -> FusedResult:
+        if ast_root is None:
+            return FusedResult(errors=["No se recibio un AST valido."], entries=[], instructions=[], symbol_table=self.symbol_table)
+        self.visit(ast_root)
+        return FusedResult(
+            errors=list(self.errors),
+            entries=list(self.symbol_table.entries),
+            instructions=list(self.code.instructions),
+            root=ast_root,
+            symbol_table=self.symbol_table,
+            annotations=self.annotations,
+        )
+
+    def _handle_declaration(self, node, declared_type: str) -> None:
+        super()._handle_declaration(node, declared_type)
+        self.code._declaracion_tipo(node, declared_type)
+
+    def visit_ASIGNACION(self, node) -> None:
+        if not node.hijos:
+            return
+        target_node = node.hijos[0]
+        expr_node = node.hijos[1] if len(node.hijos) > 1 else None
+        entry = self._assignment_target(target_node)
+        expr_type, expr_value, operand = self._expression(expr_node)
+        self._assign(node, target_node, entry, expr_type, expr_value)
+        self.code.emit("=", operand, None, target_node.valor)
+
+    def visit_seleccion(self, node) -> None:
+        expr_node = None
+        blocks: List[Any] = []
+        for child in node.hijos:
+            if child.tipo == "lista_sentencias":
+                blocks.append(child)
+            elif child.tipo not in {"if", "then", "else", "end"} and expr_node is None:
+                expr_node = child
+        expr_type, expr_value, cond = self._expression(expr_node)
+        self._check_condition(expr_node, "if", expr_type, expr_value)
+        else_block = blocks[1] if len(blocks) > 1 else None
+        label_else = self.code.new_label("Lelse")
+        label_end = self.code.new_label("Lendif") if else_block else label_else
+        self.code.emit("if_false", cond, None, label_else)
+        if blocks:
+            self._visit_block(blocks[0], "if_then")
+        if else_block:
+            self.code.emit("goto", None, None, label_end)
+        self.code.emit("label", None, None, label_else)
+        if else_block:
+            self._visit_block(else_block, "if_else")
+            self.code.emit("label", None, None, label_end)
+        self.annotations.set(node, "void")
+
+    def visit_iteracion(self, node) -> None:
+        start = self.code.new_label("Lwhile")
+        end = self.code.new_label("Lwend")
+        self.code.emit("label", None, None, start)
+        expr_node = None
+        body = None
+        for child in node.hijos:
+            if child.tipo == "lista_sentencias" and body is None:
+                body = child
+            elif child.tipo not in {"while", "end"} and expr_node is None:
+                expr_node = child
+        expr_type, expr_value, cond = self._expression(expr_node)
+        self._check_condition(expr_node, "while", expr_type, expr_value)
+        self.code.emit("if_false", cond, None, end)
+        if body:
+            self._visit_block(body, "while_body")
+        self.code.emit("goto", None, None, start)
+        self.code.emit("label", None, None, end)
+        self.annotations.set(node, "void")
+
+    def visit_repeticion(self, node) -> None:
+        start = self.code.new_label("Ldo")
+        self.code.emit("label", None, None, start)
+        body = None
+        expr_node = None
+        for child in node.hijos:
+            if child.tipo == "lista_sentencias" and body is None:
+                body = child
+            elif child.tipo not in {"do", "until"}:
+                expr_node = child
+        if body:
+            self._visit_block(body, "do_body")
+        expr_type, expr_value, cond = self._expression(expr_node)
+        self._check_condition(expr_node, "until", expr_type, expr_value)
+        self.code.emit("if_false", cond, None, start)
+        self.annotations.set(node, "void")
+
+    def visit_sent_in(self, node) -> None:
+        super().visit_sent_in(node)
+        self.code._gen_sent_in(node)
+
+    def visit_sent_out(self, node) -> None:
+        for child in node.hijos:
+            if child.tipo == "cadena":
+                self.annotations.set(child, "string", child.valor)
+                self.code.emit("print", self.code._expr(child))
+            elif child.tipo in self.expression_nodes:
+                self.code.emit("print", self._expression(child)[2])
+            elif child.tipo in self.code.expression_nodes:
+                self.code.emit("print", self.code._expr(child))
+        self.annotations.set(node, "void")
+        self.code.emit("print_nl")
+
+    def visit_sent_expresion(self, node) -> None:
+        checked = None
+        for child in node.hijos:
+            if child.tipo in self.expression_nodes:
+                checked = child
+                break
+        for child in node.hijos:
+            if child is checked:
+                self._expression(child)
+            elif child.tipo in self.code.expression_nodes:
+                self.code._expr(child)
+        self.annotations.set(node, "void")
+
+    def _expression(self, node) -> Tuple[Optional[str], Optional[Any], Any]:
+        if node is None:
+            return None, None, None
+        kind = node.tipo
+        if kind in self.leaf_nodes:
+            expr_type, expr_value = self.evaluate_expression(node)
+            return expr_type, expr_value, self.code._expr(node)
+        combine = self.binary.get(kind)
+        if combine is not None and len(node.hijos) == 2:
+            left_type, left_value, left = self._expression(node.hijos[0])
+            right_type, right_value, right = self._expression(node.hijos[1])
+            expr_type, expr_value = combine(self, node, left_type, left_value, right_type, right_value)
+            temp = self.code.new_temp()
+            self.code.emit(node.valor, left, right, temp)
+            return expr_type, expr_value, temp
+        if kind == "log_op" and len(node.hijos) == 1:
+            child_type, child_value, operand = self._expression(node.hijos[0])
+            expr_type, expr_value = self._combine_unary_logical(node, child_type, child_value)
+            temp = self.code.new_temp()
+            self.code.emit(node.valor, operand, None, temp)
+            return expr_type, expr_value, temp
+        expr_type, expr_value = self.evaluate_expression(node)
+        return expr_type, expr_value, self.code._expr(node)
+
+    def _binary_pot_op(self, node, left_type, left_value, right_type, right_value) -> Tuple[Optional[str], Optional[Any]]:
+        # SemanticAnalyzer has no rule for '^' and keeps the last operand.
+        self.annotations.set(node, right_type, right_value)
+        return right_type, right_value
+
+    _binary_arit_op = SemanticAnalyzer._combine_arithmetic
+    _binary_rel_op = SemanticAnalyzer._combine_relational
+    _binary_op_logico = SemanticAnalyzer._combine_logical
+
+
+def analizar_y_generar(ast_root) -> FusedResult:
+    return FusedCompiler().compile(ast_root)
 
 
 def generar_codigo_intermedio(ast_root) -> List[TACInstruction]:
@@ -254,64 +458,353 @@ def generar_codigo_intermedio(ast_root) -> List[TACInstruction]:
     return generator.generate(ast_root)
 
 
-def formatear_codigo_intermedio(instructions: List[TACInstruction]) -> str:
+def escribir_codigo_intermedio(instructions: List[TACInstruction], out: TextIO) -> None:
     if not instructions:
-        return "Sin código intermedio."
-    lines: List[str] = []
+        out.write("Sin código intermedio.")
+        return
+    separator = ""
     for idx, inst in enumerate(instructions):
         if inst.op == "label":
-            lines.append(inst.format())
+            out.write(f"{separator}{inst.format()}")
         else:
-            lines.append(f"{idx:03d}: {inst.format()}")
-    return "\n".join(lines)
+            out.write(f"{separator}{idx:03d}: {inst.format()}")
+        separator = "\n"
+
+
+def formatear_codigo_intermedio(instructions: List[TACInstruction]) -> str:
+    out = io.StringIO()
+    escribir_codigo_intermedio(instructions, out)
+    return out.getvalue()
 
 
-class TACExecutor:
+# Declared variables whose type has a fixed size in TYPE_SIZES live in one
+# compact array per type. A variable keeps its value there while the value has
+# exactly its declared Python type; anything else (None after a declaration, an
+# int stored in a float, the float "/" gives in an int, text read from input)
+# is kept boxed instead, so every read sees exactly what was written.
+VARIABLE_STORAGE = {"int": ("q", int), "float": ("d", float), "bool": (None, bool)}
+
+
+def _strip_quotes(text: str) -> str:
+    while len(text) >= 2 and (
+        (text[0] == '"' and text[-1] == '"') or (text[0] == "'" and text[-1] == "'")
+    ):
+        text = text[1:-1]
+    return text
+
+
+def _parse_literal(text: Any) -> Any:
+    if not isinstance(text, str):
+        return text
+    try:
+        return int(text)
+    except Exception:
+        try:
+            return float(text)
+        except Exception:
+            return text
+
+
+def _is_temp(name: Any) -> bool:
+    return isinstance(name, str) and name.startswith("_t") and name[2:].isdigit()
+
+
+@dataclass
+class LoweredProgram:
+    # One tuple (op, arg1, arg2, result, target) per TAC instruction. An operand
+    # or result >= 0 is a register (a temp, a constant or a pooled string); a
+    # negative one is variable ~n. `target` is the absolute index a jump lands
+    # on, or the variable name an input prompts for.
+    code: List[Tuple[str, int, int, int, Any]]
+    variable_names: List[Any]
+    variable_types: List[Optional[str]]
+    # What a variable reads as before it is first written: its own name parsed
+    # as a literal, as the text-resolving executor did.
+    variable_defaults: List[Any]
+    registers: List[Any]
+    temp_registers: int
+
+
+class _Lowering:
+    def __init__(self) -> None:
+        self.variables: Dict[Any, int] = {}
+        self.variable_names: List[Any] = []
+        self.variable_types: List[Optional[str]] = []
+        self.temps: Dict[Any, int] = {}
+        self.registers: List[Any] = []
+        self.pooled: Dict[Tuple[type, str], int] = {}
+
+    def _pool(self, value: Any) -> int:
+        key = (type(value), repr(value))
+        register = self.pooled.get(key)
+        if register is None:
+            register = self.pooled[key] = len(self.registers)
+            self.registers.append(value)
+        return register
+
+    def _operand(self, value: Any) -> int:
+        # Same order of tests the executor used to run on every read: quotes,
+        # boolean words, a written name, then int and float.
+        if not isinstance(value, str):
+            return self._pool(value)
+        text = _strip_quotes(value)
+        if text.lower() in {"true", "false"}:
+            return self._pool(text.lower() == "true")
+        return self._name(text)
+
+    def _name(self, name: Any) -> int:
+        var = self.variables.get(name)
+        if var is not None:
+            return ~var
+        register = self.temps.get(name)
+        if register is not None:
+            return register
+        return self._pool(_parse_literal(name))
+
+    def _declare_variables(self, instructions: List[TACInstruction], temps: set) -> None:
+        for inst in instructions:
+            if inst.op in {"label", "goto", "if_false", "print", "print_nl"} or inst.result in temps:
+                continue
+            var = self.variables.get(inst.result)
+            if var is None:
+                var = self.variables[inst.result] = len(self.variable_names)
+                self.variable_names.append(inst.result)
+                self.variable_types.append(None)
+            if inst.op == "declare":
+                # A name declared with two types in different blocks is boxed.
+                declared = self.variable_types[var]
+                if declared is None and inst.arg1 in VARIABLE_STORAGE and TYPE_SIZES.get(inst.arg1):
+                    self.variable_types[var] = inst.arg1
+                elif declared is not None and declared != inst.arg1:
+                    self.variable_types[var] = ""
+        self.variable_types = [t or None for t in self.variable_types]
+
+    def _allocate_temps(self, instructions: List[TACInstruction]) -> int:
+        # A temp written before it is read, and used only inside one basic block,
+        # needs its register just from that write to its last use; such temps
+        # share registers. Any other temp keeps one of its own.
+        # A declared or input name is a variable even when it looks like a temp.
+        named = {inst.result for inst in instructions if inst.op in {"declare", "input"}}
+        block = 0
+        spans: Dict[Any, List[int]] = {}
+        shared: Dict[Any, bool] = {}
+        for idx, inst in enumerate(instructions):
+            if inst.op == "label":
+                block += 1
+            reads = [] if inst.op in {"label", "goto"} else [inst.arg1, inst.arg2]
+            for value in reads:
+                name = _strip_quotes(value) if isinstance(value, str) else value
+                if not _is_temp(name) or name in named:
+                    continue
+                span = spans.get(name)
+                if span is None:
+                    spans[name] = [idx, idx, block]
+                    shared[name] = False
+                else:
+                    span[1] = idx
+                    shared[name] = shared[name] and span[2] == block
+            if inst.op not in {"label", "goto", "if_false", "print", "print_nl"} and _is_temp(inst.result) and inst.result not in named:
+                span = spans.get(inst.result)
+                if span is None:
+                    spans[inst.result] = [idx, idx, block]
+                    shared[inst.result] = True
+                else:
+                    span[1] = idx
+                    shared[inst.result] = shared[inst.result] and span[2] == block
+            if inst.op in {"goto", "if_false"}:
+                block += 1
+
+        written = {
+            inst.result
+            for inst in instructions
+            if inst.op not in {"label", "goto", "if_false", "print", "print_nl"} and _is_temp(inst.result)
+        } - named
+        for name in spans:
+            if name in written and not shared[name]:
+                self.temps[name] = len(self.registers)
+                self.registers.append(_parse_literal(name))
+        free: List[int] = []
+        active: List[Tuple[int, int]] = []
+        for name in sorted((n for n in spans if shared[n]), key=lambda n: spans[n][0]):
+            first, last, _ = spans[name]
+            while active and active[0][0] <= first:
+                free.append(heapq.heappop(active)[1])
+            if free:
+                register = free.pop()
+            else:
+                register = len(self.registers)
+                self.registers.append(None)
+            self.temps[name] = register
+            heapq.heappush(active, (last, register))
+        return len(self.registers)
+
+    def lower(self, instructions: List[TACInstruction]) -> LoweredProgram:
+        labels: Dict[str, int] = {}
+        for idx, inst in enumerate(instructions):
+            if inst.op == "label" and inst.result:
+                labels[inst.result] = idx
+        temp_registers = self._allocate_temps(instructions)
+        self._declare_variables(instructions, set(self.temps))
+        code = []
+        for idx, inst in enumerate(instructions):
+            op = inst.op
+            if op in {"goto", "if_false"}:
+                target = labels.get(inst.result, idx + 1)
+                code.append((op, self._operand(inst.arg1), -1, 0, target))
+            elif op in {"label", "print", "print_nl"}:
+                code.append((op, self._operand(inst.arg1), -1, 0, None))
+            else:
+                code.append((op, self._operand(inst.arg1), self._operand(inst.arg2), self._name(inst.result), inst.result))
+        defaults = [_parse_literal(name) for name in self.variable_names]
+        return LoweredProgram(code, self.variable_names, self.variable_types, defaults, self.registers, temp_registers)
+
+
+def lower_instructions(instructions: List[TACInstruction]) -> LoweredProgram:
+    return _Lowering().lower(instructions)
+
+
+EXECUTION_MODES = ("loop", "threaded", "python")
+
+# The operators TACExecutor._binary knows, as functions; any exception one
+# raises becomes a runtime error and a None result, as it does there.
+BINARY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+    "^": operator.pow,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "&&": lambda a, b: bool(a) and bool(b),
+    "||": lambda a, b: bool(a) or bool(b),
+}
+
+
+class ProgramIO:
+    # Input, output and runtime errors of one run, shared by every way of
+    # executing a program.
     def __init__(
         self,
-        instructions: List[TACInstruction],
         inputs: Optional[List[str]] = None,
         input_callback: Optional[callable] = None,
         output_callback: Optional[callable] = None,
     ) -> None:
-        self.instructions = instructions
         self.inputs = list(inputs) if inputs is not None else []
         self.input_callback = input_callback
         self.output_callback = output_callback
-        self.env: Dict[str, Any] = {}
         self.output_parts: List[str] = []
         self.errors: List[str] = []
-        self.labels = self._index_labels()
 
-    def _index_labels(self) -> Dict[str, int]:
-        labels: Dict[str, int] = {}
-        for idx, inst in enumerate(self.instructions):
-            if inst.op == "label" and inst.result:
-                labels[inst.result] = idx
-        return labels
-
-    def _resolve(self, value: Any) -> Any:
-        if isinstance(value, str):
-            value = self._strip_quotes(value)
-            if value.lower() in {"true", "false"}:
-                return value.lower() == "true"
-            if value in self.env:
-                return self.env[value]
+    def _read_input(self, name: Any) -> Any:
+        if self.inputs:
+            raw = self.inputs.pop(0)
+        elif self.input_callback:
+            raw = self.input_callback(f"cin >> {name}: ")
+        else:
+            raw = input(f"Ingrese valor para {name}: ")
+        return self._auto_cast(raw)
+
+    def _print(self, value: Any) -> None:
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        self._write(str(value))
+
+    def _write(self, text: str) -> None:
+        self.output_parts.append(text)
+        if self.output_callback:
             try:
-                return int(value)
+                self.output_callback(text)
             except Exception:
+                pass
+
+    def _auto_cast(self, raw: str) -> Any:
+        text = raw.strip()
+        if text.lower() in {"true", "false"}:
+            return text.lower() == "true"
+        try:
+            return int(text)
+        except Exception:
+            try:
+                return float(text)
+            except Exception:
+                return text
+
+
+class TACExecutor(ProgramIO):
+    def __init__(
+        self,
+        instructions: List[TACInstruction],
+        inputs: Optional[List[str]] = None,
+        input_callback: Optional[callable] = None,
+        output_callback: Optional[callable] = None,
+        mode: str = "loop",
+        cache_dir: Optional[str] = None,
+    ) -> None:
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Modo de ejecucion desconocido: '{mode}'. Opciones: {', '.join(EXECUTION_MODES)}")
+        self.instructions = instructions
+        self.mode = mode
+        self.cache_dir = cache_dir
+        super().__init__(inputs, input_callback, output_callback)
+        self.threaded_code: Optional[List[Any]] = None
+        self.program = lower_instructions(instructions)
+        self.registers: List[Any] = list(self.program.registers)
+        self._allocate_variables()
+
+    def _allocate_variables(self) -> None:
+        # `cells[n]` is (array, index, type) for a typed variable and
+        # (None, 0, None) for one that is always boxed. `typed[n]` says whether
+        # the array or `boxed[n]` holds the value; `bound[n]` whether it has
+        # been written, which is what declare and the result look at.
+        types = self.program.variable_types
+        self.storage: Dict[str, Any] = {}
+        for sym_type in set(types) - {None}:
+            typecode, _ = VARIABLE_STORAGE[sym_type]
+            count = types.count(sym_type)
+            self.storage[sym_type] = bytearray(count) if typecode is None else array(typecode, [0]) * count
+        used = dict.fromkeys(self.storage, 0)
+        self.cells: List[Tuple[Any, int, Optional[type]]] = []
+        for sym_type in types:
+            if sym_type is None:
+                self.cells.append((None, 0, None))
+            else:
+                self.cells.append((self.storage[sym_type], used[sym_type], VARIABLE_STORAGE[sym_type][1]))
+                used[sym_type] += 1
+        self.boxed: List[Any] = list(self.program.variable_defaults)
+        self.typed = bytearray(len(types))
+        self.bound = bytearray(len(types))
+        self.load, self.store = self._accessors()
+
+    def _accessors(self) -> Tuple[Any, Any]:
+        # Closures over the storage, so the run loop pays no attribute lookups.
+        cells, boxed, typed, bound = self.cells, self.boxed, self.typed, self.bound
+
+        def load(var: int) -> Any:
+            if typed[var]:
+                home, index, kind = cells[var]
+                return home[index] if kind is not bool else home[index] == 1
+            return boxed[var]
+
+        def store(var: int, value: Any) -> None:
+            home, index, kind = cells[var]
+            bound[var] = 1
+            if type(value) is kind:
                 try:
-                    return float(value)
-                except Exception:
-                    return value
-        return value
-
-    def _strip_quotes(self, text: str) -> str:
-        while len(text) >= 2 and (
-            (text[0] == '"' and text[-1] == '"') or (text[0] == "'" and text[-1] == "'")
-        ):
-            text = text[1:-1]
-        return text
+                    home[index] = value
+                    typed[var] = 1
+                    boxed[var] = None
+                    return
+                except OverflowError:
+                    pass
+            boxed[var] = value
+            typed[var] = 0
+
+        return load, store
 
     def _binary(self, op: str, a: Any, b: Any) -> Any:
         if op in {"+", "-", "*", "/", "%", "^"}:
@@ -360,87 +853,215 @@ class TACExecutor:
         return None
 
     def run(self) -> ExecutionResult:
+        if self.mode == "threaded":
+            self._run_threaded()
+        elif self.mode == "python":
+            # Imported here: the backend builds on this module.
+            from backend import run_compiled
+
+            run_compiled(self, self.cache_dir)
+        else:
+            self._run_loop()
+        return ExecutionResult(output="".join(self.output_parts), variables=self.variables(), errors=self.errors)
+
+    def _run_loop(self) -> None:
+        code = self.program.code
+        registers = self.registers
+        load = self.load
+        store = self.store
+        bound = self.bound
         pc = 0
-        n = len(self.instructions)
+        n = len(code)
         while pc < n:
-            inst = self.instructions[pc]
-            op = inst.op
+            op, arg1, arg2, result, target = code[pc]
             if op == "label":
                 pc += 1
                 continue
             if op == "goto":
-                pc = self.labels.get(inst.result, pc + 1)
+                pc = target
                 continue
             if op == "if_false":
-                cond = self._resolve(inst.arg1)
-                if not cond:
-                    pc = self.labels.get(inst.result, pc + 1)
+                if not (registers[arg1] if arg1 >= 0 else load(~arg1)):
+                    pc = target
                 else:
                     pc += 1
                 continue
             if op == "declare":
-                if inst.result not in self.env:
-                    self.env[inst.result] = None
+                if not bound[~result]:
+                    store(~result, None)
                 pc += 1
                 continue
             if op == "input":
-                if self.inputs:
-                    raw = self.inputs.pop(0)
-                elif self.input_callback:
-                    raw = self.input_callback(f"cin >> {inst.result}: ")
-                else:
-                    raw = input(f"Ingrese valor para {inst.result}: ")
-                value = self._auto_cast(raw)
-                self.env[inst.result] = value
+                store(~result, self._read_input(target))
                 pc += 1
                 continue
             if op == "print":
-                value = self._resolve(inst.arg1)
-                if isinstance(value, bool):
-                    value = "true" if value else "false"
-                self.output_parts.append(str(value))
-                if self.output_callback:
-                    try:
-                        self.output_callback(str(value))
-                    except Exception:
-                        pass
+                self._print(registers[arg1] if arg1 >= 0 else load(~arg1))
                 pc += 1
                 continue
             if op == "print_nl":
-                self.output_parts.append("\n")
-                if self.output_callback:
-                    try:
-                        self.output_callback("\n")
-                    except Exception:
-                        pass
+                self._write("\n")
                 pc += 1
                 continue
+            a = registers[arg1] if arg1 >= 0 else load(~arg1)
             if op == "=":
-                value = self._resolve(inst.arg1)
-                self.env[inst.result] = value
-                pc += 1
-                continue
-            if op == "!":
-                value = not bool(self._resolve(inst.arg1))
-                self.env[inst.result] = value
-                pc += 1
-                continue
-            value = self._binary(op, self._resolve(inst.arg1), self._resolve(inst.arg2))
-            self.env[inst.result] = value
+                value = a
+            elif op == "!":
+                value = not bool(a)
+            else:
+                value = self._binary(op, a, registers[arg2] if arg2 >= 0 else load(~arg2))
+            if result >= 0:
+                registers[result] = value
+            else:
+                store(~result, value)
             pc += 1
-        return ExecutionResult(output="".join(self.output_parts), variables=dict(self.env), errors=self.errors)
 
-    def _auto_cast(self, raw: str) -> Any:
-        text = raw.strip()
-        if text.lower() in {"true", "false"}:
-            return text.lower() == "true"
-        try:
-            return int(text)
-        except Exception:
+    def _run_threaded(self) -> None:
+        if self.threaded_code is None:
+            self.threaded_code = self.compile()
+        code = self.threaded_code
+        pc = 0
+        n = len(code)
+        while pc < n:
+            pc = code[pc]()
+
+    def compile(self) -> List[Any]:
+        # Turns each lowered instruction into a closure over this executor's
+        # registers and variables that does that instruction's work and returns
+        # the index of the next one. Operands are bound as C-level partials, so
+        # a step does no decoding; jumps land past any run of labels.
+        code = self.program.code
+        n = len(code)
+        landing = list(range(n + 1))
+        for idx in range(n - 1, -1, -1):
+            if code[idx][0] == "label":
+                landing[idx] = landing[idx + 1]
+        return [self._compile_step(inst, landing[idx + 1], landing) for idx, inst in enumerate(code)]
+
+    def _reader(self, operand: int) -> Any:
+        if operand >= 0:
+            return partial(self.registers.__getitem__, operand)
+        return partial(self.load, ~operand)
+
+    def _writer(self, result: int) -> Any:
+        if result >= 0:
+            return partial(self.registers.__setitem__, result)
+        return partial(self.store, ~result)
+
+    def _compile_step(self, inst: Tuple[str, int, int, int, Any], nxt: int, landing: List[int]) -> Any:
+        op, arg1, arg2, result, target = inst
+        if op == "label":
+            return lambda: nxt
+        if op == "goto":
+            target = landing[target]
+            return lambda: target
+        registers, load = self.registers, self.load
+        if op == "if_false":
+            target = landing[target]
+            if arg1 >= 0:
+                return lambda: nxt if registers[arg1] else target
+            cond = self._reader(arg1)
+            return lambda: nxt if cond() else target
+        if op == "declare":
+            bound, store, var = self.bound, self.store, ~result
+
+            def declare() -> int:
+                if not bound[var]:
+                    store(var, None)
+                return nxt
+            return declare
+        if op == "input":
+            read_input, write = self._read_input, self._writer(result)
+
+            def read() -> int:
+                write(read_input(target))
+                return nxt
+            return read
+        if op == "print":
+            emit, value = self._print, self._reader(arg1)
+
+            def print_value() -> int:
+                emit(value())
+                return nxt
+            return print_value
+        if op == "print_nl":
+            write_text = self._write
+            return lambda: write_text("\n") or nxt
+        read_a, write = self._reader(arg1), self._writer(result)
+        if op == "=":
+            if arg1 >= 0 and result < 0:
+                store, var = self.store, ~result
+
+                def assign_register() -> int:
+                    store(var, registers[arg1])
+                    return nxt
+                return assign_register
+            return lambda: write(read_a()) or nxt
+        if op == "!":
+            return lambda: write(not bool(read_a())) or nxt
+        fn = BINARY_OPERATORS.get(op)
+        if fn is None:
+            return lambda: write(None) or nxt
+        read_b, errors = self._reader(arg2), self.errors
+        # Expression temps always land in registers; the operand shapes get a
+        # step each so that a register read stays a plain index.
+        if result >= 0 and arg1 >= 0 and arg2 >= 0:
+            def binary_registers() -> int:
+                try:
+                    registers[result] = fn(registers[arg1], registers[arg2])
+                except Exception as exc:
+                    errors.append(str(exc))
+                    registers[result] = None
+                return nxt
+            return binary_registers
+        if result >= 0 and arg2 >= 0:
+            var_a = ~arg1
+
+            def binary_variable_register() -> int:
+                try:
+                    registers[result] = fn(load(var_a), registers[arg2])
+                except Exception as exc:
+                    errors.append(str(exc))
+                    registers[result] = None
+                return nxt
+            return binary_variable_register
+        if result >= 0 and arg1 >= 0:
+            var_b = ~arg2
+
+            def binary_register_variable() -> int:
+                try:
+                    registers[result] = fn(registers[arg1], load(var_b))
+                except Exception as exc:
+                    errors.append(str(exc))
+                    registers[result] = None
+                return nxt
+            return binary_register_variable
+        if result >= 0:
+            var_a, var_b = ~arg1, ~arg2
+
+            def binary_variables() -> int:
+                try:
+                    registers[result] = fn(load(var_a), load(var_b))
+                except Exception as exc:
+                    errors.append(str(exc))
+                    registers[result] = None
+                return nxt
+            return binary_variables
+
+        def binary() -> int:
             try:
-                return float(text)
-            except Exception:
-                return text
+                value = fn(read_a(), read_b())
+            except Exception as exc:
+                errors.append(str(exc))
+                value = None
+            write(value)
+            return nxt
+        return binary
+
+    def variables(self) -> Dict[Any, Any]:
+        # Only user variables are materialised; temps never leave the registers.
+        names = self.program.variable_names
+        return {names[var]: self.load(var) for var, written in enumerate(self.bound) if written}
 
 
 def ejecutar_codigo_intermedio(
@@ -448,11 +1069,15 @@ def ejecutar_codigo_intermedio(
     inputs: Optional[List[str]] = None,
     input_callback: Optional[callable] = None,
     output_callback: Optional[callable] = None,
+    mode: str = "loop",
+    cache_dir: Optional[str] = None,
 ) -> ExecutionResult:
     executor = TACExecutor(
         instructions,
         inputs=inputs,
         input_callback=input_callback,
         output_callback=output_callback,
+        mode=mode,
+        cache_dir=cache_dir,
     )
     return executor.run()
@@ -1,3 +1,12 @@
+import bisect
+import codecs
+import io
+import os
+import re
+import sys
+from array import array
+from collections import deque
+
 RESERVADAS = {
     "if", "else", "end", "do", "while", "then", "until", "switch", "case",
     "int", "float", "main", "cin", "cout", "true", "false", "bool"
@@ -28,203 +37,924 @@ OPERADORES = {
 
 DELIMITADORES = {"(", ")", "{", "}", ",", ";"}
 
+MOTORES = ("escalar", "regex", "numpy")
+
 def es_letra(c):
     return c.isalpha() or c == "_"
 
 def es_digito(c):
     return c.isdigit()
 
-def analizar_codigo_fuente(codigo):
-    tokens = []
+TIPOS_TOKEN = (
+    "IDENTIFICADOR", "RESERVADA", "NUM_ENTERO", "NUM_FLOTANTE", "CADENA", "COMENTARIO",
+    "OP_ARITMETICO", "OP_RELACIONAL", "OP_LOGICO", "ASIGNACION", "OP_ENTRADA_SALIDA",
+    "DELIMITADOR", "ERROR"
+)
+
+CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS_TOKEN)}
+_CODIGO_COMENTARIO = CODIGO_TIPO["COMENTARIO"]
+
+# Identificador entero de cada lexema fijo (palabras reservadas, operadores y
+# delimitadores); 0 para cualquier otro lexema.
+LEXEMAS_FIJOS = (None,) + tuple(sorted(RESERVADAS)) + tuple(OPERADORES) + tuple(sorted(DELIMITADORES))
+CODIGO_LEXEMA = {lexema: clave for clave, lexema in enumerate(LEXEMAS_FIJOS) if lexema}
+
+class Token:
+    __slots__ = ("lexema", "tipo", "linea", "columna", "inicio")
+
+    def __init__(self, lexema, tipo, linea, columna, inicio=-1):
+        self.lexema = lexema
+        self.tipo = tipo
+        self.linea = linea
+        self.columna = columna
+        self.inicio = inicio
+
+    def __getitem__(self, clave):
+        # Acceso estilo diccionario para el código que aún usa token["tipo"].
+        if clave in Token.__slots__:
+            return getattr(self, clave)
+        raise KeyError(clave)
+
+    def __eq__(self, otro):
+        if isinstance(otro, Token):
+            return (self.lexema, self.tipo, self.linea, self.columna) == (otro.lexema, otro.tipo, otro.linea, otro.columna)
+        if isinstance(otro, dict):
+            return self.como_diccionario() == otro
+        return NotImplemented
+
+    @property
+    def codigo(self):
+        return CODIGO_TIPO[self.tipo]
+
+    @property
+    def clave(self):
+        return CODIGO_LEXEMA.get(self.lexema, 0)
+
+    def __repr__(self):
+        return f"Token({self.lexema!r}, {self.tipo}, {self.linea}, {self.columna})"
+
+    def como_diccionario(self):
+        return {"lexema": self.lexema, "tipo": self.tipo, "linea": self.linea, "columna": self.columna}
+
+class IndiceLineas:
+    # Offsets de inicio de cada línea (la línea n empieza en inicios[n - 1]). Los
+    # motores sólo registran offsets; línea y columna se resuelven con bisect
+    # cuando alguien las pide.
+    __slots__ = ("inicios",)
+
+    def __init__(self, inicios=None):
+        self.inicios = array("q", [0]) if inicios is None else inicios
+
+    @classmethod
+    def desde_texto(cls, texto):
+        inicios = array("q", [0])
+        i = texto.find("\n")
+        while i != -1:
+            inicios.append(i + 1)
+            i = texto.find("\n", i + 1)
+        return cls(inicios)
+
+    def agregar(self, posicion):
+        self.inicios.append(posicion)
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def linea(self, posicion):
+        return bisect.bisect_right(self.inicios, posicion)
+
+    def columna(self, posicion):
+        return posicion - self.inicios[bisect.bisect_right(self.inicios, posicion) - 1] + 1
+
+    def posicion(self, posicion):
+        fila = bisect.bisect_right(self.inicios, posicion)
+        return fila, posicion - self.inicios[fila - 1] + 1
+
+class TokenStream:
+    # Con `indice` las columnas de línea y columna se calculan a demanda a partir
+    # de los offsets; sin él se guardan tal como llegan a agregar().
+    __slots__ = ("lexemas", "tipos", "inicios", "indice", "_lineas", "_columnas", "_claves")
+
+    def __init__(self, indice=None):
+        self.lexemas = []
+        self.tipos = array("i")
+        self.inicios = array("q")
+        self.indice = indice
+        self._lineas = array("i") if indice is None else None
+        self._columnas = array("i") if indice is None else None
+        self._claves = None
+
+    def agregar(self, lexema, tipo, linea, columna, inicio=-1):
+        self.lexemas.append(sys.intern(lexema))
+        self.tipos.append(CODIGO_TIPO[tipo])
+        self._lineas.append(linea)
+        self._columnas.append(columna)
+        self.inicios.append(inicio)
+
+    def agregar_en(self, lexema, tipo, inicio):
+        self.lexemas.append(sys.intern(lexema))
+        self.tipos.append(CODIGO_TIPO[tipo])
+        self.inicios.append(inicio)
+
+    def _posicion(self, i):
+        # Un comentario de bloque se informa en la línea donde termina.
+        inicio = self.inicios[i]
+        fila, columna = self.indice.posicion(inicio)
+        if self.tipos[i] == _CODIGO_COMENTARIO:
+            fila = self.indice.linea(inicio + len(self.lexemas[i]) - 1)
+        return fila, columna
+
+    def _resolver(self):
+        if self._lineas is None:
+            self._lineas = array("i")
+            self._columnas = array("i")
+        lineas, columnas = self._lineas, self._columnas
+        for i in range(len(lineas), len(self.lexemas)):
+            fila, columna = self._posicion(i)
+            lineas.append(fila)
+            columnas.append(columna)
+
+    @property
+    def lineas(self):
+        if self._lineas is None or len(self._lineas) < len(self.lexemas):
+            self._resolver()
+        return self._lineas
+
+    @lineas.setter
+    def lineas(self, valores):
+        self._lineas = valores
+
+    @property
+    def columnas(self):
+        if self._columnas is None or len(self._columnas) < len(self.lexemas):
+            self._resolver()
+        return self._columnas
+
+    @columnas.setter
+    def columnas(self, valores):
+        self._columnas = valores
+
+    @property
+    def claves(self):
+        # Se deriva de los lexemas una sola vez, cuando el parser la necesita.
+        claves = self._claves
+        if claves is None or len(claves) < len(self.lexemas):
+            obtener = CODIGO_LEXEMA.get
+            claves = self._claves = array("H", [obtener(lexema, 0) for lexema in self.lexemas])
+        return claves
+
+    def __len__(self):
+        return len(self.lexemas)
+
+    def token(self, i):
+        if self._lineas is not None and i < len(self._lineas):
+            fila, columna = self._lineas[i], self._columnas[i]
+        else:
+            fila, columna = self._posicion(i)
+        return Token(self.lexemas[i], TIPOS_TOKEN[self.tipos[i]], fila, columna, self.inicios[i])
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.lexemas)
+        if not 0 <= i < len(self.lexemas):
+            raise IndexError("índice de token fuera de rango")
+        return self.token(i)
+
+    def __iter__(self):
+        for i in range(len(self.lexemas)):
+            yield self.token(i)
+
+    def __eq__(self, otro):
+        if not isinstance(otro, TokenStream):
+            return NotImplemented
+        return (self.lexemas == otro.lexemas and self.tipos == otro.tipos
+                and self.lineas == otro.lineas and self.columnas == otro.columnas)
+
+    def tipo(self, i):
+        return TIPOS_TOKEN[self.tipos[i]]
+
+    def filtrar(self, excluidos=("COMENTARIO", "ERROR")):
+        codigos = {CODIGO_TIPO[tipo] for tipo in excluidos}
+        resuelto = self._lineas is not None and len(self._lineas) == len(self.lexemas)
+        flujo = TokenStream(None if resuelto else self.indice)
+        flujo.indice = self.indice
+        for i, codigo in enumerate(self.tipos):
+            if codigo not in codigos:
+                flujo.lexemas.append(self.lexemas[i])
+                flujo.tipos.append(codigo)
+                flujo.inicios.append(self.inicios[i])
+                if resuelto:
+                    flujo._lineas.append(self._lineas[i])
+                    flujo._columnas.append(self._columnas[i])
+        return flujo
+
+    def como_diccionarios(self):
+        return [
+            {"lexema": lexema, "tipo": TIPOS_TOKEN[tipo], "linea": linea, "columna": columna}
+            for lexema, tipo, linea, columna in zip(self.lexemas, self.tipos, self.lineas, self.columnas)
+        ]
+
+    @classmethod
+    def desde_diccionarios(cls, tokens):
+        flujo = cls()
+        for t in tokens:
+            flujo.agregar(t["lexema"], t["tipo"], t["linea"], t["columna"])
+        return flujo
+
+def analizar_flujo(codigo, motor="escalar"):
+    if motor == "escalar":
+        analizar = _analizar_escalar
+    elif motor == "regex":
+        analizar = _analizar_regex
+    elif motor == "numpy":
+        analizar = _analizar_numpy
+    else:
+        raise ValueError(f"Motor léxico desconocido: '{motor}'. Opciones: {', '.join(MOTORES)}")
+    return analizar(codigo)
+
+def analizar_codigo_fuente(codigo, motor="escalar"):
+    flujo, errores = analizar_flujo(codigo, motor)
+    return flujo.como_diccionarios(), errores
+
+def _analizar_escalar(codigo):
+    # Sólo se registran offsets: los saltos de línea contados van al índice y la
+    # línea/columna de cada token se resuelve después, cuando se pide.
+    indice = IndiceLineas()
+    flujo = TokenStream(indice)
+    agregar = flujo.agregar_en
+    nueva_linea = indice.agregar
     errores = []
     i = 0
-    fila = 1
-    columna = 1
     longitud = len(codigo)
     notValidNumber = False
 
     while i < longitud:
         c = codigo[i]
+        inicio = i
 
         if c in " \t":
             i += 1
-            columna += 1
             continue
 
         if c == "\n":
-            fila += 1
-            columna = 1
             i += 1
+            nueva_linea(i)
             continue
 
         if c == "/" and i + 1 < longitud and codigo[i + 1] == "/":
-            inicio_col = columna
-            lexema = "//"
-            i += 2
-            columna += 2
-            while i < longitud and codigo[i] != "\n":
-                lexema += codigo[i]
-                i += 1
-                columna += 1
-            tokens.append({"lexema": lexema, "tipo": "COMENTARIO", "linea": fila, "columna": inicio_col})
+            i = codigo.find("\n", i + 2)
+            if i == -1:
+                i = longitud
+            agregar(codigo[inicio:i], "COMENTARIO", inicio)
             continue
 
         if c == "/" and i + 1 < longitud and codigo[i + 1] == "*":
-            inicio_col = columna
-            lexema = "/*"
-            i += 2
-            columna += 2
-            cerrado = False
-            while i < longitud:
-                if codigo[i] == "*" and i + 1 < longitud and codigo[i + 1] == "/":
-                    lexema += "*/"
-                    i += 2
-                    columna += 2
-                    cerrado = True
-                    break
-                lexema += codigo[i]
-                if codigo[i] == "\n":
-                    fila += 1
-                    columna = 1
-                else:
-                    
-                    columna += 1
-                i += 1
-            if cerrado:
-                tokens.append({"lexema": lexema, "tipo": "COMENTARIO", "linea": fila, "columna": inicio_col})
+            cierre = codigo.find("*/", i + 2)
+            i = longitud if cierre == -1 else cierre + 2
+            salto = codigo.find("\n", inicio + 2, i)
+            while salto != -1:
+                nueva_linea(salto + 1)
+                salto = codigo.find("\n", salto + 1, i)
+            if cierre != -1:
+                agregar(codigo[inicio:i], "COMENTARIO", inicio)
             else:
-                errores.append({"linea": fila, "columna": inicio_col, "descripcion": "Comentario multilínea no cerrado", "valor": lexema})
+                errores.append({"linea": indice.linea(i), "columna": indice.columna(inicio), "descripcion": "Comentario multilínea no cerrado", "valor": codigo[inicio:i]})
             continue
 
 
         if c == '"':
-            inicio_col = columna
-            lexema = c
-            i += 1
-            columna += 1
-            while i < longitud and codigo[i] != '"':
-                lexema += codigo[i]
-                i += 1
-                columna += 1
-            if i < longitud:
-                lexema += codigo[i]
-                i += 1
-                columna += 1
-                tokens.append({"lexema": lexema, "tipo": "CADENA", "linea": fila, "columna": inicio_col})
+            cierre = codigo.find('"', i + 1)
+            if cierre != -1:
+                i = cierre + 1
+                agregar(codigo[inicio:i], "CADENA", inicio)
             else:
-                errores.append({"linea": fila, "columna": inicio_col, "descripcion": "Cadena no cerrada", "valor": lexema})
+                i = longitud
+                fila, columna = indice.posicion(inicio)
+                errores.append({"linea": fila, "columna": columna, "descripcion": "Cadena no cerrada", "valor": codigo[inicio:i]})
             continue
 
 
         if i + 1 < longitud and codigo[i:i+2] in ("<<", ">>"):
-            lexema = codigo[i:i+2]
-            tokens.append({"lexema": lexema, "tipo": "OP_ENTRADA_SALIDA", "linea": fila, "columna": columna})
+            agregar(codigo[i:i+2], "OP_ENTRADA_SALIDA", inicio)
             i += 2
-            columna += 2
             continue
-        elif codigo[i] in ("<", ">", "=", "!"):
-            lexema = codigo[i]
+        elif c in ("<", ">", "=", "!"):
             i += 1
-            columna += 1
             if i < longitud and codigo[i] in ("=", ">"):
-                lexema += codigo[i]
                 i += 1
-                columna += 1
+            lexema = codigo[inicio:i]
             tipo = "OP_RELACIONAL" if lexema in ("<", ">", "<=", ">=", "==", "!=") else "ASIGNACION"
-            tokens.append({"lexema": lexema, "tipo": tipo, "linea": fila, "columna": columna - len(lexema)})
+            agregar(lexema, tipo, inicio)
             continue
 
         if c.isdigit():
-            inicio_col = columna
-            lexema = c
             i += 1
-            columna += 1
             tiene_punto = False
             while i < longitud and (codigo[i].isdigit() or (codigo[i] == '.' and not tiene_punto)):
                 if codigo[i] == '.':
                     if i + 1 < longitud and codigo[i + 1].isdigit():
-                        lexema += codigo[i]
                         tiene_punto = True
                         i += 1
-                        columna += 1
                     else:
-                        lexema += codigo[i]
                         notValidNumber = True
                         break
-                lexema += codigo[i]
                 i += 1
-                columna += 1
-            if notValidNumber: tipo="ERROR"
-            else: tipo = "NUM_FLOTANTE" if tiene_punto else "NUM_ENTERO"
-            tokens.append({"lexema": lexema, "tipo": tipo, "linea": fila, "columna": inicio_col})
+            if notValidNumber:
+                agregar(codigo[inicio:i + 1], "ERROR", inicio)
+            else:
+                agregar(codigo[inicio:i], "NUM_FLOTANTE" if tiene_punto else "NUM_ENTERO", inicio)
             continue
 
         if es_letra(c):
-            inicio_col = columna
-            lexema = c
             i += 1
-            columna += 1
             while i < longitud and (es_letra(codigo[i]) or es_digito(codigo[i])):
-                lexema += codigo[i]
                 i += 1
-                columna += 1
-            tipo = "RESERVADA" if lexema in RESERVADAS else "IDENTIFICADOR"
-            tokens.append({"lexema": lexema, "tipo": tipo, "linea": fila, "columna": inicio_col})
+            lexema = codigo[inicio:i]
+            agregar(lexema, "RESERVADA" if lexema in RESERVADAS else "IDENTIFICADOR", inicio)
             continue
 
         if i + 1 < longitud and codigo[i:i+2] in OPERADORES:
             lexema = codigo[i:i+2]
-            tokens.append({"lexema": lexema, "tipo": OPERADORES[lexema], "linea": fila, "columna": columna})
+            agregar(lexema, OPERADORES[lexema], inicio)
             i += 2
-            columna += 2
             continue
 
         if c in OPERADORES:
-            tokens.append({"lexema": c, "tipo": OPERADORES[c], "linea": fila, "columna": columna})
+            agregar(c, OPERADORES[c], inicio)
             i += 1
-            columna += 1
             continue
 
         if c in DELIMITADORES:
-            tokens.append({"lexema": c, "tipo": "DELIMITADOR", "linea": fila, "columna": columna})
+            agregar(c, "DELIMITADOR", inicio)
             i += 1
-            columna += 1
             continue
 
+        fila, columna = indice.posicion(i)
         if notValidNumber:
             errores.append({"linea": fila, "columna": columna, "descripcion": f"Se uso un punto de forma erronea: '{c}'", "valor": c})
             notValidNumber =False
         else:
             errores.append({"linea": fila, "columna": columna, "descripcion": f"Carácter no reconocido: '{c}'", "valor": c})
-            tipo = "ERROR"
-            tokens.append({"lexema": c, "tipo": tipo, "linea": fila, "columna": columna})
+            agregar(c, "ERROR", inicio)
+        i += 1
+
+    return flujo, errores
+
+def _alternativa(lexemas):
+    return "|".join(re.escape(l) for l in sorted(lexemas, key=len, reverse=True))
+
+def _construir_patron_maestro():
+    # El orden de las alternativas reproduce el orden de las ramas del motor escalar.
+    entrada_salida = [op for op, tipo in OPERADORES.items() if tipo == "OP_ENTRADA_SALIDA"]
+    restantes = [op for op in OPERADORES if op not in entrada_salida and op[0] not in "<>=!"]
+    alternativas = [
+        r"(?P<espacio>[ \t]+)",
+        r"(?P<salto>\n)",
+        r"(?P<linea>//[^\n]*)",
+        r"(?P<bloque>/\*(?s:.*?)\*/)",
+        r"(?P<bloque_abierto>/\*(?s:.*))",
+        r'(?P<cadena>"[^"]*")',
+        r'(?P<cadena_abierta>"[^"]*)',
+        f"(?P<entrada_salida>{_alternativa(entrada_salida)})",
+        r"(?P<relacional>[<>=!][=>]?)",
+        r"(?P<numero>[0-9]+(?:\.[0-9]+|(?P<punto>\.))?)",
+        r"(?P<identificador>[A-Za-z_][A-Za-z0-9_]*)",
+        f"(?P<operador>{_alternativa(restantes)})",
+        f"(?P<delimitador>{_alternativa(DELIMITADORES)})",
+        r"(?P<otro>.)",
+    ]
+    return re.compile("|".join(alternativas))
+
+PATRON_MAESTRO = _construir_patron_maestro()
+
+def _escanear_numero(codigo, i):
+    longitud = len(codigo)
+    i += 1
+    tiene_punto = False
+    while i < longitud:
+        c = codigo[i]
+        if c.isdigit():
+            i += 1
+        elif c == "." and not tiene_punto:
+            if i + 1 < longitud and codigo[i + 1].isdigit():
+                tiene_punto = True
+                i += 2
+            else:
+                return i + 1, False, True
+        else:
+            break
+    return i, tiene_punto, False
+
+def _escanear_identificador(codigo, i):
+    longitud = len(codigo)
+    while i < longitud and (es_letra(codigo[i]) or es_digito(codigo[i])):
         i += 1
-        columna += 1
+    return i
+
+def _agregar_numero(agregar, reportar, lexema, tiene_punto, invalido, fila, columna, inicio):
+    if invalido:
+        agregar(lexema, "ERROR", fila, columna, inicio)
+        reportar(fila, columna + len(lexema) - 1, "Se uso un punto de forma erronea: '.'", ".", inicio + len(lexema) - 1)
+    else:
+        agregar(lexema, "NUM_FLOTANTE" if tiene_punto else "NUM_ENTERO", fila, columna, inicio)
 
-    return tokens, errores
+def _reportador(errores):
+    def reportar(linea, columna, descripcion, valor, inicio):
+        errores.append({"linea": linea, "columna": columna, "descripcion": descripcion, "valor": valor})
+    return reportar
+
+def _analizar_regex(codigo):
+    flujo = TokenStream()
+    errores = []
+    _escanear_regex(codigo, 0, 1, 0, True, flujo.agregar, _reportador(errores))
+    return flujo, errores
+
+def _escanear_regex(codigo, i, fila, inicio_linea, final, agregar, reportar, sincronizar=None):
+    # Con final=False se detiene antes de cualquier lexema que toque el final del
+    # texto, porque el siguiente fragmento podría extenderlo; devuelve el estado
+    # (posición, fila, inicio de línea) para reanudar. sincronizar(posición, fila)
+    # se consulta al inicio de cada línea y detiene el escaneo si devuelve True.
+    coincidir = PATRON_MAESTRO.match
+    longitud = len(codigo)
+
+    while i < longitud:
+        m = coincidir(codigo, i)
+        grupo = m.lastgroup
+        fin = m.end()
+        if fin >= longitud and not final:
+            break
+        columna = i - inicio_linea + 1
+
+        if grupo == "espacio":
+            i = fin
+            continue
+
+        if grupo == "salto":
+            fila += 1
+            inicio_linea = fin
+            i = fin
+            if sincronizar is not None and sincronizar(fin, fila):
+                break
+            continue
+
+        if grupo == "identificador":
+            if fin < longitud and codigo[fin] >= "\x80":
+                fin = _escanear_identificador(codigo, fin)
+                if fin >= longitud and not final:
+                    break
+            lexema = codigo[i:fin]
+            agregar(lexema, "RESERVADA" if lexema in RESERVADAS else "IDENTIFICADOR", fila, columna, i)
+            i = fin
+            continue
+
+        if grupo == "delimitador":
+            agregar(m.group(), "DELIMITADOR", fila, columna, i)
+            i = fin
+            continue
+
+        if grupo == "numero":
+            if fin < longitud and codigo[fin] >= "\x80":
+                fin, tiene_punto, invalido = _escanear_numero(codigo, i)
+                if fin >= longitud and not final:
+                    break
+            else:
+                invalido = m.start("punto") != -1
+                tiene_punto = not invalido and "." in m.group()
+            _agregar_numero(agregar, reportar, codigo[i:fin], tiene_punto, invalido, fila, columna, i)
+            i = fin
+            continue
+
+        if grupo == "relacional":
+            lexema = m.group()
+            tipo = "OP_RELACIONAL" if lexema in ("<", ">", "<=", ">=", "==", "!=") else "ASIGNACION"
+            agregar(lexema, tipo, fila, columna, i)
+            i = fin
+            continue
+
+        if grupo == "operador":
+            lexema = m.group()
+            agregar(lexema, OPERADORES[lexema], fila, columna, i)
+            i = fin
+            continue
+
+        if grupo == "entrada_salida":
+            agregar(m.group(), "OP_ENTRADA_SALIDA", fila, columna, i)
+            i = fin
+            continue
+
+        if grupo == "linea":
+            agregar(m.group(), "COMENTARIO", fila, columna, i)
+            i = fin
+            continue
+
+        if grupo == "bloque" or grupo == "bloque_abierto":
+            lexema = m.group()
+            saltos = lexema.count("\n")
+            if saltos:
+                fila += saltos
+                inicio_linea = i + lexema.rfind("\n") + 1
+            if grupo == "bloque":
+                agregar(lexema, "COMENTARIO", fila, columna, i)
+            else:
+                reportar(fila, columna, "Comentario multilínea no cerrado", lexema, i)
+            i = fin
+            continue
+
+        if grupo == "cadena":
+            agregar(m.group(), "CADENA", fila, columna, i)
+            i = fin
+            continue
+
+        if grupo == "cadena_abierta":
+            reportar(fila, columna, "Cadena no cerrada", m.group(), i)
+            i = fin
+            continue
+
+        c = codigo[i]
+        if c.isdigit():
+            fin, tiene_punto, invalido = _escanear_numero(codigo, i)
+            if fin >= longitud and not final:
+                break
+            _agregar_numero(agregar, reportar, codigo[i:fin], tiene_punto, invalido, fila, columna, i)
+            i = fin
+            continue
+        if es_letra(c):
+            fin = _escanear_identificador(codigo, i + 1)
+            if fin >= longitud and not final:
+                break
+            lexema = codigo[i:fin]
+            agregar(lexema, "RESERVADA" if lexema in RESERVADAS else "IDENTIFICADOR", fila, columna, i)
+            i = fin
+            continue
+        reportar(fila, columna, f"Carácter no reconocido: '{c}'", c, i)
+        agregar(c, "ERROR", fila, columna, i)
+        i += 1
+
+    return i, fila, inicio_linea
+
+_CLASE_ALNUM, _CLASE_ESPACIO, _CLASE_SALTO, _CLASE_OPERADOR, _CLASE_DELIMITADOR, _CLASE_OTRO = range(6)
+
+_OPERADORES_SIMPLES = {op: OPERADORES[op] for op in OPERADORES if len(op) == 1}
+_OPERADORES_SIMPLES.update({"=": "ASIGNACION", "!": "ASIGNACION"})
+
+_tablas_numpy = None
+
+def _cargar_numpy():
+    global _tablas_numpy
+    try:
+        import numpy as np
+    except ImportError as exc:
+        raise ImportError("El motor léxico 'numpy' requiere tener NumPy instalado.") from exc
+    if _tablas_numpy is None:
+        clases = np.full(256, _CLASE_OTRO, dtype=np.uint8)
+        for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_0123456789":
+            clases[ord(c)] = _CLASE_ALNUM
+        clases[ord(" ")] = clases[ord("\t")] = _CLASE_ESPACIO
+        clases[ord("\n")] = _CLASE_SALTO
+        for op in OPERADORES:
+            for c in op:
+                clases[ord(c)] = _CLASE_OPERADOR
+        for c in "&|":
+            clases[ord(c)] = _CLASE_OPERADOR
+        for c in DELIMITADORES:
+            clases[ord(c)] = _CLASE_DELIMITADOR
+        # -1: el operador de un carácter no forma un token por sí solo (& y |).
+        tipos_simples = np.full(256, -1, dtype=np.int32)
+        for op, tipo in _OPERADORES_SIMPLES.items():
+            tipos_simples[ord(op)] = CODIGO_TIPO[tipo]
+        _tablas_numpy = (clases, tipos_simples)
+    return np, _tablas_numpy
+
+def _pasada_compleja(codigo, inicios, fines):
+    # Recorre con el patrón maestro sólo los tramos que la clasificación vectorial
+    # no resuelve: números con punto, operadores de varios caracteres, comentarios,
+    # cadenas, texto no ASCII y caracteres no reconocidos. Las posiciones se
+    # convierten a línea y columna después, en bloque.
+    tokens = []
+    errores = []
+    tramos = []
+    cadenas = []
+    coincidir = PATRON_MAESTRO.match
+    longitud = len(codigo)
+
+    def agregar_numero(inicio, fin, tiene_punto, invalido):
+        if invalido:
+            tokens.append((inicio, fin, CODIGO_TIPO["ERROR"], inicio))
+            errores.append((fin - 1, fin - 1, "Se uso un punto de forma erronea: '.'", ".", fin - 1))
+        else:
+            tokens.append((inicio, fin, CODIGO_TIPO["NUM_FLOTANTE" if tiene_punto else "NUM_ENTERO"], inicio))
+
+    def agregar_identificador(inicio, fin):
+        tipo = "RESERVADA" if codigo[inicio:fin] in RESERVADAS else "IDENTIFICADOR"
+        tokens.append((inicio, fin, CODIGO_TIPO[tipo], inicio))
+
+    i = 0
+    for inicio_tramo, fin_tramo in zip(inicios, fines):
+        if fin_tramo <= i:
+            continue
+        if inicio_tramo > i:
+            i = inicio_tramo
+        while i < fin_tramo:
+            m = coincidir(codigo, i)
+            grupo = m.lastgroup
+            fin = m.end()
+            if grupo == "espacio" or grupo == "salto":
+                pass
+            elif grupo == "identificador":
+                if fin < longitud and codigo[fin] >= "\x80":
+                    fin = _escanear_identificador(codigo, fin)
+                agregar_identificador(i, fin)
+            elif grupo == "numero":
+                if fin < longitud and codigo[fin] >= "\x80":
+                    fin, tiene_punto, invalido = _escanear_numero(codigo, i)
+                else:
+                    invalido = m.start("punto") != -1
+                    tiene_punto = not invalido and "." in m.group()
+                agregar_numero(i, fin, tiene_punto, invalido)
+            elif grupo == "relacional":
+                tipo = "OP_RELACIONAL" if m.group() in ("<", ">", "<=", ">=", "==", "!=") else "ASIGNACION"
+                tokens.append((i, fin, CODIGO_TIPO[tipo], i))
+            elif grupo == "operador":
+                tokens.append((i, fin, CODIGO_TIPO[OPERADORES[m.group()]], i))
+            elif grupo == "entrada_salida":
+                tokens.append((i, fin, CODIGO_TIPO["OP_ENTRADA_SALIDA"], i))
+            elif grupo == "delimitador":
+                tokens.append((i, fin, CODIGO_TIPO["DELIMITADOR"], i))
+            elif grupo == "linea":
+                tokens.append((i, fin, CODIGO_TIPO["COMENTARIO"], i))
+                tramos.append((i, fin))
+            elif grupo == "bloque":
+                tokens.append((i, fin, CODIGO_TIPO["COMENTARIO"], fin - 1))
+                tramos.append((i, fin))
+            elif grupo == "bloque_abierto":
+                errores.append((fin, i, "Comentario multilínea no cerrado", m.group(), i))
+                tramos.append((i, fin))
+            elif grupo == "cadena":
+                tokens.append((i, fin, CODIGO_TIPO["CADENA"], i))
+                tramos.append((i, fin))
+                cadenas.append((i, fin))
+            elif grupo == "cadena_abierta":
+                errores.append((i, i, "Cadena no cerrada", m.group(), i))
+                tramos.append((i, fin))
+                cadenas.append((i, fin))
+            else:
+                c = codigo[i]
+                if c.isdigit():
+                    fin, tiene_punto, invalido = _escanear_numero(codigo, i)
+                    agregar_numero(i, fin, tiene_punto, invalido)
+                elif es_letra(c):
+                    fin = _escanear_identificador(codigo, i + 1)
+                    agregar_identificador(i, fin)
+                else:
+                    errores.append((i, i, f"Carácter no reconocido: '{c}'", c, i))
+                    tokens.append((i, i + 1, CODIGO_TIPO["ERROR"], i))
+                    fin = i + 1
+            i = fin
+    return tokens, errores, tramos, cadenas
+
+def _analizar_numpy(codigo):
+    np, (tabla_clases, tabla_simples) = _cargar_numpy()
+    longitud = len(codigo)
+    if not longitud:
+        return TokenStream(IndiceLineas()), []
+    if codigo.isascii():
+        bytes_codigo = np.frombuffer(codigo.encode("ascii"), dtype=np.uint8)
+        indices_tabla = bytes_codigo
+        no_ascii = None
+    else:
+        # Los caracteres no ASCII se clasifican como _CLASE_OTRO y quedan para la
+        # pasada compleja, que aplica las mismas reglas Unicode que el motor regex.
+        bytes_codigo = np.frombuffer(codigo.encode("utf-32-le"), dtype=np.uint32)
+        no_ascii = bytes_codigo >= 0x80
+        indices_tabla = np.where(no_ascii, 0, bytes_codigo)
+    clases = tabla_clases[indices_tabla]
+    if no_ascii is not None:
+        clases[no_ascii] = _CLASE_OTRO
+
+    # Corridas de caracteres de la misma clase; cada delimitador es su propia corrida.
+    es_delimitador = clases == _CLASE_DELIMITADOR
+    corte = np.empty(longitud, dtype=bool)
+    corte[0] = True
+    corte[1:] = (np.diff(clases) != 0) | es_delimitador[1:] | es_delimitador[:-1]
+    inicios = np.flatnonzero(corte)
+    fines = np.append(inicios[1:], longitud)
+    clase_corrida = clases[inicios]
+    largo = fines - inicios
+
+    es_digito = (bytes_codigo >= ord("0")) & (bytes_codigo <= ord("9"))
+    digitos_acumulados = np.concatenate(([0], np.cumsum(es_digito)))
+    solo_digitos = digitos_acumulados[fines] - digitos_acumulados[inicios] == largo
+    empieza_digito = es_digito[inicios]
+    es_punto = bytes_codigo == ord(".")
+    punto_antes = np.zeros(len(inicios), dtype=bool)
+    punto_antes[1:] = es_punto[inicios[1:] - 1]
+    punto_despues = np.zeros(len(inicios), dtype=bool)
+    punto_despues[:-1] = es_punto[fines[:-1]]
+
+    alnum = clase_corrida == _CLASE_ALNUM
+    if no_ascii is not None:
+        # Una letra o dígito Unicode pegado a la corrida la extiende.
+        pegado = np.zeros(len(inicios), dtype=bool)
+        pegado[1:] = no_ascii[inicios[1:] - 1]
+        pegado[:-1] |= no_ascii[fines[:-1]]
+        alnum &= ~pegado
+    es_identificador = alnum & ~empieza_digito
+    es_entero = alnum & empieza_digito & solo_digitos & ~punto_antes & ~punto_despues
+    tipo_simple = tabla_simples[indices_tabla[inicios]]
+    es_operador_simple = (clase_corrida == _CLASE_OPERADOR) & (largo == 1) & (tipo_simple >= 0)
+    es_delimitador_corrida = clase_corrida == _CLASE_DELIMITADOR
+    vectorial = es_identificador | es_entero | es_operador_simple | es_delimitador_corrida
+    compleja = ~vectorial & (clase_corrida != _CLASE_ESPACIO) & (clase_corrida != _CLASE_SALTO)
+
+    tokens_py, errores_py, tramos, cadenas = _pasada_compleja(
+        codigo, inicios[compleja].tolist(), fines[compleja].tolist())
+
+    tipos_vector = np.full(len(inicios), CODIGO_TIPO["IDENTIFICADOR"], dtype=np.int32)
+    tipos_vector[es_entero] = CODIGO_TIPO["NUM_ENTERO"]
+    tipos_vector[es_delimitador_corrida] = CODIGO_TIPO["DELIMITADOR"]
+    tipos_vector[es_operador_simple] = tipo_simple[es_operador_simple]
+
+    def dentro_de(posiciones, rangos):
+        if not rangos:
+            return np.zeros(len(posiciones), dtype=bool)
+        desde = np.fromiter((a for a, _ in rangos), dtype=np.int64, count=len(rangos))
+        hasta = np.fromiter((b for _, b in rangos), dtype=np.int64, count=len(rangos))
+        k = np.searchsorted(desde, posiciones, side="right") - 1
+        return (k >= 0) & (posiciones < hasta[np.maximum(k, 0)])
+
+    vectorial &= ~dentro_de(inicios, tramos)
+    saltos = np.flatnonzero(bytes_codigo == ord("\n"))
+    saltos = saltos[~dentro_de(saltos, cadenas)]
+
+    if tokens_py:
+        extra = np.array(tokens_py, dtype=np.int64).reshape(-1, 4)
+    else:
+        extra = np.empty((0, 4), dtype=np.int64)
+    todos_inicios = np.concatenate((inicios[vectorial], extra[:, 0]))
+    todos_fines = np.concatenate((fines[vectorial], extra[:, 1]))
+    todos_tipos = np.concatenate((tipos_vector[vectorial], extra[:, 2].astype(np.int32)))
+    posicion_linea = np.concatenate((inicios[vectorial], extra[:, 3]))
+    orden = np.argsort(todos_inicios, kind="stable")
+    todos_inicios = todos_inicios[orden]
+    todos_fines = todos_fines[orden]
+    todos_tipos = todos_tipos[orden]
+    posicion_linea = posicion_linea[orden]
+
+    inicios_linea = np.append(0, saltos + 1).astype(np.int64)
+    lineas = np.searchsorted(inicios_linea, posicion_linea, side="right")
+    columnas = todos_inicios - inicios_linea[np.searchsorted(inicios_linea, todos_inicios, side="right") - 1] + 1
+
+    flujo = TokenStream()
+    flujo.indice = IndiceLineas(array("q", inicios_linea.tobytes()))
+    intern = sys.intern
+    flujo.lexemas = [intern(codigo[a:b]) for a, b in zip(todos_inicios.tolist(), todos_fines.tolist())]
+    codigo_id = CODIGO_TIPO["IDENTIFICADOR"]
+    for k in np.flatnonzero(todos_tipos == codigo_id).tolist():
+        if flujo.lexemas[k] in RESERVADAS:
+            todos_tipos[k] = CODIGO_TIPO["RESERVADA"]
+    flujo.tipos = array("i", todos_tipos.astype(np.intc).tobytes())
+    flujo.lineas = array("i", lineas.astype(np.intc).tobytes())
+    flujo.columnas = array("i", columnas.astype(np.intc).tobytes())
+    flujo.inicios = array("q", todos_inicios.astype(np.int64).tobytes())
+
+    errores = []
+    for posicion_fila, posicion_columna, descripcion, valor, _ in errores_py:
+        fila = flujo.indice.linea(posicion_fila)
+        columna = flujo.indice.columna(posicion_columna)
+        errores.append({"linea": fila, "columna": columna, "descripcion": descripcion, "valor": valor})
+    return flujo, errores
+
+def escribir_tabla_tokens(tokens, salida):
+    # Escribe fila por fila en cualquier archivo de texto; no arma la tabla en memoria.
+    salida.write("Lexema\t\tTipo\t\tLínea\tColumna\n")
+    salida.write("-" * 50 + "\n")
+    if isinstance(tokens, TokenStream):
+        # Directo de las columnas, sin armar un Token por fila.
+        omitidos = (CODIGO_TIPO["ERROR"], _CODIGO_COMENTARIO)
+        salida.writelines(
+            f"{lexema}\t\t{TIPOS_TOKEN[tipo]}\t\t{linea}\t{columna}\n"
+            for lexema, tipo, linea, columna in zip(tokens.lexemas, tokens.tipos, tokens.lineas, tokens.columnas)
+            if tipo not in omitidos
+        )
+        return
+    salida.writelines(
+        f"{t['lexema']}\t\t{t['tipo']}\t\t{t['linea']}\t{t['columna']}\n"
+        for t in tokens if t['tipo'] not in ("ERROR", "COMENTARIO")
+    )
+
+def escribir_tabla_errores(errores, salida):
+    if not errores:
+        salida.write("Sin errores léxicos.")
+        return
+    salida.write("Línea\tColumna\tCarácter\tDescripción\n")
+    salida.write("-" * 60 + "\n")
+    salida.writelines(f"{e['linea']}\t{e['columna']}\t{e['valor']}\t\t{e['descripcion']}\n" for e in errores)
 
 def generar_tabla_tokens(tokens):
-    tabla = "Lexema\t\tTipo\t\tLínea\tColumna\n"
-    tabla += "-" * 50 + "\n"
-    for t in tokens:
-        if t['tipo'] not in ("ERROR", "COMENTARIO"):
-            tabla += f"{t['lexema']}\t\t{t['tipo']}\t\t{t['linea']}\t{t['columna']}\n"
-    return tabla
+    salida = io.StringIO()
+    escribir_tabla_tokens(tokens, salida)
+    return salida.getvalue()
 
 def generar_tabla_errores(errores):
-    if not errores:
-        return "Sin errores léxicos."
-    tabla = "Línea\tColumna\tCarácter\tDescripción\n"
-    tabla += "-" * 60 + "\n"
-    for e in errores:
-        tabla += f"{e['linea']}\t{e['columna']}\t{e['valor']}\t\t{e['descripcion']}\n"
-    return tabla
+    salida = io.StringIO()
+    escribir_tabla_errores(errores, salida)
+    return salida.getvalue()
 
 def analizar_desde_archivo(ruta):
     with open(ruta, "r", encoding="utf-8") as f:
         codigo = f.read()
     return analizar_codigo_fuente(codigo)
 
+TAMANO_FRAGMENTO = 1 << 16
+
+def iter_tokens(origen, tamano_fragmento=TAMANO_FRAGMENTO):
+    # Produce Token y registros de error (dict) en orden de aparición, leyendo la
+    # entrada por fragmentos; sólo se retiene el lexema aún incompleto.
+    if isinstance(origen, (str, os.PathLike)):
+        with open(origen, "r", encoding="utf-8") as f:
+            yield from iter_tokens(f, tamano_fragmento)
+        return
+
+    eventos = []
+    base = 0
+
+    def agregar(lexema, tipo, linea, columna, inicio):
+        eventos.append(Token(lexema, tipo, linea, columna, base + inicio))
+
+    def reportar(linea, columna, descripcion, valor, inicio):
+        eventos.append({"linea": linea, "columna": columna, "descripcion": descripcion, "valor": valor})
+
+    decodificador = None
+    texto = ""
+    i = 0
+    fila = 1
+    inicio_linea = 0
+    leer = tamano_fragmento
+    final = False
+    while not final:
+        fragmento = origen.read(leer)
+        if isinstance(fragmento, bytes):
+            if decodificador is None:
+                decodificador = codecs.getincrementaldecoder("utf-8")()
+            fragmento = decodificador.decode(fragmento, final=not fragmento)
+            final = not fragmento and decodificador.getstate()[0] == b""
+        else:
+            final = not fragmento
+        texto = texto[i:] + fragmento
+        base += i
+        inicio_linea -= i
+        i, fila, inicio_linea = _escanear_regex(texto, 0, fila, inicio_linea, final, agregar, reportar)
+        yield from eventos
+        eventos.clear()
+        # Un comentario o cadena sin cerrar puede abarcar muchos fragmentos: se lee
+        # al menos lo ya pendiente para que el re-escaneo se mantenga lineal.
+        leer = max(tamano_fragmento, len(texto) - i)
+
+class LazyTokenStream:
+    # Envuelve cualquier iterable de Token o diccionarios (por ejemplo iter_tokens)
+    # y descarta los tipos excluidos a medida que se piden tokens. Los registros
+    # de error del lexer se guardan en `errores`; en memoria sólo quedan los
+    # `anticipacion` tokens que se hayan mirado por adelantado.
+    def __init__(self, tokens, excluidos=("COMENTARIO", "ERROR"), anticipacion=2):
+        self._fuente = iter(tokens)
+        self._excluidos = frozenset(excluidos)
+        self._pendientes = deque()
+        self.anticipacion = anticipacion
+        self.errores = []
+        self.leidos = 0
+
+    def _cargar(self):
+        for elemento in self._fuente:
+            if isinstance(elemento, dict):
+                if "descripcion" in elemento:
+                    self.errores.append(elemento)
+                    continue
+                elemento = Token(elemento["lexema"], elemento["tipo"], elemento["linea"], elemento["columna"])
+            self.leidos += 1
+            if elemento.tipo not in self._excluidos:
+                self._pendientes.append(elemento)
+                return True
+        return False
+
+    def ver(self, k=0):
+        if k >= self.anticipacion:
+            raise ValueError(f"Sólo se puede mirar {self.anticipacion} tokens por adelantado")
+        while len(self._pendientes) <= k:
+            if not self._cargar():
+                return None
+        return self._pendientes[k]
+
+    def siguiente(self):
+        if not self._pendientes and not self._cargar():
+            return None
+        return self._pendientes.popleft()
+
+    def __iter__(self):
+        token = self.siguiente()
+        while token is not None:
+            yield token
+            token = self.siguiente()
+
 def guardar_tokens(tokens, archivo="tokens.txt"):
     with open(archivo, "w", encoding="utf-8") as f:
         for t in tokens:
@@ -234,3 +964,199 @@ def guardar_errores(errores, archivo="errores.txt"):
     with open(archivo, "w", encoding="utf-8") as f:
         for e in errores:
             f.write(f"{e['linea']}\t{e['columna']}\t{e['valor']}\t{e['descripcion']}\n")
+
+class _ColumnaDesplazada:
+    # Enteros crecientes con un desplazamiento pendiente a partir de `hueco`; mover el
+    # hueco cuesta lo que la distancia recorrida, como en un buffer con hueco.
+    __slots__ = ("valores", "hueco", "delta")
+
+    def __init__(self, valores=()):
+        self.valores = list(valores)
+        self.hueco = len(self.valores)
+        self.delta = 0
+
+    def __len__(self):
+        return len(self.valores)
+
+    def __getitem__(self, i):
+        valor = self.valores[i]
+        return valor + self.delta if i >= self.hueco else valor
+
+    def _mover_hueco(self, j):
+        valores = self.valores
+        if self.delta:
+            if j > self.hueco:
+                for k in range(self.hueco, j):
+                    valores[k] += self.delta
+            else:
+                for k in range(j, self.hueco):
+                    valores[k] -= self.delta
+        self.hueco = j
+        if j == len(valores):
+            self.delta = 0
+
+    def reemplazar(self, a, b, nuevos, desplazamiento):
+        self._mover_hueco(b)
+        self.valores[a:b] = nuevos
+        self.hueco = a + len(nuevos)
+        self.delta += desplazamiento
+        if self.hueco == len(self.valores):
+            self.delta = 0
+
+    def bisectar(self, x):
+        bajo, alto = 0, len(self.valores)
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self[medio] < x:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    def lista(self):
+        self._mover_hueco(len(self.valores))
+        return list(self.valores)
+
+class CambioTokens:
+    # Los tokens [indice, indice + eliminados) se sustituyen por `insertados`; los
+    # posteriores conservan lexema y columna y se desplazan en offset y línea.
+    __slots__ = ("indice", "eliminados", "insertados", "desplazamiento", "desplazamiento_lineas")
+
+    def __init__(self, indice, eliminados, insertados, desplazamiento, desplazamiento_lineas):
+        self.indice = indice
+        self.eliminados = eliminados
+        self.insertados = insertados
+        self.desplazamiento = desplazamiento
+        self.desplazamiento_lineas = desplazamiento_lineas
+
+    def __repr__(self):
+        return (f"CambioTokens(indice={self.indice}, eliminados={self.eliminados}, "
+                f"insertados={self.insertados!r}, desplazamiento={self.desplazamiento}, "
+                f"desplazamiento_lineas={self.desplazamiento_lineas})")
+
+class IncrementalLexer:
+    # Re-lexea sólo desde el último inicio de línea anterior a la edición hasta el
+    # primer inicio de línea posterior en el que el texto viejo también empezaba
+    # una línea. Dentro de un comentario /* */ o de una cadena no hay inicios de
+    # línea, así que ese estado se arrastra hasta que se cierran.
+
+    def __init__(self, texto=""):
+        self.reiniciar(texto)
+
+    def reiniciar(self, texto):
+        self.texto = texto
+        self.lexemas = []
+        self.tipos = []
+        self.columnas = []
+        inicios, lineas, saltos, filas, errores = [], [], [], [], []
+        self._escanear(texto, 0, 1, self.lexemas, self.tipos, self.columnas, inicios, lineas,
+                       saltos, filas, errores, None)
+        self.inicios = _ColumnaDesplazada(inicios)
+        self.lineas = _ColumnaDesplazada(lineas)
+        self.saltos = _ColumnaDesplazada(saltos)
+        self.filas = _ColumnaDesplazada(filas)
+        self._errores = errores
+
+    def _escanear(self, texto, inicio, fila, lexemas, tipos, columnas, inicios, lineas,
+                  saltos, filas, errores, parar):
+        def agregar(lexema, tipo, linea, columna, posicion):
+            lexemas.append(sys.intern(lexema))
+            tipos.append(tipo)
+            columnas.append(columna)
+            inicios.append(posicion)
+            lineas.append(linea)
+
+        def reportar(linea, columna, descripcion, valor, posicion):
+            errores.append((posicion, {"linea": linea, "columna": columna, "descripcion": descripcion, "valor": valor}))
+
+        def sincronizar(posicion, fila_actual):
+            saltos.append(posicion)
+            filas.append(fila_actual)
+            return parar is not None and parar(posicion, fila_actual)
+
+        _escanear_regex(texto, inicio, fila, inicio, True, agregar, reportar, sincronizar)
+
+    def editar(self, posicion, eliminados, insertado):
+        if not 0 <= posicion <= posicion + eliminados <= len(self.texto):
+            raise ValueError("Edición fuera del texto actual")
+        texto = self.texto[:posicion] + insertado + self.texto[posicion + eliminados:]
+        delta = len(insertado) - eliminados
+        fin_edicion = posicion + len(insertado)
+
+        indice_salto = self.saltos.bisectar(posicion + 1) - 1
+        if indice_salto >= 0:
+            reinicio, fila = self.saltos[indice_salto], self.filas[indice_salto]
+        else:
+            reinicio, fila = 0, 1
+
+        sincronia = []
+
+        def parar(nueva_posicion, nueva_fila):
+            if nueva_posicion < fin_edicion:
+                return False
+            vieja = nueva_posicion - delta
+            j = self.saltos.bisectar(vieja)
+            if j < len(self.saltos) and self.saltos[j] == vieja:
+                sincronia.extend((vieja, j, nueva_fila - self.filas[j]))
+                return True
+            return False
+
+        lexemas, tipos, columnas, inicios, lineas, saltos, filas, errores = [], [], [], [], [], [], [], []
+        self._escanear(texto, reinicio, fila, lexemas, tipos, columnas, inicios, lineas,
+                       saltos, filas, errores, parar)
+
+        primero = self.inicios.bisectar(reinicio)
+        if sincronia:
+            vieja, ultimo_salto, delta_filas = sincronia
+            ultimo = self.inicios.bisectar(vieja)
+            fin_saltos = ultimo_salto + 1
+        else:
+            vieja, delta_filas = len(self.texto) + 1, 0
+            ultimo = len(self.lexemas)
+            fin_saltos = len(self.saltos)
+
+        self.lexemas[primero:ultimo] = lexemas
+        self.tipos[primero:ultimo] = tipos
+        self.columnas[primero:ultimo] = columnas
+        self.inicios.reemplazar(primero, ultimo, inicios, delta)
+        self.lineas.reemplazar(primero, ultimo, lineas, delta_filas)
+        self.saltos.reemplazar(indice_salto + 1, fin_saltos, saltos, delta)
+        self.filas.reemplazar(indice_salto + 1, fin_saltos, filas, delta_filas)
+
+        nuevos_errores = [e for e in self._errores if e[0] < reinicio]
+        nuevos_errores.extend(errores)
+        for inicio_error, error in self._errores:
+            if inicio_error >= vieja:
+                desplazado = dict(error, linea=error["linea"] + delta_filas)
+                nuevos_errores.append((inicio_error + delta, desplazado))
+        self._errores = nuevos_errores
+        self.texto = texto
+
+        insertados = [Token(lexema, tipo, linea, columna, inicio)
+                      for lexema, tipo, linea, columna, inicio in zip(lexemas, tipos, lineas, columnas, inicios)]
+        return CambioTokens(primero, ultimo - primero, insertados, delta, delta_filas)
+
+    def __len__(self):
+        return len(self.lexemas)
+
+    def token(self, i):
+        return Token(self.lexemas[i], self.tipos[i], self.lineas[i], self.columnas[i], self.inicios[i])
+
+    def tokens_en_rango(self, inicio, fin):
+        i = self.inicios.bisectar(inicio)
+        if i > 0 and self.inicios[i - 1] + len(self.lexemas[i - 1]) > inicio:
+            i -= 1
+        while i < len(self.lexemas) and self.inicios[i] < fin:
+            yield self.token(i)
+            i += 1
+
+    @property
+    def errores(self):
+        return [error for _, error in self._errores]
+
+    def flujo(self):
+        flujo = TokenStream()
+        for lexema, tipo, linea, columna, inicio in zip(self.lexemas, self.tipos, self.lineas.lista(),
+                                                         self.columnas, self.inicios.lista()):
+            flujo.agregar(lexema, tipo, linea, columna, inicio)
+        return flujo
@@ -1,13 +1,13 @@
 import sys
 from typing import List
-from lexical import analizar_codigo_fuente, generar_tabla_tokens, generar_tabla_errores
-from syntactic import analizar_sintacticamente, generar_tabla_errores_sintacticos
-from semantic import analizar_semantica, formatear_errores_semanticos
+from lexical import generar_tabla_tokens, generar_tabla_errores, IncrementalLexer
+from syntactic import generar_tabla_errores_sintacticos
+from semantic import formatear_errores_semanticos
 from intermediate import (
-    generar_codigo_intermedio,
     formatear_codigo_intermedio,
     ejecutar_codigo_intermedio,
 )
+from session import CompilationSession
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QAction, QFileDialog, QStatusBar, QTabWidget, QWidget,
     QVBoxLayout, QHBoxLayout, QPlainTextEdit, QMessageBox, QSplitter, QToolBar, QTreeWidget, QTreeWidgetItem,
@@ -15,7 +15,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QIcon, QPixmap, QPainter, QTextCursor
 from PyQt5.QtSvg import QSvgRenderer
-from PyQt5.QtCore import Qt, QRegExp, QEventLoop
+from PyQt5.QtCore import Qt, QEventLoop
 from PyQt5.QtGui import QPainter, QColor, QSyntaxHighlighter, QTextCharFormat
 from PyQt5.QtWidgets import QStyledItemDelegate
 from PyQt5.QtCore import QRect
@@ -79,9 +79,9 @@ class NumberBar(QWidget):
 class CodeEditor(QPlainTextEdit):
     
     class LexicalHighlighter(QSyntaxHighlighter):
-        def __init__(self, parent, lexer_func):
+        def __init__(self, parent, lexer):
             super().__init__(parent)
-            self.lexer_func = lexer_func
+            self.lexer = lexer
             self.token_format_map = self.create_format_map()
 
         def create_format_map(self):
@@ -114,22 +114,13 @@ class CodeEditor(QPlainTextEdit):
         def highlightBlock(self, text):
             self.setCurrentBlockState(0)
 
-            tokens, _ = self.lexer_func(text)
-            for token in tokens:
-                lexema = token["lexema"]
-                tipo = token["tipo"]
-                formato = self.token_format_map.get(tipo, QTextCharFormat())
-
-                if lexema.isalnum() or lexema == "_":
-                    pattern = QRegExp(r'\b' + QRegExp.escape(lexema) + r'\b')
-                else:
-                    pattern = QRegExp(QRegExp.escape(lexema))
-
-                index = pattern.indexIn(text, 0)
-                while index >= 0:
-                    length = len(lexema)
-                    self.setFormat(index, length, formato)
-                    index = pattern.indexIn(text, index + length)
+            inicio_bloque = self.currentBlock().position()
+            fin_bloque = inicio_bloque + len(text)
+            for token in self.lexer.tokens_en_rango(inicio_bloque, fin_bloque):
+                formato = self.token_format_map.get(token.tipo, QTextCharFormat())
+                desde = max(token.inicio, inicio_bloque)
+                hasta = min(token.inicio + len(token.lexema), fin_bloque)
+                self.setFormat(desde - inicio_bloque, hasta - desde, formato)
 
             comment_format = self.token_format_map.get("COMENTARIO", QTextCharFormat())
             start_tag = "/*"
@@ -167,9 +158,16 @@ class CodeEditor(QPlainTextEdit):
         self.setLineWrapMode(QPlainTextEdit.NoWrap)
         self.file_path = None
         self.setStyleSheet("background-color: #2d2a2e; color: #ffffff;")
-        self.highlighter = CodeEditor.LexicalHighlighter(self.document(), lambda code: analizar_codigo_fuente(code))
+        # El lexer incremental se conecta antes que el resaltador para que
+        # highlightBlock ya vea los tokens actualizados de la edición.
+        self.lexer_incremental = IncrementalLexer()
+        self.document().contentsChange.connect(self.update_tokens)
+        self.highlighter = CodeEditor.LexicalHighlighter(self.document(), self.lexer_incremental)
+        # Resultados de cada etapa para la revisión actual del documento.
+        self.session = CompilationSession(self.lexer_incremental)
         self.is_modified = False
         self.cursorPositionChanged.connect(self.update_cursor_position)
+        self.textChanged.connect(self.session.invalidate)
         self.textChanged.connect(self.mark_modified)
 
     def update_cursor_position(self):
@@ -184,6 +182,19 @@ class CodeEditor(QPlainTextEdit):
         else:
             print(f"Error: status_bar no está inicializado en {parent}")
 
+    def update_tokens(self, position, chars_removed, chars_added):
+        lexer = self.lexer_incremental
+        if position + chars_removed > len(lexer.texto):
+            lexer.reiniciar(self.toPlainText())
+            return
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(position)
+        cursor.setPosition(position + chars_added, QTextCursor.KeepAnchor)
+        inserted = cursor.selectedText().replace("\u2029", "\n")
+        lexer.editar(position, chars_removed, inserted)
+        if len(lexer.texto) != self.document().characterCount() - 1:
+            lexer.reiniciar(self.toPlainText())
+
     def mark_modified(self):
         self.is_modified = True
 
@@ -264,8 +275,7 @@ class IDECompilador(QMainWindow):
         if not text_edit:
             return
 
-        source_code = text_edit.toPlainText()
-        tokens, errores = analizar_codigo_fuente(source_code)
+        tokens, errores = text_edit.session.tokens()
 
         self.lexical_analysis_box.setPlainText(generar_tabla_tokens(tokens))
         self.lexical_errors_box.setPlainText(generar_tabla_errores(errores))
@@ -277,11 +287,7 @@ class IDECompilador(QMainWindow):
         text_edit = current_widget.findChild(CodeEditor)
         if not text_edit:
             return
-        source_code = text_edit.toPlainText()
-        tokens, _ = analizar_codigo_fuente(source_code)
-        filtered_tokens = [t for t in tokens if t["tipo"] not in ("COMENTARIO", "ERROR")]
-        print("Tokens filtrados:", filtered_tokens)
-        ast, errores = analizar_sintacticamente(filtered_tokens)
+        ast, errores = text_edit.session.parse()
         
         self.syntax_analysis_box.setPlainText(str(ast))
         self.ast_tree.clear()
@@ -296,8 +302,8 @@ class IDECompilador(QMainWindow):
         if not text_edit:
             return
 
-        source_code = text_edit.toPlainText()
-        tokens, lexical_errors = analizar_codigo_fuente(source_code)
+        session = text_edit.session
+        _, lexical_errors = session.tokens()
 
         if lexical_errors:
             if hasattr(self, 'semantic_tree'):
@@ -313,8 +319,7 @@ class IDECompilador(QMainWindow):
                 self.execution_output_box.setPlainText("Sin ejecución por errores léxicos.")
             return
 
-        filtered_tokens = [t for t in tokens if t["tipo"] not in ("COMENTARIO", "ERROR")]
-        ast, syntactic_errors = analizar_sintacticamente(filtered_tokens)
+        ast, syntactic_errors = session.parse()
 
         if not ast:
             if hasattr(self, 'semantic_tree'):
@@ -330,10 +335,10 @@ class IDECompilador(QMainWindow):
                 self.execution_output_box.setPlainText("Sin ejecución por errores sintácticos.")
             return
 
-        semantic_result = analizar_semantica(ast)
+        semantic_result = session.analyze()
         if hasattr(self, 'semantic_tree'):
             self.semantic_tree.clear()
-            self.populate_semantic_tree(ast, self.semantic_tree.invisibleRootItem())
+            self.populate_semantic_tree(ast, self.semantic_tree.invisibleRootItem(), semantic_result.annotations)
         self.symbol_table_box.setPlainText(semantic_result.symbol_table_text)
 
         combined_errors: List[str] = []
@@ -349,7 +354,7 @@ class IDECompilador(QMainWindow):
             if hasattr(self, 'execution_output_box'):
                 self.execution_output_box.setPlainText("Sin ejecución por errores sintácticos.")
         else:
-            tac = generar_codigo_intermedio(ast)
+            tac = session.tac()
             self.intermediate_code_box.setPlainText(formatear_codigo_intermedio(tac))
             if hasattr(self, 'console_output_box'):
                 self.console_output_box.clear()
@@ -421,7 +426,7 @@ class IDECompilador(QMainWindow):
         item.setExpanded(True)
 
 
-    def populate_semantic_tree(self, nodo, parent):
+    def populate_semantic_tree(self, nodo, parent, anotaciones):
         """Similar a populate_tree pero mostrando las anotaciones semánticas (tipo y valor)."""
         excluded_types = [
             "programa", "lista_sentencias", "lista_declaracion", "expresion",
@@ -430,12 +435,11 @@ class IDECompilador(QMainWindow):
         ]
         if nodo.tipo in excluded_types and nodo.hijos:
             for hijo in nodo.hijos:
-                self.populate_semantic_tree(hijo, parent)
+                self.populate_semantic_tree(hijo, parent, anotaciones)
             return
 
         item = QTreeWidgetItem(parent)
-        tipo_attr = getattr(nodo, 'tipo_semantico', None)
-        val_attr = getattr(nodo, 'valor_semantico', None)
+        tipo_attr, val_attr = anotaciones.get(nodo)
         label = f"{nodo.tipo}"
         if getattr(nodo, 'valor', None):
             label += f" ({nodo.valor})"
@@ -448,7 +452,7 @@ class IDECompilador(QMainWindow):
         item.setText(1, str(getattr(nodo, 'linea', '') or ""))
 
         for hijo in nodo.hijos:
-            self.populate_semantic_tree(hijo, item)
+            self.populate_semantic_tree(hijo, item, anotaciones)
         item.setExpanded(True)
 
 
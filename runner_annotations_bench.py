@@ -0,0 +1,61 @@
+import sys
+import time
+import tracemalloc
+
+from lexical import analizar_flujo
+from runner_parser_bench import construir_programa
+from semantic import SemanticAnalyzer, SemanticAnnotations
+from syntactic import analizar_sintacticamente
+
+
+class AnotacionesEnNodos(SemanticAnnotations):
+    # Como antes del cambio: el tipo y el valor se escriben como atributos del
+    # propio NodoAST, lo que agranda su __dict__.
+    def set(self, node, sym_type, value=None):
+        node.tipo_semantico = sym_type
+        node.valor_semantico = value
+
+    def set_value(self, node, value):
+        node.valor_semantico = value
+
+    def get(self, node):
+        return getattr(node, "tipo_semantico", None), getattr(node, "valor_semantico", None)
+
+
+def analizar(clase, ast):
+    analizador = SemanticAnalyzer()
+    analizador.annotations = clase()
+    analizador.visit(ast)
+    return analizador
+
+
+def medir(clase, ast):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    analizador = analizar(clase, ast)
+    transcurrido = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return analizador, transcurrido, memoria
+
+
+if __name__ == "__main__":
+    sentencias = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    flujo, _ = analizar_flujo(construir_programa(sentencias))
+    # Un árbol para cada variante, así los atributos de una no inflan la otra.
+    arbol_tabla, _ = analizar_sintacticamente(flujo.filtrar())
+    arbol_nodos, _ = analizar_sintacticamente(flujo.filtrar())
+    en_nodos, t_nodos, m_nodos = medir(AnotacionesEnNodos, arbol_nodos)
+    en_tabla, t_tabla, m_tabla = medir(SemanticAnnotations, arbol_tabla)
+    print(f"Atributos en los nodos: {t_nodos * 1000:.1f} ms, {m_nodos / 2 ** 20:.2f} MiB")
+    print(f"Tabla aparte:           {t_tabla * 1000:.1f} ms, {m_tabla / 2 ** 20:.2f} MiB ({len(en_tabla.annotations)} nodos anotados)")
+    iguales = en_nodos.format_annotated_tree(arbol_nodos) == en_tabla.format_annotated_tree(arbol_tabla)
+
+    # El árbol no se modifica: un segundo análisis sobre el mismo árbol no ve
+    # las anotaciones del primero y produce el mismo resultado.
+    otro = analizar(SemanticAnnotations, arbol_tabla)
+    compartido = otro.format_annotated_tree(arbol_tabla) == en_tabla.format_annotated_tree(arbol_tabla)
+    print(f"{'OK   ' if iguales else 'FALLO'} mismo árbol anotado")
+    print(f"{'OK   ' if compartido else 'FALLO'} dos análisis sobre un árbol compartido")
+    if not (iguales and compartido):
+        sys.exit(1)
@@ -0,0 +1,62 @@
+import sys
+from collections import Counter
+import time
+import tracemalloc
+
+from lexical import analizar_flujo
+from syntactic import ArenaAST, analizar_sintacticamente
+
+
+def construir_programa(sentencias):
+    cuerpo = "".join(
+        f"    x = (x + {n}) * 2 - y / 3;\n    if x > {n} then y = y + 1; end\n"
+        for n in range(sentencias)
+    )
+    return "main {\n    int x, y;\n" + cuerpo + "}\n"
+
+
+def contar_objetos(nodo):
+    conteo = Counter()
+    pila = [nodo]
+    while pila:
+        nodo = pila.pop()
+        conteo[nodo.tipo] += 1
+        pila.extend(reversed(nodo.hijos))
+    return conteo
+
+
+def contar_arena(arena):
+    conteo = Counter()
+    nombres, tipos = arena.nombres, arena.tipos
+    for i in arena.recorrer():
+        conteo[nombres[tipos[i]]] += 1
+    return conteo
+
+
+def medir_memoria(construir):
+    tracemalloc.start()
+    resultado = construir()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultado, memoria
+
+
+if __name__ == "__main__":
+    sentencias = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    flujo, _ = analizar_flujo(construir_programa(sentencias))
+    flujo = flujo.filtrar()
+    ast, memoria_objetos = medir_memoria(lambda: analizar_sintacticamente(flujo)[0])
+    arena, memoria_arena = medir_memoria(lambda: ArenaAST.desde_nodo(ast))
+    print(f"Nodos: {len(arena)}")
+    print(f"Memoria NodoAST:  {memoria_objetos / 2**20:8.2f} MiB")
+    print(f"Memoria ArenaAST: {memoria_arena / 2**20:8.2f} MiB")
+
+    inicio = time.perf_counter()
+    conteo_objetos = contar_objetos(ast)
+    t_objetos = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    conteo_arena = contar_arena(arena)
+    t_arena = time.perf_counter() - inicio
+    assert conteo_objetos == conteo_arena
+    print(f"Recorrido NodoAST:  {t_objetos * 1000:8.1f} ms")
+    print(f"Recorrido ArenaAST: {t_arena * 1000:8.1f} ms (x{t_objetos / t_arena:.2f})")
@@ -0,0 +1,60 @@
+import gc
+import sys
+import tempfile
+import time
+
+import backend
+from intermediate import EXECUTION_MODES, TACExecutor, analizar_y_generar, lower_instructions
+from lexical import analizar_flujo
+from runner_executor_bench import casos
+from syntactic import analizar_sintacticamente
+
+
+def corregir(instrucciones, juegos, modo, cache_dir=None):
+    # Un corrector: el mismo programa con cada juego de entradas.
+    gc.collect()
+    gc.disable()
+    inicio = time.perf_counter()
+    resultados = [TACExecutor(instrucciones, inputs=entradas, mode=modo, cache_dir=cache_dir).run() for entradas in juegos]
+    transcurrido = time.perf_counter() - inicio
+    gc.enable()
+    return resultados, transcurrido
+
+
+def compilar_en_frio(instrucciones, directorio):
+    # Lo que paga otro proceso con el directorio ya lleno: leer y cargar el code object.
+    programa = lower_instructions(instrucciones)
+    inicio = time.perf_counter()
+    backend.CodeObjectCache(directorio).function(programa)
+    desde_disco = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    backend.CodeObjectCache().function(programa)
+    traduciendo = time.perf_counter() - inicio
+    return traduciendo, desde_disco
+
+
+if __name__ == "__main__":
+    juegos = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    largo = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    correcto = True
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre, fuente, entradas in casos(largo):
+            flujo, _ = analizar_flujo(fuente)
+            ast, _ = analizar_sintacticamente(flujo.filtrar())
+            instrucciones = analizar_y_generar(ast).instructions
+            lotes = [list(entradas) for _ in range(juegos)]
+            tiempos = {}
+            for modo in EXECUTION_MODES:
+                resultados, tiempos[modo] = corregir(instrucciones, lotes, modo, directorio if modo == "python" else None)
+                if modo == "loop":
+                    esperados = resultados
+                correcto = correcto and all(
+                    (r.output, r.errors, r.variables) == (e.output, e.errors, e.variables) for r, e in zip(resultados, esperados)
+                )
+            traduciendo, desde_disco = compilar_en_frio(instrucciones, directorio)
+            print(f"{nombre}, {juegos} juegos de entradas: " + ", ".join(
+                f"{modo} {segundos * 1000:.1f} ms (x{tiempos['loop'] / segundos:.2f})" for modo, segundos in tiempos.items()
+            ) + f" | traducir y compilar {traduciendo * 1000:.2f} ms, cargar de disco {desde_disco * 1000:.2f} ms")
+    if not correcto:
+        print("FALLO: el backend de Python no produce los mismos resultados")
+        sys.exit(1)
@@ -0,0 +1,55 @@
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from batch import compile_many
+
+
+def preparar_directorio(destino, copias):
+    fuentes = sorted(glob.glob("*.txt"))
+    rutas = []
+    for n in range(copias):
+        for fuente in fuentes:
+            ruta = os.path.join(destino, f"{n:05d}_{fuente}")
+            shutil.copyfile(fuente, ruta)
+            rutas.append(ruta)
+    # Un envío truncado hace fallar al parser; debe quedar solo en su resultado.
+    truncado = os.path.join(destino, "truncado.txt")
+    with open(truncado, "w", encoding="utf-8") as f:
+        f.write("main {\n int p1;\n p1 = (")
+    rutas.append(truncado)
+    return rutas
+
+
+if __name__ == "__main__":
+    copias = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    destino = tempfile.mkdtemp(prefix="compile_many_")
+    try:
+        rutas = preparar_directorio(destino, copias)
+        inicio = time.perf_counter()
+        secuencial = compile_many(rutas, workers=1)
+        t_secuencial = time.perf_counter() - inicio
+        print(f"{len(rutas)} archivos, secuencial: {t_secuencial:.2f} s")
+        fallidos = [r for r in secuencial if r.failure is not None]
+        if [r.path for r in fallidos] != [rutas[-1]] or len(secuencial) != len(rutas):
+            print(f"FALLO: se esperaba un único archivo fallido, el truncado; hubo {len(fallidos)}")
+            sys.exit(1)
+        print(f"OK    truncado.txt registrado como fallo: {fallidos[0].failure}")
+        cache = os.path.join(destino, "cache")
+        con_cache = compile_many(rutas, workers=1, cache_dir=cache)
+        if [r.path for r in con_cache if r.failure is not None] != [rutas[-1]]:
+            print("FALLO: con cache_dir el archivo truncado no quedó registrado como fallo")
+            sys.exit(1)
+        for workers in sorted({2, os.cpu_count() or 1}):
+            inicio = time.perf_counter()
+            paralelo = compile_many(rutas, workers=workers)
+            t_paralelo = time.perf_counter() - inicio
+            iguales = paralelo == secuencial
+            print(f"{'OK   ' if iguales else 'FALLO'} workers={workers}: {t_paralelo:.2f} s (x{t_secuencial / t_paralelo:.2f})")
+            if not iguales:
+                sys.exit(1)
+    finally:
+        shutil.rmtree(destino)
@@ -0,0 +1,53 @@
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from bytecode import assemble, ejecutar_bytecode, read_tbc, write_tbc
+from intermediate import TACExecutor, analizar_y_generar
+from lexical import analizar_flujo
+from runner_executor_bench import casos
+from syntactic import analizar_sintacticamente
+
+
+def generar(fuente):
+    flujo, _ = analizar_flujo(fuente)
+    ast, _ = analizar_sintacticamente(flujo.filtrar())
+    return analizar_y_generar(ast).instructions
+
+
+def mejor_de(funcion, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        gc.collect()
+        gc.disable()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = time.perf_counter() - inicio
+        gc.enable()
+        if mejor is None or transcurrido < mejor:
+            mejor = transcurrido
+    return resultado, mejor
+
+
+if __name__ == "__main__":
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    correcto = True
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre, fuente, entradas in casos(repeticiones):
+            instrucciones = generar(fuente)
+            ruta = os.path.join(directorio, nombre + ".tbc")
+            write_tbc(assemble(instrucciones), ruta)
+            # Lo que hace un trabajador: compilar el fuente, o mapear el artefacto.
+            _, t_fuente = mejor_de(lambda: generar(fuente))
+            programa, t_cargar = mejor_de(lambda: read_tbc(ruta))
+            esperado, t_tac = mejor_de(lambda: TACExecutor(instrucciones, inputs=entradas).run())
+            obtenido, t_vm = mejor_de(lambda: ejecutar_bytecode(programa, inputs=entradas))
+            iguales = (esperado.output, esperado.errors, esperado.variables) == (obtenido.output, obtenido.errors, obtenido.variables)
+            correcto = correcto and iguales
+            print(f"{'OK   ' if iguales else 'FALLO'} {nombre}: {len(instrucciones)} TAC -> {len(programa.code)} palabras, "
+                  f"{os.path.getsize(ruta)} bytes | compilar fuente {t_fuente * 1000:.2f} ms, mapear .tbc {t_cargar * 1000:.3f} ms | "
+                  f"TACExecutor {t_tac * 1000:.1f} ms, VM {t_vm * 1000:.1f} ms (x{t_tac / t_vm:.2f})")
+    if not correcto:
+        sys.exit(1)
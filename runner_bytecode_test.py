@@ -0,0 +1,62 @@
+import struct
+import sys
+
+from bytecode import _HEADER, JUMP, PUSH_CONST, PUSH_REG, PUSH_VAR, WITH_OPERAND, WITH_TWO_OPERANDS, assemble, dumps, loads
+from runner_bytecode_bench import generar
+from runner_executor_bench import casos
+
+
+def palabra(datos, pc, valor):
+    # Devuelve una copia de `datos` con la palabra `pc` del código cambiada.
+    copia = bytearray(datos)
+    struct.pack_into("<i", copia, _HEADER.size + 4 * pc, valor)
+    return bytes(copia)
+
+
+def buscar(codigo, opcodes):
+    # Primera instrucción con alguno de esos opcodes, saltando operandos.
+    pc = 0
+    while pc < len(codigo):
+        if codigo[pc] in opcodes:
+            return pc
+        pc += 4 if codigo[pc] in WITH_TWO_OPERANDS else 2 if codigo[pc] in WITH_OPERAND else 1
+    return None
+
+
+def danados(programa, datos):
+    codigo = programa.code
+    yield "opcode desconocido", palabra(datos, 0, 99)
+    yield "opcode negativo", palabra(datos, 0, -1)
+    ultimo = len(codigo) - 1
+    yield "operando ausente", palabra(datos, ultimo, PUSH_VAR)
+    for nombre, opcodes, valor in (
+        ("constante fuera de rango", {PUSH_CONST}, len(programa.constants)),
+        ("registro fuera de rango", {PUSH_REG}, len(programa.register_defaults)),
+        ("variable fuera de rango", {PUSH_VAR}, len(programa.variable_names)),
+        ("salto más allá del final", {JUMP}, len(codigo) + 1),
+        ("salto negativo", {JUMP}, -2),
+        ("salto a un operando", {JUMP}, buscar(codigo, {PUSH_VAR}) + 1),
+    ):
+        pc = buscar(codigo, opcodes)
+        if pc is not None:
+            yield nombre, palabra(datos, pc + 1, valor)
+
+
+if __name__ == "__main__":
+    correcto = True
+    for nombre, fuente, entradas in casos(10):
+        programa = assemble(generar(fuente))
+        datos = dumps(programa)
+        if list(loads(datos).code) != list(programa.code):
+            print(f"FALLO {nombre}: el archivo intacto no se carga igual")
+            correcto = False
+        for defecto, archivo in danados(programa, datos):
+            try:
+                loads(archivo)
+            except ValueError as exc:
+                print(f"OK    {nombre}, {defecto}: {exc}")
+            else:
+                print(f"FALLO {nombre}, {defecto}: se cargó sin error")
+                correcto = False
+    if not correcto:
+        sys.exit(1)
@@ -0,0 +1,37 @@
+import shutil
+import sys
+import tempfile
+import time
+
+from batch import _cache_for, compile_many
+from runner_batch_test import preparar_directorio
+
+
+if __name__ == "__main__":
+    copias = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    destino = tempfile.mkdtemp(prefix="compile_cache_")
+    directorio_cache = tempfile.mkdtemp(prefix="compile_cache_store_")
+    try:
+        rutas = preparar_directorio(destino, copias)
+        inicio = time.perf_counter()
+        sin_cache = compile_many(rutas, workers=1)
+        t_sin_cache = time.perf_counter() - inicio
+        print(f"{len(rutas)} archivos sin caché: {t_sin_cache * 1000:.1f} ms")
+
+        correcto = True
+        for pasada in ("fría", "caliente"):
+            inicio = time.perf_counter()
+            con_cache = compile_many(rutas, workers=1, cache_dir=directorio_cache)
+            transcurrido = time.perf_counter() - inicio
+            iguales = con_cache == sin_cache
+            correcto = correcto and iguales
+            print(f"{'OK   ' if iguales else 'FALLO'} caché {pasada}: {transcurrido * 1000:.1f} ms")
+
+        estadisticas = _cache_for(directorio_cache).stats
+        print(f"aciertos={estadisticas.hits} fallos={estadisticas.misses} "
+              f"bytes ahorrados={estadisticas.bytes_saved} bytes escritos={estadisticas.bytes_written}")
+        if not correcto:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(destino)
+        shutil.rmtree(directorio_cache)
@@ -0,0 +1,140 @@
+import gc
+import sys
+import time
+
+from intermediate import ExecutionResult, TACExecutor, analizar_y_generar
+from lexical import analizar_flujo
+from syntactic import analizar_sintacticamente
+
+
+class EjecutorTextual:
+    # El ejecutor anterior: cada operando se vuelve a interpretar como texto en
+    # cada lectura (comillas, true/false, búsqueda en el entorno, int y float).
+    def __init__(self, instrucciones, entradas):
+        self.instrucciones = instrucciones
+        self.entradas = list(entradas)
+        self.entorno = {}
+        self.salida = []
+        self.errores = []
+        self.etiquetas = {inst.result: i for i, inst in enumerate(instrucciones) if inst.op == "label" and inst.result}
+
+    def resolver(self, valor):
+        if isinstance(valor, str):
+            while len(valor) >= 2 and ((valor[0] == '"' and valor[-1] == '"') or (valor[0] == "'" and valor[-1] == "'")):
+                valor = valor[1:-1]
+            if valor.lower() in {"true", "false"}:
+                return valor.lower() == "true"
+            if valor in self.entorno:
+                return self.entorno[valor]
+            try:
+                return int(valor)
+            except Exception:
+                try:
+                    return float(valor)
+                except Exception:
+                    return valor
+        return valor
+
+    def run(self):
+        binario = TACExecutor([])
+        binario.errors = self.errores
+        pc = 0
+        while pc < len(self.instrucciones):
+            inst = self.instrucciones[pc]
+            op = inst.op
+            pc += 1
+            if op == "label":
+                continue
+            if op == "goto":
+                pc = self.etiquetas.get(inst.result, pc)
+            elif op == "if_false":
+                if not self.resolver(inst.arg1):
+                    pc = self.etiquetas.get(inst.result, pc)
+            elif op == "declare":
+                self.entorno.setdefault(inst.result, None)
+            elif op == "input":
+                self.entorno[inst.result] = binario._auto_cast(self.entradas.pop(0))
+            elif op == "print":
+                valor = self.resolver(inst.arg1)
+                if isinstance(valor, bool):
+                    valor = "true" if valor else "false"
+                self.salida.append(str(valor))
+            elif op == "print_nl":
+                self.salida.append("\n")
+            elif op == "=":
+                self.entorno[inst.result] = self.resolver(inst.arg1)
+            elif op == "!":
+                self.entorno[inst.result] = not bool(self.resolver(inst.arg1))
+            else:
+                self.entorno[inst.result] = binario._binary(op, self.resolver(inst.arg1), self.resolver(inst.arg2))
+        return ExecutionResult(output="".join(self.salida), variables=dict(self.entorno), errors=self.errores)
+
+
+CONTADOR = """main {
+    int i, n, suma, pares;
+    float media;
+    cin >> n;
+    i = 0;
+    suma = 0;
+    pares = 0;
+    while i < n
+        suma = suma + i * 2 - 1;
+        if i % 2 == 0 && !(suma < 0) then
+            pares = pares + 1;
+        end
+        i = i + 1;
+    end
+    media = suma / 1.0 / n;
+    cout << "suma:" << suma << " pares:" << pares << " media:" << media;
+}
+"""
+
+
+def casos(repeticiones):
+    # Los ejercicios con bucles leen hasta un centinela; se les da una corrida larga.
+    with open("grupo12_ej4.txt", "r", encoding="utf-8") as f:
+        votos = f.read()
+    with open("grupo12_ej5.txt", "r", encoding="utf-8") as f:
+        ventas = f.read()
+    yield "grupo12_ej4", votos, [str(i % 5 + 1) for i in range(repeticiones)] + ["0"]
+    yield "grupo12_ej5", ventas, ["10", "20.5", "30", "40", "50"] + [str(i % 7) for i in range(2 * repeticiones)] + ["-1"]
+    yield "contador", CONTADOR, [str(10 * repeticiones)]
+
+
+def ejecutar(clase, instrucciones, entradas):
+    if clase is TACExecutor:
+        return TACExecutor(instrucciones, inputs=entradas).run()
+    return clase(instrucciones, entradas).run()
+
+
+def medir(clase, instrucciones, entradas, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        gc.collect()
+        gc.disable()
+        inicio = time.perf_counter()
+        resultado = ejecutar(clase, instrucciones, entradas)
+        transcurrido = time.perf_counter() - inicio
+        gc.enable()
+        if mejor is None or transcurrido < mejor:
+            mejor = transcurrido
+    return resultado, mejor
+
+
+if __name__ == "__main__":
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    correcto = True
+    for nombre, fuente, entradas in casos(repeticiones):
+        flujo, _ = analizar_flujo(fuente)
+        ast, _ = analizar_sintacticamente(flujo.filtrar())
+        instrucciones = analizar_y_generar(ast).instructions
+        esperado, t_antes = medir(EjecutorTextual, instrucciones, entradas)
+        obtenido, t_despues = medir(TACExecutor, instrucciones, entradas)
+        iguales = (esperado.output, esperado.errors) == (obtenido.output, obtenido.errors) and all(
+            esperado.variables.get(nombre_variable) == valor for nombre_variable, valor in obtenido.variables.items()
+        )
+        correcto = correcto and iguales
+        print(f"{'OK   ' if iguales else 'FALLO'} {nombre}: operandos como texto {t_antes * 1000:.1f} ms, "
+              f"resueltos {t_despues * 1000:.1f} ms (x{t_antes / t_despues:.2f})")
+    if not correcto:
+        sys.exit(1)
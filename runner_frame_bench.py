@@ -0,0 +1,54 @@
+import gc
+import sys
+import time
+import tracemalloc
+
+from intermediate import TACExecutor, analizar_y_generar
+from lexical import analizar_flujo
+from runner_executor_bench import EjecutorTextual
+from syntactic import analizar_sintacticamente
+
+
+def construir_programa(sentencias):
+    # Cada sentencia deja decenas de temporales; el bucle las vuelve a escribir.
+    cuerpo = "".join(
+        f"        x = (a + {n}) * b - c / 3 ^ 2 % d + (x - {n}) * (y + {n});\n"
+        f"        if a < {n} && b >= c || !(d == 1) then y = y + 1; end\n"
+        for n in range(sentencias)
+    )
+    return (
+        "main {\n    int a, b, c, d, x, y, i;\n"
+        "    a = 3; b = 5; c = 7; d = 2; x = 0; y = 0; i = 0;\n"
+        "    while i < 20\n" + cuerpo + "        i = i + 1;\n    end\n"
+        "    cout << x << y;\n}\n"
+    )
+
+
+def medir(ejecutor):
+    # Solo la ejecución: el marco y lo que crece mientras corre el programa.
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = ejecutor.run()
+    transcurrido = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, transcurrido, pico
+
+
+if __name__ == "__main__":
+    for sentencias in [int(a) for a in sys.argv[1:]] or [10, 100, 1000]:
+        flujo, _ = analizar_flujo(construir_programa(sentencias))
+        ast, _ = analizar_sintacticamente(flujo.filtrar())
+        instrucciones = analizar_y_generar(ast).instructions
+        temporales = len({i.result for i in instrucciones if str(i.result).startswith("_t")})
+        esperado, t_antes, m_antes = medir(EjecutorTextual(instrucciones, []))
+        ejecutor = TACExecutor(instrucciones)
+        obtenido, t_despues, m_despues = medir(ejecutor)
+        if esperado.output != obtenido.output:
+            print(f"FALLO con {sentencias} sentencias: la salida cambió")
+            sys.exit(1)
+        print(f"{sentencias} sentencias, {temporales} temporales: entorno con {len(esperado.variables)} nombres, "
+              f"{t_antes * 1000:.1f} ms, pico {m_antes / 1024:.0f} KiB | "
+              f"{ejecutor.program.temp_registers} registros y {len(obtenido.variables)} variables, "
+              f"{t_despues * 1000:.1f} ms, pico {m_despues / 1024:.0f} KiB")
@@ -0,0 +1,46 @@
+import gc
+import sys
+import time
+
+from intermediate import analizar_y_generar, generar_codigo_intermedio
+from lexical import analizar_flujo
+from runner_parser_bench import construir_programa
+from semantic import analizar_semantica
+from syntactic import analizar_sintacticamente
+
+
+def dos_pasadas(ast):
+    resultado = analizar_semantica(ast)
+    return resultado.errors, resultado.entries, generar_codigo_intermedio(ast)
+
+
+def fusionado(ast):
+    resultado = analizar_y_generar(ast)
+    return resultado.errors, resultado.entries, resultado.instructions
+
+
+def medir(funcion, ast, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        gc.collect()
+        gc.disable()
+        inicio = time.perf_counter()
+        resultado = funcion(ast)
+        transcurrido = time.perf_counter() - inicio
+        gc.enable()
+        if mejor is None or transcurrido < mejor:
+            mejor = transcurrido
+    return resultado, mejor
+
+
+if __name__ == "__main__":
+    sentencias = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    flujo, _ = analizar_flujo(construir_programa(sentencias))
+    ast, _ = analizar_sintacticamente(flujo.filtrar())
+    esperado, t_dos = medir(dos_pasadas, ast)
+    obtenido, t_fusionado = medir(fusionado, ast)
+    print(f"Semántico + intermedio: {t_dos * 1000:.1f} ms")
+    print(f"Pasada fusionada:       {t_fusionado * 1000:.1f} ms (x{t_dos / t_fusionado:.2f})")
+    if esperado != obtenido:
+        print("FALLO: la pasada fusionada no produce los mismos errores, símbolos y código")
+        sys.exit(1)
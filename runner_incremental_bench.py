@@ -0,0 +1,57 @@
+import sys
+import time
+
+from lexical import analizar_flujo
+from syntactic import analizar_sintacticamente, reanalizar_sintacticamente
+
+
+EDICIONES = {
+    # Cambia tokens sin mover las líneas siguientes.
+    "misma línea": "        x = x * {n} + y;\n",
+    # Agrega una sentencia: todo lo posterior baja una línea.
+    "línea nueva": "        x = x * {n} + y;\n        y++;\n",
+}
+
+
+def construir_programa(bucles, edicion=None):
+    # La edición se aplica dentro del cuerpo del while del medio.
+    partes = ["main {\n    int a, b, x, y;\n"]
+    for n in range(bucles):
+        linea = f"        x = x + {n};\n"
+        if edicion and n == bucles // 2:
+            linea = EDICIONES[edicion].format(n=n)
+        partes.append(f"    while a < {n}\n{linea}        cout << x;\n    end\n")
+    partes.append("}\n")
+    return "".join(partes)
+
+
+def medir(bucles, edicion, repeticiones=20):
+    textos = [construir_programa(bucles), construir_programa(bucles, edicion)]
+    flujos = [analizar_flujo(texto)[0].filtrar() for texto in textos]
+    inicio = time.perf_counter()
+    ast, errores = analizar_sintacticamente(flujos[0])
+    completo = time.perf_counter() - inicio
+
+    incremental = None
+    actual = 0
+    for _ in range(repeticiones):
+        siguiente = 1 - actual
+        inicio = time.perf_counter()
+        ast, errores = reanalizar_sintacticamente(flujos[siguiente], flujos[actual], ast, errores)
+        transcurrido = time.perf_counter() - inicio
+        if incremental is None or transcurrido < incremental:
+            incremental = transcurrido
+        actual = siguiente
+
+    referencia, _ = analizar_sintacticamente(flujos[actual])
+    if str(ast) != str(referencia):
+        raise AssertionError("el análisis incremental no coincide con el completo")
+    return len(flujos[0]), completo, incremental
+
+
+if __name__ == "__main__":
+    tamanos = [int(a) for a in sys.argv[1:]] or [100, 1000, 10000]
+    for bucles in tamanos:
+        for edicion in EDICIONES:
+            tokens, completo, incremental = medir(bucles, edicion)
+            print(f"{tokens} tokens, {edicion}: completo {completo * 1000:.2f} ms, incremental {incremental * 1000:.3f} ms")
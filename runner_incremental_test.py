@@ -0,0 +1,61 @@
+import glob
+import random
+import sys
+
+from lexical import MOTORES, analizar_flujo
+from syntactic import analizar_sintacticamente, reanalizar_sintacticamente
+
+FRAGMENTOS = ["x = 1;", "\n", "  ", ";", "end", "y++;", "(", "cout << a;", "\n  z = z * 2;\n", ""]
+
+
+def editar(texto, azar):
+    inicio = azar.randint(0, len(texto))
+    fin = min(len(texto), inicio + azar.choice([0, 0, 1, 3]))
+    return texto[:inicio] + azar.choice(FRAGMENTOS) + texto[fin:]
+
+
+def comparar(ruta, motor, ediciones, azar):
+    # Devuelve (correcto, saltadas): las ediciones que tumban al parser
+    # completo no se pueden comparar y se descartan una a una.
+    with open(ruta, "r", encoding="utf-8") as f:
+        texto = f.read()
+    tokens = analizar_flujo(texto, motor)[0].filtrar()
+    ast, errores = analizar_sintacticamente(tokens)
+    saltadas = 0
+    for _ in range(ediciones):
+        editado = editar(texto, azar)
+        nuevos = analizar_flujo(editado, motor)[0].filtrar()
+        try:
+            esperado, errores_esperados = analizar_sintacticamente(nuevos)
+        except AttributeError:
+            # El parser completo todavía se cae con algunos finales de archivo:
+            # se descarta esta edición y se rehace el estado desde el texto previo.
+            saltadas += 1
+            tokens = analizar_flujo(texto, motor)[0].filtrar()
+            ast, errores = analizar_sintacticamente(tokens)
+            continue
+        texto = editado
+        ast, errores = reanalizar_sintacticamente(nuevos, tokens, ast, errores)
+        if str(ast) != str(esperado) or errores != errores_esperados:
+            print(f"FALLO {ruta} ({motor}):\n{texto}")
+            return False, saltadas
+        tokens = nuevos
+    return True, saltadas
+
+
+if __name__ == "__main__":
+    ediciones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    azar = random.Random(12)
+    motores = [motor for motor in MOTORES if motor != "numpy"]
+    correcto = True
+    saltadas = total = 0
+    for ruta in sorted(glob.glob("*.txt")):
+        for motor in motores:
+            iguales, omitidas = comparar(ruta, motor, ediciones, azar)
+            correcto = iguales and correcto
+            saltadas += omitidas
+            total += ediciones
+    print(f"{saltadas} de {total} ediciones saltadas: el análisis completo falló")
+    print("OK" if correcto else "Hubo diferencias con el análisis completo")
+    if not correcto:
+        sys.exit(1)
@@ -0,0 +1,44 @@
+import glob
+import sys
+import time
+
+from lexical import MOTORES, analizar_flujo
+
+TAMANO_MINIMO = 1_000_000
+
+
+def construir_entrada(tamano=TAMANO_MINIMO):
+    muestras = []
+    for ruta in sorted(glob.glob("*.txt")):
+        with open(ruta, "r", encoding="utf-8") as f:
+            muestras.append(f.read())
+    bloque = "\n".join(muestras) + "\n"
+    return bloque * (tamano // len(bloque) + 1)
+
+
+def medir(codigo, motor, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        flujo, _ = analizar_flujo(codigo, motor=motor)
+        transcurrido = time.perf_counter() - inicio
+        if mejor is None or transcurrido < mejor:
+            mejor = transcurrido
+    return mejor, len(flujo)
+
+
+if __name__ == "__main__":
+    tamano = int(sys.argv[1]) if len(sys.argv) > 1 else TAMANO_MINIMO
+    codigo = construir_entrada(tamano)
+    print(f"Entrada: {len(codigo)} caracteres")
+    referencia = None
+    for motor in MOTORES:
+        try:
+            segundos, cantidad = medir(codigo, motor)
+        except ImportError as exc:
+            print(f"{motor:8} omitido: {exc}")
+            continue
+        if referencia is None:
+            referencia = segundos
+        print(f"{motor:8} {segundos * 1000:9.1f} ms  {cantidad} tokens  "
+              f"{len(codigo) / segundos / 1e6:6.2f} Mcar/s  x{referencia / segundos:.2f}")
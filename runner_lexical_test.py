@@ -0,0 +1,34 @@
+import glob
+import sys
+
+from lexical import analizar_codigo_fuente
+
+try:
+    import numpy  # noqa: F401
+    MOTORES_A_PROBAR = ("regex", "numpy")
+except ImportError:
+    MOTORES_A_PROBAR = ("regex",)
+
+
+def comparar_motores(codigo, motor="regex"):
+    esperado = analizar_codigo_fuente(codigo, motor="escalar")
+    obtenido = analizar_codigo_fuente(codigo, motor=motor)
+    return esperado == obtenido, esperado, obtenido
+
+
+if __name__ == "__main__":
+    fallos = 0
+    for ruta in sorted(glob.glob("*.txt")):
+        with open(ruta, "r", encoding="utf-8") as f:
+            codigo = f.read()
+        for motor in MOTORES_A_PROBAR:
+            iguales, esperado, obtenido = comparar_motores(codigo, motor)
+            print(f"{'OK   ' if iguales else 'FALLO'} {ruta} [{motor}] ({len(esperado[0])} tokens, {len(esperado[1])} errores)")
+            if not iguales:
+                fallos += 1
+                for t_esc, t_otro in zip(esperado[0] + esperado[1], obtenido[0] + obtenido[1]):
+                    if t_esc != t_otro:
+                        print("  escalar:", t_esc)
+                        print(f"  {motor}:", t_otro)
+                        break
+    sys.exit(1 if fallos else 0)
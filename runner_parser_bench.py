@@ -0,0 +1,47 @@
+import glob
+import sys
+import time
+
+from lexical import analizar_flujo
+from syntactic import analizar_sintacticamente
+
+
+def construir_programa(sentencias):
+    cuerpo = "".join(
+        f"    x = (a + {n}) * b - c / 3 ^ 2 % d;\n"
+        f"    if a < {n} && b >= c || !(d == 1) then y = 1; end\n"
+        f"    z = {n};\n"
+        for n in range(sentencias)
+    )
+    return "main {\n    int a, b, c, d, x, y, z;\n" + cuerpo + "}\n"
+
+
+def medir(flujo, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        analizar_sintacticamente(flujo)
+        transcurrido = time.perf_counter() - inicio
+        if mejor is None or transcurrido < mejor:
+            mejor = transcurrido
+    return mejor
+
+
+if __name__ == "__main__":
+    sentencias = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    flujo, _ = analizar_flujo(construir_programa(sentencias))
+    flujo = flujo.filtrar()
+    segundos = medir(flujo)
+    print(f"Programa generado: {len(flujo)} tokens en {segundos * 1000:.1f} ms ({len(flujo) / segundos / 1e3:.1f} ktokens/s)")
+
+    muestras = []
+    for ruta in sorted(glob.glob("*.txt")):
+        with open(ruta, "r", encoding="utf-8") as f:
+            muestras.append(analizar_flujo(f.read())[0].filtrar())
+    total = sum(len(m) for m in muestras)
+    inicio = time.perf_counter()
+    for _ in range(200):
+        for muestra in muestras:
+            analizar_sintacticamente(muestra)
+    segundos = time.perf_counter() - inicio
+    print(f"Ejemplos del repositorio (x200): {total * 200} tokens en {segundos * 1000:.1f} ms ({total * 200 / segundos / 1e3:.1f} ktokens/s)")
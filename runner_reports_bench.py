@@ -0,0 +1,139 @@
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from intermediate import analizar_y_generar, escribir_codigo_intermedio, formatear_codigo_intermedio
+from lexical import analizar_flujo, escribir_tabla_errores, escribir_tabla_tokens
+from runner_parser_bench import construir_programa
+from syntactic import analizar_sintacticamente, escribir_arbol
+
+
+def tabla_tokens_concatenada(tokens):
+    # Los reportes como eran antes: cada uno arma su texto completo con += o
+    # recursión antes de que alguien lo escriba.
+    tabla = "Lexema\t\tTipo\t\tLínea\tColumna\n"
+    tabla += "-" * 50 + "\n"
+    for t in tokens:
+        if t['tipo'] not in ("ERROR", "COMENTARIO"):
+            tabla += f"{t['lexema']}\t\t{t['tipo']}\t\t{t['linea']}\t{t['columna']}\n"
+    return tabla
+
+
+def tabla_errores_concatenada(errores):
+    if not errores:
+        return "Sin errores léxicos."
+    tabla = "Línea\tColumna\tCarácter\tDescripción\n"
+    tabla += "-" * 60 + "\n"
+    for e in errores:
+        tabla += f"{e['linea']}\t{e['columna']}\t{e['valor']}\t\t{e['descripcion']}\n"
+    return tabla
+
+
+def arbol_concatenado(nodo, nivel=0):
+    indent = "  " * nivel
+    resultado = f"{indent}{nodo.tipo}\n"
+    if nodo.valor:
+        resultado += f"{indent}  {nodo.tipo} ({nodo.valor})\n"
+    posicion = f" (línea: {nodo.linea}, columna: {nodo.columna})" if nodo.linea and nodo.columna else ""
+    grama = f" [{nodo.gramatica}]" if nodo.gramatica else ""
+    if posicion or grama:
+        resultado += f"{indent}  {posicion}{grama}\n"
+    for hijo in nodo.hijos:
+        resultado += arbol_concatenado(hijo, nivel + 1)
+    return resultado
+
+
+def anotado_concatenado(anotaciones, nodo, nivel=0):
+    linea = f"{'  ' * nivel}{nodo.tipo}"
+    if nodo.valor:
+        linea += f" ({nodo.valor})"
+    tipo, valor = anotaciones.get(nodo)
+    if tipo or valor is not None:
+        linea += f" [tipo={tipo if tipo else '-'}, valor={'-' if valor is None else repr(valor)}]"
+    linea += "\n"
+    for hijo in nodo.hijos:
+        linea += anotado_concatenado(anotaciones, hijo, nivel + 1)
+    return linea
+
+
+def volcar_textos(salida, tokens, errores, ast, resultado):
+    for texto in (
+        tabla_tokens_concatenada(tokens),
+        tabla_errores_concatenada(errores),
+        arbol_concatenado(ast),
+        anotado_concatenado(resultado.annotations, ast),
+        resultado.symbol_table.format(),
+        formatear_codigo_intermedio(resultado.instructions),
+    ):
+        salida.write(texto)
+        salida.write("\n")
+
+
+def volcar_en_flujo(salida, tokens, errores, ast, resultado):
+    semantico = resultado.semantic_result()
+    for escribir in (
+        lambda: escribir_tabla_tokens(tokens, salida),
+        lambda: escribir_tabla_errores(errores, salida),
+        lambda: escribir_arbol(ast, salida),
+        lambda: semantico.write_annotated_tree(salida),
+        lambda: semantico.write_symbol_table(salida),
+        lambda: escribir_codigo_intermedio(resultado.instructions, salida),
+    ):
+        escribir()
+        salida.write("\n")
+
+
+def medir(volcar, ruta, *datos):
+    inicio = time.perf_counter()
+    with open(ruta, "w", encoding="utf-8") as salida:
+        volcar(salida, *datos)
+    return time.perf_counter() - inicio
+
+
+def pico_memoria(volcar, *datos):
+    # tracemalloc hace muy lenta cada asignación; sólo se usa en programas chicos.
+    tracemalloc.start()
+    with open(os.devnull, "w", encoding="utf-8") as salida:
+        volcar(salida, *datos)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return pico
+
+
+def compilar(lineas):
+    # Cada sentencia del programa de prueba ocupa tres líneas.
+    flujo, errores = analizar_flujo(construir_programa(lineas // 3))
+    ast, _ = analizar_sintacticamente(flujo.filtrar())
+    # Las líneas y columnas de los tokens se resuelven una vez y quedan en el
+    # flujo; no son memoria de los reportes.
+    flujo.lineas
+    return flujo, errores, ast, analizar_y_generar(ast)
+
+
+if __name__ == "__main__":
+    lineas = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    directorio = tempfile.mkdtemp(prefix="reportes_")
+    antes = os.path.join(directorio, "antes.txt")
+    despues = os.path.join(directorio, "despues.txt")
+    try:
+        correcto = True
+        for total in (lineas // 4, lineas):
+            datos = compilar(total)
+            t_antes = medir(volcar_textos, antes, *datos)
+            t_despues = medir(volcar_en_flujo, despues, *datos)
+            iguales = filecmp.cmp(antes, despues, shallow=False)
+            correcto = correcto and iguales
+            print(f"{'OK   ' if iguales else 'FALLO'} {total} líneas, {os.path.getsize(despues) / 2 ** 20:.1f} MiB de reportes: "
+                  f"textos completos {t_antes * 1000:.0f} ms, en flujo {t_despues * 1000:.0f} ms")
+        for total in (lineas // 40, lineas // 10):
+            datos = compilar(total)
+            print(f"Pico de memoria con {total} líneas: textos completos {pico_memoria(volcar_textos, *datos) / 2 ** 20:.2f} MiB, "
+                  f"en flujo {pico_memoria(volcar_en_flujo, *datos) / 2 ** 20:.2f} MiB")
+        if not correcto:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(directorio)
@@ -0,0 +1,52 @@
+import glob
+import random
+import sys
+
+from cache import compile_pipeline
+from runner_incremental_test import FRAGMENTOS
+from session import CompilationSession
+
+
+def comparar(sesion, texto):
+    esperado = compile_pipeline(texto)
+    tokens, errores_lexicos = sesion.tokens()
+    ast, errores = sesion.parse()
+    semantico = sesion.analyze()
+    tac = sesion.tac()
+    if tokens != esperado.tokens or errores_lexicos != esperado.lexical_errors:
+        return "tokens"
+    if str(ast) != str(esperado.ast.raiz if esperado.ast else None) or errores != esperado.syntactic_errors:
+        return "AST"
+    if semantico != esperado.semantic:
+        return "análisis semántico"
+    if tac != esperado.tac:
+        return "código intermedio"
+    # Sin edición de por medio, cada etapa devuelve lo mismo sin recalcular.
+    if sesion.tokens() is not sesion.tokens() or sesion.parse() is not sesion.parse() or sesion.tac() is not tac:
+        return "memoización"
+    return None
+
+
+if __name__ == "__main__":
+    azar = random.Random(15)
+    fallos = 0
+    for ruta in sorted(glob.glob("*.txt")):
+        with open(ruta, "r", encoding="utf-8") as f:
+            texto = f.read()
+        sesion = CompilationSession()
+        sesion.set_text(texto)
+        for paso in range(60):
+            diferencia = comparar(sesion, texto)
+            if diferencia:
+                print(f"FALLO {ruta}, edición {paso}: difiere {diferencia}")
+                fallos += 1
+                break
+            inicio = azar.randint(0, len(texto))
+            fin = min(len(texto), inicio + azar.choice([0, 1, 3]))
+            fragmento = azar.choice(FRAGMENTOS)
+            texto = texto[:inicio] + fragmento + texto[fin:]
+            sesion.lexer.editar(inicio, fin - inicio, fragmento)
+            sesion.invalidate()
+    print("OK" if not fallos else f"{fallos} documentos con diferencias")
+    if fallos:
+        sys.exit(1)
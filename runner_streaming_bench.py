@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from lexical import LazyTokenStream, analizar_flujo, iter_tokens
+from runner_parser_bench import construir_programa
+from syntactic import analizar_sintacticamente
+
+
+def completo(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        flujo, _ = analizar_flujo(f.read())
+    return analizar_sintacticamente(flujo.filtrar())
+
+
+def en_flujo(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        return analizar_sintacticamente(LazyTokenStream(iter_tokens(f)))
+
+
+def medir(funcion, ruta):
+    # El tiempo se toma sin tracemalloc, que lo distorsiona; el pico, aparte.
+    inicio = time.perf_counter()
+    ast, errores = funcion(ruta)
+    transcurrido = time.perf_counter() - inicio
+    del ast
+    tracemalloc.start()
+    ast, errores = funcion(ruta)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return str(ast), errores, transcurrido, pico
+
+
+if __name__ == "__main__":
+    sentencias = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    descriptor, ruta = tempfile.mkstemp(suffix=".txt")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            f.write(construir_programa(sentencias))
+        resultados = {}
+        for nombre, funcion in (("lista completa", completo), ("en flujo", en_flujo)):
+            arbol, errores, segundos, pico = medir(funcion, ruta)
+            resultados[nombre] = (arbol, errores)
+            print(f"{nombre}: {segundos * 1000:.1f} ms, pico de memoria {pico / 2 ** 20:.1f} MiB")
+        if resultados["lista completa"] != resultados["en flujo"]:
+            print("FALLO: los dos caminos producen resultados distintos")
+            sys.exit(1)
+    finally:
+        os.remove(ruta)
@@ -0,0 +1,107 @@
+import gc
+import sys
+import time
+
+from lexical import analizar_flujo
+from semantic import TYPE_SIZES, SemanticAnalyzer, SymbolTable, SymbolTableEntry
+from syntactic import analizar_sintacticamente
+
+
+class TablaLineal(SymbolTable):
+    # La tabla anterior: una lista de ámbitos recorrida desde el más interno,
+    # una vez para buscar y otra para anotar la línea del uso.
+    def __init__(self):
+        super().__init__()
+        self.ambitos = [{}]
+
+    def enter_scope(self, hint):
+        self.scope_counter += 1
+        nombre = f"{hint or 'scope'}#{self.scope_counter}"
+        self.ambitos.append({})
+        self.scope_names.append(nombre)
+        self.offset_stack.append(0)
+        return nombre
+
+    def exit_scope(self):
+        if len(self.ambitos) <= 1:
+            return
+        self.ambitos.pop()
+        self.scope_names.pop()
+        self.offset_stack.pop()
+
+    def declare(self, name, sym_type, line, column):
+        actual = self.ambitos[-1]
+        if name in actual:
+            raise ValueError(f"Identificador '{name}' ya declarado en el ambito actual.")
+        entrada = SymbolTableEntry(name, sym_type, self.scope_names[-1], len(self.ambitos) - 1, self.offset_stack[-1], line, column)
+        if line is not None:
+            entrada.lines.append(line)
+        actual[name] = entrada
+        self.entries.append(entrada)
+        self.offset_stack[-1] += TYPE_SIZES.get(sym_type, 4)
+        return entrada
+
+    def lookup(self, name):
+        for ambito in reversed(self.ambitos):
+            entrada = ambito.get(name)
+            if entrada:
+                return entrada
+        return None
+
+    def record(self, entry, line):
+        if line is None:
+            return
+        for ambito in reversed(self.ambitos):
+            entrada = ambito.get(entry.name)
+            if entrada:
+                entrada.lines.append(line)
+                return
+
+
+def construir_programa(profundidad, usos):
+    # Variables globales usadas desde el fondo de bucles anidados; cada bucle
+    # abre un ámbito que la búsqueda lineal atraviesa en cada uso.
+    lineas = ["main {", "    int a, b, c;"]
+    for nivel in range(profundidad):
+        lineas.append(f"    while a < {nivel}")
+    lineas.extend("    a = a + b * c - a;" for _ in range(usos))
+    lineas.extend("    end" for _ in range(profundidad))
+    lineas.append("}")
+    return "\n".join(lineas) + "\n"
+
+
+def analizar(tabla, ast):
+    analizador = SemanticAnalyzer()
+    analizador.symbol_table = tabla
+    analizador.visit(ast)
+    return analizador.errors, tabla.format()
+
+
+def medir(clase, ast, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        gc.collect()
+        gc.disable()
+        inicio = time.perf_counter()
+        resultado = analizar(clase(), ast)
+        transcurrido = time.perf_counter() - inicio
+        gc.enable()
+        if mejor is None or transcurrido < mejor:
+            mejor = transcurrido
+    return resultado, mejor
+
+
+if __name__ == "__main__":
+    usos = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    correcto = True
+    for profundidad in (1, 10, 50):
+        flujo, _ = analizar_flujo(construir_programa(profundidad, usos))
+        ast, _ = analizar_sintacticamente(flujo.filtrar())
+        esperado, t_lineal = medir(TablaLineal, ast)
+        obtenido, t_pilas = medir(SymbolTable, ast)
+        iguales = esperado == obtenido
+        correcto = correcto and iguales
+        print(f"{'OK   ' if iguales else 'FALLO'} profundidad {profundidad:3d}: lista de ámbitos {t_lineal * 1000:.1f} ms, "
+              f"pilas por nombre {t_pilas * 1000:.1f} ms (x{t_lineal / t_pilas:.2f})")
+    if not correcto:
+        sys.exit(1)
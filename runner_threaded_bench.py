@@ -0,0 +1,59 @@
+import gc
+import sys
+import time
+
+from intermediate import EXECUTION_MODES, TACExecutor, analizar_y_generar
+from lexical import analizar_flujo
+from runner_executor_bench import casos
+from syntactic import analizar_sintacticamente
+
+
+def contar_instrucciones(instrucciones, entradas):
+    # Una corrida aparte con cada paso envuelto en un contador.
+    ejecutor = TACExecutor(instrucciones, inputs=entradas, mode="threaded")
+    contador = [0]
+
+    def contando(paso):
+        def envuelto():
+            contador[0] += 1
+            return paso()
+        return envuelto
+
+    ejecutor.threaded_code = [contando(paso) for paso in ejecutor.compile()]
+    ejecutor.run()
+    return contador[0]
+
+
+def medir(instrucciones, entradas, modo, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        ejecutor = TACExecutor(instrucciones, inputs=entradas, mode=modo)
+        gc.collect()
+        gc.disable()
+        inicio = time.perf_counter()
+        resultado = ejecutor.run()
+        transcurrido = time.perf_counter() - inicio
+        gc.enable()
+        if mejor is None or transcurrido < mejor:
+            mejor = transcurrido
+    return resultado, mejor
+
+
+if __name__ == "__main__":
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    correcto = True
+    for nombre, fuente, entradas in casos(repeticiones):
+        flujo, _ = analizar_flujo(fuente)
+        ast, _ = analizar_sintacticamente(flujo.filtrar())
+        instrucciones = analizar_y_generar(ast).instructions
+        ejecutadas = contar_instrucciones(instrucciones, entradas)
+        resultados = {modo: medir(instrucciones, entradas, modo) for modo in EXECUTION_MODES}
+        base, t_base = resultados["loop"]
+        columnas = []
+        for modo, (resultado, segundos) in resultados.items():
+            correcto = correcto and (resultado.output, resultado.errors, resultado.variables) == (base.output, base.errors, base.variables)
+            columnas.append(f"{modo} {ejecutadas / segundos / 1e6:.2f} Minstr/s (x{t_base / segundos:.2f})")
+        print(f"{nombre}: {ejecutadas} instrucciones | " + " | ".join(columnas))
+    if not correcto:
+        print("FALLO: los modos de ejecución no producen el mismo resultado")
+        sys.exit(1)
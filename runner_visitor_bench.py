@@ -0,0 +1,152 @@
+import gc
+import sys
+import time
+
+from intermediate import TACGenerator
+from lexical import analizar_flujo
+from runner_parser_bench import construir_programa
+from semantic import SemanticAnalyzer
+from syntactic import analizar_sintacticamente
+from visitor import Visitor
+
+
+class ContadorTabla(Visitor):
+    # Solo recorre: mide el costo del despacho sin el trabajo de cada etapa.
+    def __init__(self):
+        self.nodos = 0
+
+    def _contar(self, node):
+        self.nodos += 1
+        for child in node.hijos:
+            self.visit(child)
+
+    visit_programa = visit_lista_sentencias = visit_ASIGNACION = visit_seleccion = _contar
+    visit_arit_op = visit_rel_op = visit_op_logico = visit_log_op = visit_id = visit_num_entero = _contar
+    generic_visit = _contar
+
+
+class ContadorPorNombre(ContadorTabla):
+    def visit(self, node):
+        handler = getattr(self, f"visit_{node.tipo}", None)
+        if handler:
+            handler(node)
+            return
+        self.generic_visit(node)
+
+
+class AnalizadorPorNombre(SemanticAnalyzer):
+    # Despacho como antes de la tabla: un nombre formateado y un getattr por
+    # nodo, y las expresiones clasificadas por subcadenas del tipo.
+    def visit(self, node):
+        if node is None:
+            return
+        handler = getattr(self, f"visit_{node.tipo}", None)
+        if handler:
+            handler(node)
+            return
+        for child in node.hijos:
+            self.visit(child)
+
+    def evaluate_expression(self, node):
+        if node is None:
+            return None, None
+        tipo = node.tipo.lower()
+        if tipo == "num_entero":
+            return self._eval_num_entero(node)
+        if tipo == "num_flotante":
+            return self._eval_num_flotante(node)
+        if tipo == "bool_val":
+            return self._eval_bool_val(node)
+        if tipo == "cadena":
+            return self._eval_cadena(node)
+        if node.tipo in {"id", "ID"}:
+            return self._eval_id(node)
+        if "arit" in tipo:
+            return self._evaluate_arithmetic(node)
+        if "rel" in tipo:
+            return self._evaluate_relational(node)
+        if "op_logico" in tipo:
+            return self._evaluate_logical(node)
+        if "log_op" in tipo:
+            return self._evaluate_unary_logical(node)
+        return self._evaluate_children(node)
+
+
+class GeneradorPorNombre(TACGenerator):
+    def visit(self, node):
+        if node is None:
+            return
+        handler = getattr(self, f"_gen_{node.tipo}", None)
+        if handler:
+            handler(node)
+            return
+        for child in getattr(node, "hijos", []):
+            self.visit(child)
+
+    def _expr(self, node):
+        if node is None:
+            return None
+        tipo = node.tipo
+        if tipo in {"num_entero", "num_flotante", "bool_val"}:
+            return self._literal_value(node)
+        if tipo == "cadena":
+            return self._expr_cadena(node)
+        if tipo in {"id", "ID"}:
+            return node.valor
+        if tipo in {"arit_op", "rel_op", "op_logico", "log_op", "pot_op"}:
+            return self._operation(node)
+        last = None
+        for child in node.hijos:
+            last = self._expr(child)
+        return last
+
+
+def recorrido(clase, ast):
+    contador = clase()
+    contador.visit(ast)
+    return contador.nodos
+
+
+def semantico(clase, ast):
+    analizador = clase()
+    analizador.visit(ast)
+    return analizador.errors, [(e.name, e.value, e.lines) for e in analizador.symbol_table.entries]
+
+
+def intermedio(clase, ast):
+    return clase().generate(ast)
+
+
+def medir(funcion, clase, ast, repeticiones=5):
+    # Sin el recolector de ciclos, que dispara a destiempo y ensucia la medida.
+    mejor = None
+    for _ in range(repeticiones):
+        gc.collect()
+        gc.disable()
+        inicio = time.perf_counter()
+        resultado = funcion(clase, ast)
+        transcurrido = time.perf_counter() - inicio
+        gc.enable()
+        if mejor is None or transcurrido < mejor:
+            mejor = transcurrido
+    return resultado, mejor
+
+
+if __name__ == "__main__":
+    sentencias = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    flujo, _ = analizar_flujo(construir_programa(sentencias))
+    ast, _ = analizar_sintacticamente(flujo.filtrar())
+    correcto = True
+    for etapa, funcion, antes, despues in (
+        ("Recorrido", recorrido, ContadorPorNombre, ContadorTabla),
+        ("Semántico", semantico, AnalizadorPorNombre, SemanticAnalyzer),
+        ("Intermedio", intermedio, GeneradorPorNombre, TACGenerator),
+    ):
+        esperado, t_antes = medir(funcion, antes, ast)
+        obtenido, t_despues = medir(funcion, despues, ast)
+        iguales = esperado == obtenido
+        correcto = correcto and iguales
+        print(f"{'OK   ' if iguales else 'FALLO'} {etapa}: getattr {t_antes * 1000:.1f} ms, "
+              f"tabla {t_despues * 1000:.1f} ms (x{t_antes / t_despues:.2f})")
+    if not correcto:
+        sys.exit(1)
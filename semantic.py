@@ -1,5 +1,9 @@
+import io
+from array import array
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from visitor import Visitor
 
 TYPE_SIZES = {
     "int": 4,
@@ -23,88 +27,246 @@ class SymbolTableEntry:
 
 
 class SymbolTable:
+    # Each name maps to the stack of its live declarations, innermost last, so a
+    # lookup is one dict access whatever the nesting depth. Every scope keeps an
+    # undo log of the names it declared, which exit_scope pops off their stacks.
     def __init__(self) -> None:
-        self.scopes: List[Dict[str, SymbolTableEntry]] = [{}]
         self.scope_names: List[str] = ["global"]
         self.offset_stack: List[int] = [0]
         self.entries: List[SymbolTableEntry] = []
         self.scope_counter: int = 0
+        self._live: Dict[str, List[SymbolTableEntry]] = {}
+        self._undo: List[List[str]] = [[]]
+
+    @property
+    def scopes(self) -> List[Dict[str, SymbolTableEntry]]:
+        scopes: List[Dict[str, SymbolTableEntry]] = [{} for _ in self.scope_names]
+        for stack in self._live.values():
+            for entry in stack:
+                scopes[entry.level][entry.name] = entry
+        return scopes
 
     def enter_scope(self, hint: str) -> str:
         self.scope_counter += 1
         scope_name = f"{hint or 'scope'}#{self.scope_counter}"
-        self.scopes.append({})
         self.scope_names.append(scope_name)
         self.offset_stack.append(0)
+        self._undo.append([])
         return scope_name
 
     def exit_scope(self) -> None:
-        if len(self.scopes) <= 1:
+        if len(self.scope_names) <= 1:
             return
-        self.scopes.pop()
+        for name in self._undo.pop():
+            stack = self._live[name]
+            stack.pop()
+            if not stack:
+                del self._live[name]
         self.scope_names.pop()
         self.offset_stack.pop()
 
     def declare(self, name: str, sym_type: str, line: Optional[int], column: Optional[int]) -> SymbolTableEntry:
-        current_scope = self.scopes[-1]
-        if name in current_scope:
+        level = len(self.scope_names) - 1
+        stack = self._live.get(name)
+        if stack and stack[-1].level == level:
             raise ValueError(f"Identificador '{name}' ya declarado en el ambito actual.")
         offset = self.offset_stack[-1]
         entry = SymbolTableEntry(
             name=name,
             type=sym_type,
             scope=self.scope_names[-1],
-            level=len(self.scopes) - 1,
+            level=level,
             offset=offset,
             line=line,
             column=column,
         )
         if line is not None:
             entry.lines.append(line)
-        current_scope[name] = entry
+        if stack is None:
+            self._live[name] = [entry]
+        else:
+            stack.append(entry)
+        self._undo[-1].append(name)
         self.entries.append(entry)
         self.offset_stack[-1] += TYPE_SIZES.get(sym_type, 4)
         return entry
 
     def lookup(self, name: str) -> Optional[SymbolTableEntry]:
-        for scope in reversed(self.scopes):
-            entry = scope.get(name)
-            if entry:
-                return entry
-        return None
+        stack = self._live.get(name)
+        return stack[-1] if stack else None
+
+    def record(self, entry: SymbolTableEntry, line: Optional[int]) -> None:
+        # Takes the handle lookup() returned, so a use costs no second search.
+        if line is not None:
+            entry.lines.append(line)
 
     def record_occurrence(self, name: str, line: Optional[int]) -> None:
-        if line is None:
-            return
-        for scope in reversed(self.scopes):
-            entry = scope.get(name)
-            if entry:
-                entry.lines.append(line)
-                return
+        entry = self.lookup(name)
+        if entry:
+            self.record(entry, line)
 
-    def format(self) -> str:
+    def write(self, out: TextIO) -> None:
         if not self.entries:
-            return "Tabla de simbolos vacia."
-        header = "{:<20}{:<10}{:<18}{:<15}{}\n".format(
-            "Nombre", "Tipo", "Ambito", "Valor", "Lineas"
-        )
-        lines = [header, "-" * 80 + "\n"]
+            out.write("Tabla de simbolos vacia.")
+            return
+        out.write("{:<20}{:<10}{:<18}{:<15}{}\n".format("Nombre", "Tipo", "Ambito", "Valor", "Lineas"))
+        out.write("-" * 80 + "\n")
         for entry in self.entries:
             value_text = "-" if entry.value is None else str(entry.value)
-            lines_list = ",".join(str(l) for l in entry.lines) if entry.lines else "-"
-            lines.append("{:<20}{:<10}{:<18}{:<15}{}\n".format(entry.name, entry.type, entry.scope, value_text, lines_list))
-        return "".join(lines)
+            out.write("{:<20}{:<10}{:<18}{:<15}".format(entry.name, entry.type, entry.scope, value_text))
+            # A much used name has one very long row; its lines are streamed too.
+            lines = iter(entry.lines)
+            first = next(lines, None)
+            if first is None:
+                out.write("-")
+            else:
+                out.write(str(first))
+                out.writelines(f",{l}" for l in lines)
+            out.write("\n")
 
+    def format(self) -> str:
+        out = io.StringIO()
+        self.write(out)
+        return out.getvalue()
 
-@dataclass
+
+ANNOTATION_TYPES = (None, "program", "void", "int", "float", "bool", "string")
+
+
+class SemanticAnnotations:
+    # Types and values inferred by the analyzer, kept beside the tree instead of
+    # written onto its nodes. A node gets a slot in the parallel `types`/`values`
+    # columns the first time it is annotated, and its type is stored as a code
+    # into `type_names`. The tree is never modified, so several analyses can run
+    # over the same one.
+    def __init__(self) -> None:
+        self.type_names: List[Optional[str]] = list(ANNOTATION_TYPES)
+        self._type_codes: Dict[Optional[str], int] = {name: code for code, name in enumerate(self.type_names)}
+        self.slots: Dict[Any, int] = {}
+        self.types = array("B")
+        self.values: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _slot(self, node) -> int:
+        slot = self.slots.get(node)
+        if slot is None:
+            slot = self.slots[node] = len(self.values)
+            self.types.append(0)
+            self.values.append(None)
+        return slot
+
+    def _type_code(self, sym_type: Optional[str]) -> int:
+        code = self._type_codes.get(sym_type)
+        if code is None:
+            code = self._type_codes[sym_type] = len(self.type_names)
+            self.type_names.append(sym_type)
+        return code
+
+    def set(self, node, sym_type: Optional[str], value: Any = None) -> None:
+        slot = self._slot(node)
+        self.types[slot] = self._type_code(sym_type)
+        self.values[slot] = value
+
+    def set_value(self, node, value: Any) -> None:
+        self.values[self._slot(node)] = value
+
+    def get(self, node) -> Tuple[Optional[str], Any]:
+        slot = self.slots.get(node)
+        if slot is None:
+            return None, None
+        return self.type_names[self.types[slot]], self.values[slot]
+
+    def type_of(self, node) -> Optional[str]:
+        return self.get(node)[0]
+
+    def value_of(self, node) -> Any:
+        return self.get(node)[1]
+
+    def write_tree(self, root, out: TextIO, level: int = 0) -> None:
+        # Preorder over a stack of child iterators, so memory follows the
+        # depth of the tree and each line goes straight to `out`.
+        stack = [iter((root,))]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+            line = f"{'  ' * (level + len(stack) - 1)}{node.tipo}"
+            if node.valor:
+                line += f" ({node.valor})"
+            type_attr, value_attr = self.get(node)
+            if type_attr or value_attr is not None:
+                type_text = type_attr if type_attr else "-"
+                value_text = "-" if value_attr is None else repr(value_attr)
+                line += f" [tipo={type_text}, valor={value_text}]"
+            out.write(line + "\n")
+            if node.hijos:
+                stack.append(iter(node.hijos))
+
+    def format_tree(self, node, level: int = 0) -> str:
+        out = io.StringIO()
+        self.write_tree(node, out, level)
+        return out.getvalue()
+
+
+NO_AST_TEXT = "AST no disponible para analisis semantico."
+
+
+@dataclass(eq=False)
 class SemanticAnalysisResult:
-    annotated_tree: str
-    symbol_table_text: str
+    # The annotated tree and the symbol table are rendered on first read and
+    # kept; `write_*` streams them without holding the text. A result loaded
+    # from the cache arrives with both texts already rendered.
     errors: List[str]
     entries: List[SymbolTableEntry]
+    annotations: Optional[SemanticAnnotations] = field(default=None, repr=False)
+    root: Any = field(default=None, repr=False)
+    symbol_table: Optional[SymbolTable] = field(default=None, repr=False)
+    tree_text: Optional[str] = field(default=None, repr=False)
+    table_text: Optional[str] = field(default=None, repr=False)
+
+    def write_annotated_tree(self, out: TextIO) -> None:
+        if self.tree_text is not None:
+            out.write(self.tree_text)
+        elif self.root is None:
+            out.write(NO_AST_TEXT)
+        else:
+            self.annotations.write_tree(self.root, out)
+
+    def write_symbol_table(self, out: TextIO) -> None:
+        if self.table_text is not None:
+            out.write(self.table_text)
+        else:
+            (self.symbol_table or SymbolTable()).write(out)
+
+    @property
+    def annotated_tree(self) -> str:
+        if self.tree_text is None:
+            out = io.StringIO()
+            self.write_annotated_tree(out)
+            self.tree_text = out.getvalue()
+        return self.tree_text
+
+    @property
+    def symbol_table_text(self) -> str:
+        if self.table_text is None:
+            out = io.StringIO()
+            self.write_symbol_table(out)
+            self.table_text = out.getvalue()
+        return self.table_text
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SemanticAnalysisResult):
+            return NotImplemented
+        return (self.errors, self.entries, self.symbol_table_text, self.annotated_tree) == (
+            other.errors, other.entries, other.symbol_table_text, other.annotated_tree
+        )
 
 
-class SemanticAnalyzer:
+class SemanticAnalyzer(Visitor):
+    handler_tables = {"dispatch": "visit_", "evaluators": "_eval_"}
     expression_nodes = {
         "arit_op",
         "rel_op",
@@ -121,37 +283,27 @@ class SemanticAnalyzer:
     def __init__(self) -> None:
         self.symbol_table = SymbolTable()
         self.errors: List[str] = []
+        self.annotations = SemanticAnnotations()
 
     def analyze(self, ast_root) -> SemanticAnalysisResult:
         if ast_root is None:
             return SemanticAnalysisResult(
-                annotated_tree="AST no disponible para analisis semantico.",
-                symbol_table_text=self.symbol_table.format(),
                 errors=["No se recibio un AST valido."],
                 entries=list(self.symbol_table.entries),
+                annotations=self.annotations,
+                symbol_table=self.symbol_table,
             )
         self.visit(ast_root)
-        annotated = self.format_annotated_tree(ast_root)
-        table_text = self.symbol_table.format()
         return SemanticAnalysisResult(
-            annotated_tree=annotated,
-            symbol_table_text=table_text,
             errors=list(self.errors),
             entries=list(self.symbol_table.entries),
+            annotations=self.annotations,
+            root=ast_root,
+            symbol_table=self.symbol_table,
         )
 
-    def visit(self, node) -> None:
-        if node is None:
-            return
-        handler = getattr(self, f"visit_{node.tipo}", None)
-        if handler:
-            handler(node)
-            return
-        for child in node.hijos:
-            self.visit(child)
-
     def visit_programa(self, node) -> None:
-        node.tipo_semantico = "program"
+        self.annotations.set(node, "program")
         for child in node.hijos:
             self.visit(child)
 
@@ -173,25 +325,29 @@ class SemanticAnalyzer:
             return
         target_node = node.hijos[0]
         expr_node = node.hijos[1] if len(node.hijos) > 1 else None
+        entry = self._assignment_target(target_node)
+        self._assign(node, target_node, entry, *self.evaluate_expression(expr_node))
+
+    def _assignment_target(self, target_node) -> Optional[SymbolTableEntry]:
         entry = None
         if target_node.tipo in {"ID", "id"}:
             entry = self.symbol_table.lookup(target_node.valor)
             if not entry:
                 self.report_error(target_node, f"Variable '{target_node.valor}' no declarada antes de la asignacion.")
             else:
-                target_node.tipo_semantico = entry.type
-                target_node.valor_semantico = entry.value
-                self.symbol_table.record_occurrence(entry.name, getattr(target_node, 'linea', None))
-        expr_type, expr_value = self.evaluate_expression(expr_node)
+                self.annotations.set(target_node, entry.type, entry.value)
+                self.symbol_table.record(entry, getattr(target_node, 'linea', None))
+        return entry
+
+    def _assign(self, node, target_node, entry: Optional[SymbolTableEntry], expr_type: Optional[str], expr_value: Optional[Any]) -> None:
         if entry and expr_type:
             if self.is_assignment_compatible(entry.type, expr_type):
                 if expr_value is not None:
                     entry.value = expr_value
-                    target_node.valor_semantico = expr_value
+                    self.annotations.set_value(target_node, expr_value)
             else:
                 self.report_error(node, f"Tipos incompatibles en la asignacion a '{entry.name}': se esperaba {entry.type}, se obtuvo {expr_type}.")
-        node.tipo_semantico = entry.type if entry else None
-        node.valor_semantico = entry.value if entry else None
+        self.annotations.set(node, entry.type if entry else None, entry.value if entry else None)
 
     def visit_seleccion(self, node) -> None:
         expr_node = None
@@ -201,14 +357,12 @@ class SemanticAnalyzer:
                 blocks.append(child)
             elif child.tipo not in {"if", "then", "else", "end"} and expr_node is None:
                 expr_node = child
-        expr_type, _ = self.evaluate_expression(expr_node)
-        if expr_type and expr_type != "bool":
-            self.report_error(expr_node, f"La condicion del if debe ser bool, se obtuvo {expr_type}.")
+        self._check_condition(expr_node, "if", *self.evaluate_expression(expr_node))
         if blocks:
-            self.visit_block(blocks[0], "if_then")
+            self._visit_block(blocks[0], "if_then")
         if len(blocks) > 1:
-            self.visit_block(blocks[1], "if_else")
-        node.tipo_semantico = "void"
+            self._visit_block(blocks[1], "if_else")
+        self.annotations.set(node, "void")
 
     def visit_iteracion(self, node) -> None:
         expr_node = None
@@ -218,12 +372,10 @@ class SemanticAnalyzer:
                 body = child
             elif child.tipo not in {"while", "end"} and expr_node is None:
                 expr_node = child
-        expr_type, _ = self.evaluate_expression(expr_node)
-        if expr_type and expr_type != "bool":
-            self.report_error(expr_node, f"La condicion del while debe ser bool, se obtuvo {expr_type}.")
+        self._check_condition(expr_node, "while", *self.evaluate_expression(expr_node))
         if body:
-            self.visit_block(body, "while_body")
-        node.tipo_semantico = "void"
+            self._visit_block(body, "while_body")
+        self.annotations.set(node, "void")
 
     def visit_repeticion(self, node) -> None:
         body = None
@@ -234,11 +386,9 @@ class SemanticAnalyzer:
             elif child.tipo not in {"do", "until"}:
                 expr_node = child
         if body:
-            self.visit_block(body, "do_body")
-        expr_type, _ = self.evaluate_expression(expr_node)
-        if expr_type and expr_type != "bool":
-            self.report_error(expr_node, f"La condicion del until debe ser bool, se obtuvo {expr_type}.")
-        node.tipo_semantico = "void"
+            self._visit_block(body, "do_body")
+        self._check_condition(expr_node, "until", *self.evaluate_expression(expr_node))
+        self.annotations.set(node, "void")
 
     def visit_sent_in(self, node) -> None:
         for child in node.hijos:
@@ -247,21 +397,19 @@ class SemanticAnalyzer:
                 if not entry:
                     self.report_error(child, f"Variable '{child.valor}' no declarada para entrada.")
                 else:
-                    child.tipo_semantico = entry.type
-                    child.valor_semantico = entry.value
-                    self.symbol_table.record_occurrence(entry.name, getattr(child, 'linea', None))
-        node.tipo_semantico = "void"
+                    self.annotations.set(child, entry.type, entry.value)
+                    self.symbol_table.record(entry, getattr(child, 'linea', None))
+        self.annotations.set(node, "void")
 
     def visit_sent_out(self, node) -> None:
         for child in node.hijos:
             if child.tipo == "cadena":
-                child.tipo_semantico = "string"
-                child.valor_semantico = child.valor
+                self.annotations.set(child, "string", child.valor)
             elif child.tipo in {"id", "ID"}:
                 self.evaluate_expression(child)
             elif child.tipo in self.expression_nodes:
                 self.evaluate_expression(child)
-        node.tipo_semantico = "void"
+        self.annotations.set(node, "void")
 
     def visit_sent_expresion(self, node) -> None:
         expr_node = None
@@ -270,13 +418,17 @@ class SemanticAnalyzer:
                 expr_node = child
                 break
         self.evaluate_expression(expr_node)
-        node.tipo_semantico = "void"
+        self.annotations.set(node, "void")
 
     def visit_lista_sentencias(self, node) -> None:
         for child in node.hijos:
             self.visit(child)
 
-    def visit_block(self, node, hint: str) -> None:
+    def _check_condition(self, expr_node, keyword: str, expr_type: Optional[str], expr_value: Optional[Any]) -> None:
+        if expr_type and expr_type != "bool":
+            self.report_error(expr_node, f"La condicion del {keyword} debe ser bool, se obtuvo {expr_type}.")
+
+    def _visit_block(self, node, hint: str) -> None:
         scope_name = self.symbol_table.enter_scope(hint)
         try:
             for child in node.hijos:
@@ -285,13 +437,12 @@ class SemanticAnalyzer:
             self.symbol_table.exit_scope()
 
     def _handle_declaration(self, node, declared_type: str) -> None:
-        node.tipo_semantico = declared_type
+        self.annotations.set(node, declared_type)
         for child in node.hijos:
             if child.tipo == "ID":
                 try:
                     entry = self.symbol_table.declare(child.valor, declared_type, child.linea, child.columna)
-                    child.tipo_semantico = declared_type
-                    child.valor_semantico = None
+                    self.annotations.set(child, declared_type, None)
                 except ValueError as exc:
                     self.report_error(child, str(exc))
             else:
@@ -300,70 +451,65 @@ class SemanticAnalyzer:
     def evaluate_expression(self, node) -> Tuple[Optional[str], Optional[Any]]:
         if node is None:
             return None, None
-        tipo = node.tipo.lower()
-        if tipo == "num_entero":
-            value = self._to_int(node.valor)
-            node.tipo_semantico = "int"
-            node.valor_semantico = value
-            return "int", value
-        if tipo == "num_flotante":
-            value = self._to_float(node.valor)
-            node.tipo_semantico = "float"
-            node.valor_semantico = value
-            return "float", value
-        if tipo == "bool_val":
-            value = str(node.valor).lower() == "true"
-            node.tipo_semantico = "bool"
-            node.valor_semantico = value
-            return "bool", value
-        if tipo == "cadena":
-            node.tipo_semantico = "string"
-            node.valor_semantico = node.valor
-            return "string", node.valor
-        if node.tipo in {"id", "ID"}:
-            entry = self.symbol_table.lookup(node.valor)
-            if not entry:
-                self.report_error(node, f"Identificador '{node.valor}' no declarado.")
-                node.tipo_semantico = None
-                node.valor_semantico = None
-                return None, None
-            self.symbol_table.record_occurrence(entry.name, getattr(node, 'linea', None))
-            node.tipo_semantico = entry.type
-            node.valor_semantico = entry.value
-            return entry.type, entry.value
-        if "arit" in tipo:
-            return self._evaluate_arithmetic(node)
-        if "rel" in tipo:
-            return self._evaluate_relational(node)
-        if tipo == "op_logico" or tipo == "op_logico" or "op_logico" in tipo:
-            return self._evaluate_logical(node)
-        if tipo == "log_op" or "log_op" in tipo:
-            return self._evaluate_unary_logical(node)
+        evaluator = self.evaluators.get(node.tipo)
+        if evaluator is None:
+            return self._evaluate_children(node)
+        return evaluator(self, node)
+
+    def _eval_num_entero(self, node) -> Tuple[Optional[str], Optional[Any]]:
+        value = self._to_int(node.valor)
+        self.annotations.set(node, "int", value)
+        return "int", value
+
+    def _eval_num_flotante(self, node) -> Tuple[Optional[str], Optional[Any]]:
+        value = self._to_float(node.valor)
+        self.annotations.set(node, "float", value)
+        return "float", value
+
+    def _eval_bool_val(self, node) -> Tuple[Optional[str], Optional[Any]]:
+        value = str(node.valor).lower() == "true"
+        self.annotations.set(node, "bool", value)
+        return "bool", value
+
+    def _eval_cadena(self, node) -> Tuple[Optional[str], Optional[Any]]:
+        self.annotations.set(node, "string", node.valor)
+        return "string", node.valor
+
+    def _eval_id(self, node) -> Tuple[Optional[str], Optional[Any]]:
+        entry = self.symbol_table.lookup(node.valor)
+        if not entry:
+            self.report_error(node, f"Identificador '{node.valor}' no declarado.")
+            self.annotations.set(node, None, None)
+            return None, None
+        self.symbol_table.record(entry, getattr(node, 'linea', None))
+        self.annotations.set(node, entry.type, entry.value)
+        return entry.type, entry.value
+
+    def _evaluate_children(self, node) -> Tuple[Optional[str], Optional[Any]]:
+        # Nodes without an evaluator of their own (pot_op among them) take the
+        # type and value of their last child.
         last_type: Optional[str] = None
         last_value: Optional[Any] = None
         for child in node.hijos:
             last_type, last_value = self.evaluate_expression(child)
-        node.tipo_semantico = last_type
-        node.valor_semantico = last_value
+        self.annotations.set(node, last_type, last_value)
         return last_type, last_value
 
     def _evaluate_arithmetic(self, node) -> Tuple[Optional[str], Optional[Any]]:
         if len(node.hijos) < 2:
             child_type, child_value = self.evaluate_expression(node.hijos[0]) if node.hijos else (None, None)
-            node.tipo_semantico = child_type
-            node.valor_semantico = child_value
+            self.annotations.set(node, child_type, child_value)
             return child_type, child_value
-        left_type, left_value = self.evaluate_expression(node.hijos[0])
-        right_type, right_value = self.evaluate_expression(node.hijos[1])
+        return self._combine_arithmetic(node, *self.evaluate_expression(node.hijos[0]), *self.evaluate_expression(node.hijos[1]))
+
+    def _combine_arithmetic(self, node, left_type, left_value, right_type, right_value) -> Tuple[Optional[str], Optional[Any]]:
         if not self.is_numeric(left_type) or not self.is_numeric(right_type):
             self.report_error(node, f"Operador '{node.valor}' requiere operandos numericos.")
-            node.tipo_semantico = None
-            node.valor_semantico = None
+            self.annotations.set(node, None, None)
             return None, None
         if node.valor == "%" and (left_type != "int" or right_type != "int"):
             self.report_error(node, "El operador '%' solo acepta operandos int.")
-            node.tipo_semantico = None
-            node.valor_semantico = None
+            self.annotations.set(node, None, None)
             return None, None
         if node.valor == "/":
             if left_type == "int" and right_type == "int":
@@ -381,68 +527,71 @@ class SemanticAnalyzer:
                 value = None
         else:
             value = self.compute_arithmetic(node.valor, left_value, right_value)
-        node.tipo_semantico = result_type
-        node.valor_semantico = value
+        self.annotations.set(node, result_type, value)
         return result_type, value
 
     def _evaluate_relational(self, node) -> Tuple[Optional[str], Optional[Any]]:
         if len(node.hijos) < 2:
             return None, None
-        left_type, left_value = self.evaluate_expression(node.hijos[0])
-        right_type, right_value = self.evaluate_expression(node.hijos[1])
+        return self._combine_relational(node, *self.evaluate_expression(node.hijos[0]), *self.evaluate_expression(node.hijos[1]))
+
+    def _combine_relational(self, node, left_type, left_value, right_type, right_value) -> Tuple[Optional[str], Optional[Any]]:
         if node.valor in {"<", "<=", ">", ">="}:
             if not self.is_numeric(left_type) or not self.is_numeric(right_type):
                 self.report_error(node, f"Operador '{node.valor}' requiere operandos numericos.")
-                node.tipo_semantico = None
-                node.valor_semantico = None
+                self.annotations.set(node, None, None)
                 return None, None
         else:
             if left_type is None or right_type is None:
-                node.tipo_semantico = None
-                node.valor_semantico = None
+                self.annotations.set(node, None, None)
                 return None, None
             if left_type != right_type:
                 if self.is_numeric(left_type) and self.is_numeric(right_type):
                     pass
                 else:
                     self.report_error(node, "Comparacion entre tipos incompatibles.")
-                    node.tipo_semantico = None
-                    node.valor_semantico = None
+                    self.annotations.set(node, None, None)
                     return None, None
         value = self.compute_relational(node.valor, left_value, right_value)
-        node.tipo_semantico = "bool"
-        node.valor_semantico = value
+        self.annotations.set(node, "bool", value)
         return "bool", value
 
     def _evaluate_logical(self, node) -> Tuple[Optional[str], Optional[Any]]:
         if len(node.hijos) < 2:
             return None, None
-        left_type, left_value = self.evaluate_expression(node.hijos[0])
-        right_type, right_value = self.evaluate_expression(node.hijos[1])
+        return self._combine_logical(node, *self.evaluate_expression(node.hijos[0]), *self.evaluate_expression(node.hijos[1]))
+
+    def _combine_logical(self, node, left_type, left_value, right_type, right_value) -> Tuple[Optional[str], Optional[Any]]:
         if left_type != "bool" or right_type != "bool":
             self.report_error(node, f"Operador '{node.valor}' requiere operandos bool.")
-            node.tipo_semantico = None
-            node.valor_semantico = None
+            self.annotations.set(node, None, None)
             return None, None
         value = self.compute_logical(node.valor, left_value, right_value)
-        node.tipo_semantico = "bool"
-        node.valor_semantico = value
+        self.annotations.set(node, "bool", value)
         return "bool", value
 
     def _evaluate_unary_logical(self, node) -> Tuple[Optional[str], Optional[Any]]:
         if not node.hijos:
             return None, None
-        child_type, child_value = self.evaluate_expression(node.hijos[0])
+        return self._combine_unary_logical(node, *self.evaluate_expression(node.hijos[0]))
+
+    def _combine_unary_logical(self, node, child_type, child_value) -> Tuple[Optional[str], Optional[Any]]:
         if child_type != "bool":
             self.report_error(node, "El operador '!' requiere un operando bool.")
-            node.tipo_semantico = None
-            node.valor_semantico = None
+            self.annotations.set(node, None, None)
             return None, None
         value = None if child_value is None else not child_value
-        node.tipo_semantico = "bool"
-        node.valor_semantico = value
+        self.annotations.set(node, "bool", value)
         return "bool", value
 
+    # `x++` and `x--` are expanded by the parser into OP_ARITMETICO/NUM_ENTERO/ID nodes.
+    _eval_NUM_ENTERO = _eval_num_entero
+    _eval_ID = _eval_id
+    _eval_arit_op = _eval_OP_ARITMETICO = _evaluate_arithmetic
+    _eval_rel_op = _evaluate_relational
+    _eval_op_logico = _evaluate_logical
+    _eval_log_op = _evaluate_unary_logical
+
     def compute_arithmetic(self, op: str, left_value: Optional[Any], right_value: Optional[Any]) -> Optional[Any]:
         if left_value is None or right_value is None:
             return None
@@ -509,20 +658,7 @@ class SemanticAnalyzer:
             self.errors.append(message)
 
     def format_annotated_tree(self, node, level: int = 0) -> str:
-        indent = "  " * level
-        line = f"{indent}{node.tipo}"
-        if node.valor:
-            line += f" ({node.valor})"
-        type_attr = getattr(node, "tipo_semantico", None)
-        value_attr = getattr(node, "valor_semantico", None)
-        if type_attr or value_attr is not None:
-            type_text = type_attr if type_attr else "-"
-            value_text = "-" if value_attr is None else repr(value_attr)
-            line += f" [tipo={type_text}, valor={value_text}]"
-        line += "\n"
-        for child in node.hijos:
-            line += self.format_annotated_tree(child, level + 1)
-        return line
+        return self.annotations.format_tree(node, level)
 
     def _to_int(self, value: Any) -> Optional[int]:
         try:
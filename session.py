@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from intermediate import FusedResult, TACInstruction, analizar_y_generar
+from lexical import IncrementalLexer, TokenStream
+from semantic import SemanticAnalysisResult
+from syntactic import analizar_sintacticamente, reanalizar_sintacticamente
+
+
+class CompilationSession:
+    # Stage outputs for one document, memoised against `revision`. The lexer is
+    # the editor's IncrementalLexer, which is already up to date, so no stage
+    # re-lexes the text. The last parse survives invalidation so the next one
+    # can reuse unchanged statements.
+    def __init__(self, lexer: Optional[IncrementalLexer] = None) -> None:
+        self.lexer = lexer if lexer is not None else IncrementalLexer()
+        self.revision = 0
+        self._memo: Dict[str, Tuple[int, Any]] = {}
+        self._last_parse: Optional[tuple] = None
+
+    def invalidate(self) -> None:
+        self.revision += 1
+        self._memo.clear()
+
+    def set_text(self, text: str) -> None:
+        self.lexer.reiniciar(text)
+        self.invalidate()
+
+    def _stage(self, name: str, compute):
+        cached = self._memo.get(name)
+        if cached is not None and cached[0] == self.revision:
+            return cached[1]
+        value = compute()
+        self._memo[name] = (self.revision, value)
+        return value
+
+    def tokens(self) -> Tuple[TokenStream, List[Dict[str, Any]]]:
+        return self._stage("tokens", lambda: (self.lexer.flujo(), self.lexer.errores))
+
+    def parse(self) -> Tuple[Any, List[str]]:
+        return self._stage("parse", self._parse)
+
+    def _parse(self):
+        filtered = self.tokens()[0].filtrar(("COMENTARIO", "ERROR"))
+        if self._last_parse is None:
+            ast, errors = analizar_sintacticamente(filtered)
+        else:
+            ast, errors = reanalizar_sintacticamente(filtered, *self._last_parse)
+        self._last_parse = (filtered, ast, errors)
+        return ast, errors
+
+    def analyze(self) -> Optional[SemanticAnalysisResult]:
+        # None when lexical errors or a missing AST make the analysis meaningless.
+        return self._stage("analyze", self._analyze)
+
+    def _analyze(self):
+        compiled = self._compiled()
+        return None if compiled is None else compiled.semantic_result()
+
+    def _compiled(self) -> Optional[FusedResult]:
+        # Analysis and code generation share one walk; analyze() and tac() read
+        # their halves of it.
+        return self._stage("compile", self._compile)
+
+    def _compile(self):
+        if self.tokens()[1]:
+            return None
+        ast, _ = self.parse()
+        if not ast:
+            return None
+        # Annotations live in the result, so a tree reused from an earlier
+        # revision needs no cleaning first.
+        return analizar_y_generar(ast)
+
+    def tac(self) -> Optional[List[TACInstruction]]:
+        return self._stage("tac", self._tac)
+
+    def _tac(self):
+        if self.analyze() is None or self.parse()[1]:
+            return None
+        return self._compiled().instructions
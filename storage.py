@@ -0,0 +1,34 @@
+import hashlib
+import os
+import sys
+import tempfile
+from types import ModuleType
+
+
+def source_version(*modules: ModuleType) -> str:
+    # A digest of the interpreter version and the source of `modules`: editing
+    # any of them, or switching interpreters (marshal's format is version
+    # specific), changes it, so artifacts keyed on it are never reused stale.
+    digest = hashlib.sha256(sys.version.encode())
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    # Writes a temporary file next to `path` and renames it over `path`, so
+    # readers, including other processes, see the old file or the whole new
+    # one. On failure the temporary file is removed and the error propagates.
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
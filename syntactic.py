@@ -1,3 +1,104 @@
+import io
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from operator import sub
+
+from lexical import CODIGO_LEXEMA, CODIGO_TIPO, LEXEMAS_FIJOS, TIPOS_TOKEN, LazyTokenStream, TokenStream
+
+REGLAS = (
+    "programa", "lista_declaracion", "declaracion", "declaracion_variable", "sentencia",
+    "seleccion", "iteracion", "repeticion", "sent_in", "sent_out", "salida", "asignacion",
+    "sent_expresion", "expresion", "componente", "lista_sentencias"
+)
+
+# Códigos enteros de tipo de token y de lexema fijo con los que compara el parser.
+IDENTIFICADOR, RESERVADA, NUM_ENTERO, NUM_FLOTANTE, CADENA = (
+    CODIGO_TIPO[t] for t in ("IDENTIFICADOR", "RESERVADA", "NUM_ENTERO", "NUM_FLOTANTE", "CADENA"))
+OP_ARITMETICO, OP_RELACIONAL, OP_LOGICO, ASIGNACION, OP_ENTRADA_SALIDA, DELIMITADOR = (
+    CODIGO_TIPO[t] for t in ("OP_ARITMETICO", "OP_RELACIONAL", "OP_LOGICO", "ASIGNACION", "OP_ENTRADA_SALIDA", "DELIMITADOR"))
+
+(K_MAIN, K_IF, K_THEN, K_ELSE, K_END, K_WHILE, K_DO, K_UNTIL, K_CIN, K_COUT,
+ K_INT, K_FLOAT, K_BOOL, K_TRUE, K_FALSE) = (CODIGO_LEXEMA[p] for p in (
+    "main", "if", "then", "else", "end", "while", "do", "until", "cin", "cout",
+    "int", "float", "bool", "true", "false"))
+(K_LLAVE_ABRE, K_LLAVE_CIERRA, K_PAREN_ABRE, K_PAREN_CIERRA, K_COMA, K_PUNTO_COMA,
+ K_ENTRADA, K_SALIDA, K_NO, K_POTENCIA, K_INCREMENTO, K_DECREMENTO) = (CODIGO_LEXEMA[l] for l in (
+    "{", "}", "(", ")", ",", ";", ">>", "<<", "!", "^", "++", "--"))
+
+NUMEROS = frozenset((NUM_ENTERO, NUM_FLOTANTE))
+TIPOS_DECLARACION = frozenset((K_INT, K_FLOAT, K_BOOL))
+BOOLEANOS = frozenset((K_TRUE, K_FALSE))
+FIN_BLOQUE = frozenset((K_END, K_ELSE, K_UNTIL, K_LLAVE_CIERRA))
+SINCRONIZADORES = frozenset(CODIGO_LEXEMA[l] for l in (
+    ";", "}", "end", "while", "do", "if", "else", "cin", "cout", "then", "main", "int", "float", "bool", "until"))
+
+NIVEL_LOGICO, NIVEL_RELACIONAL, NIVEL_ADITIVO, NIVEL_MULTIPLICATIVO, NIVEL_POTENCIA = range(1, 6)
+
+NIVEL_TIPO = {OP_LOGICO: NIVEL_LOGICO, OP_RELACIONAL: NIVEL_RELACIONAL}
+NIVEL_ARITMETICO = {
+    CODIGO_LEXEMA["+"]: NIVEL_ADITIVO, CODIGO_LEXEMA["-"]: NIVEL_ADITIVO,
+    K_INCREMENTO: NIVEL_ADITIVO, K_DECREMENTO: NIVEL_ADITIVO,
+    CODIGO_LEXEMA["*"]: NIVEL_MULTIPLICATIVO, CODIGO_LEXEMA["/"]: NIVEL_MULTIPLICATIVO,
+    CODIGO_LEXEMA["%"]: NIVEL_MULTIPLICATIVO
+}
+
+def _nivel_binario(codigo, clave):
+    if clave == K_POTENCIA:
+        return NIVEL_POTENCIA
+    if codigo == OP_ARITMETICO:
+        return NIVEL_ARITMETICO.get(clave)
+    return NIVEL_TIPO.get(codigo)
+
+# nivel -> (tipo de token, tipo de nodo, gramática, qué se esperaba, clase de operador)
+OPERADORES_BINARIOS = {
+    NIVEL_LOGICO: (OP_LOGICO, "op_logico", "expresion", "una expresión", "lógico "),
+    NIVEL_RELACIONAL: (OP_RELACIONAL, "rel_op", "expresion_relacional", "una expresión", "relacional "),
+    NIVEL_ADITIVO: (OP_ARITMETICO, "arit_op", "expresion_simple", "un término", ""),
+    NIVEL_MULTIPLICATIVO: (OP_ARITMETICO, "arit_op", "termino", "un componente", ""),
+    NIVEL_POTENCIA: (OP_ARITMETICO, "pot_op", "factor", "un componente", ""),
+}
+
+class Trazador:
+    # Recibe un evento al entrar y al salir de cada regla de REGLAS. Sin trazador
+    # el parser no envuelve ningún método, así que no cuesta nada.
+    def entrar(self, regla, token):
+        pass
+
+    def salir(self, regla, token, nodo):
+        pass
+
+class TrazadorCircular(Trazador):
+    # Conserva sólo los últimos `capacidad` eventos para depurar sin inundar stdout.
+    def __init__(self, capacidad=1000):
+        self.eventos = deque(maxlen=capacidad)
+        self.profundidad = 0
+
+    def entrar(self, regla, token):
+        self.eventos.append(("entrar", regla, token, self.profundidad))
+        self.profundidad += 1
+
+    def salir(self, regla, token, nodo):
+        self.profundidad -= 1
+        self.eventos.append(("salir", regla, token, self.profundidad))
+
+    def __str__(self):
+        lineas = []
+        for evento, regla, token, profundidad in self.eventos:
+            accion = "Iniciando" if evento == "entrar" else "Fin de"
+            lineas.append(f"{'  ' * profundidad}{accion} {regla}, token actual: {token}")
+        return "\n".join(lineas)
+
+class TrazadorContador(Trazador):
+    def __init__(self):
+        self.conteo = Counter()
+
+    def entrar(self, regla, token):
+        self.conteo[regla] += 1
+
+    def reporte(self):
+        return "\n".join(f"{regla}\t{veces}" for regla, veces in self.conteo.most_common())
+
 class NodoAST:
     def __init__(self, tipo, valor=None, linea=None, columna=None, gramatica=None):
         self.tipo = tipo
@@ -11,64 +112,405 @@ class NodoAST:
         self.hijos.append(nodo)
 
     def __str__(self, nivel=0):
-        indent = "  " * nivel
-        resultado = f"{indent}{self.tipo}\n"
-        if self.valor:
-            resultado += f"{indent}  {self.tipo} ({self.valor})\n"
-        posicion = f" (línea: {self.linea}, columna: {self.columna})" if self.linea and self.columna else ""
-        grama = f" [{self.gramatica}]" if self.gramatica else ""
+        salida = io.StringIO()
+        escribir_arbol(self, salida, nivel)
+        return salida.getvalue()
+
+def escribir_arbol(nodo, salida, nivel=0):
+    # Preorden con una pila de iteradores de hijos: la memoria crece con la
+    # profundidad y no con el ancho, y cada línea va directo a `salida`.
+    pila = [iter((nodo,))]
+    while pila:
+        nodo = next(pila[-1], None)
+        if nodo is None:
+            pila.pop()
+            continue
+        indent = "  " * (nivel + len(pila) - 1)
+        tipo = nodo.tipo
+        salida.write(f"{indent}{tipo}\n")
+        valor = nodo.valor
+        if valor:
+            salida.write(f"{indent}  {tipo} ({valor})\n")
+        linea, columna, gramatica = nodo.linea, nodo.columna, nodo.gramatica
+        posicion = f" (línea: {linea}, columna: {columna})" if linea and columna else ""
+        grama = f" [{gramatica}]" if gramatica else ""
         if posicion or grama:
-            resultado += f"{indent}  {posicion}{grama}\n"
-        for hijo in self.hijos:
-            resultado += hijo.__str__(nivel + 1)
-        return resultado
+            salida.write(f"{indent}  {posicion}{grama}\n")
+        hijos = nodo.hijos
+        if hijos:
+            pila.append(iter(hijos))
+
+class ArenaAST:
+    # AST plano: cada nodo es un índice en columnas array. Los hijos de un nodo son
+    # el rango hijos[primeros[i]:primeros[i] + cantidades[i]]; tipo y gramática se
+    # guardan como códigos de `nombres` y el valor como índice en `constantes`.
+    def __init__(self):
+        self.nombres = [None]
+        self._codigo_nombre = {None: 0}
+        self.constantes = []
+        self._codigo_constante = {}
+        self.tipos = array("H")
+        self.gramaticas = array("H")
+        self.valores = array("i")
+        self.lineas = array("i")
+        self.columnas = array("i")
+        self.primeros = array("i")
+        self.cantidades = array("i")
+        self.hijos = array("i")
+        self.finales = array("i")
+        self.tipos_semanticos = []
+        self.valores_semanticos = []
+
+    def _nombre(self, nombre):
+        codigo = self._codigo_nombre.get(nombre)
+        if codigo is None:
+            codigo = self._codigo_nombre[nombre] = len(self.nombres)
+            self.nombres.append(nombre)
+        return codigo
+
+    def _constante(self, valor):
+        if valor is None:
+            return -1
+        codigo = self._codigo_constante.get(valor)
+        if codigo is None:
+            codigo = self._codigo_constante[valor] = len(self.constantes)
+            self.constantes.append(valor)
+        return codigo
+
+    @classmethod
+    def desde_nodo(cls, raiz, anotaciones=None):
+        # Numeración en preorden: el subárbol de i ocupa los índices [i, finales[i]).
+        # Con `anotaciones` (las SemanticAnnotations de un análisis) se copian
+        # también los tipos y valores semánticos de cada nodo.
+        arena = cls()
+        if raiz is None:
+            return arena
+        orden = []
+        pila = [raiz]
+        while pila:
+            nodo = pila.pop()
+            orden.append(nodo)
+            pila.extend(reversed(nodo.hijos))
+        indice = {id(nodo): i for i, nodo in enumerate(orden)}
+        for nodo in orden:
+            arena.tipos.append(arena._nombre(nodo.tipo))
+            arena.gramaticas.append(arena._nombre(nodo.gramatica))
+            arena.valores.append(arena._constante(nodo.valor))
+            arena.lineas.append(nodo.linea or 0)
+            arena.columnas.append(nodo.columna or 0)
+            arena.primeros.append(len(arena.hijos))
+            arena.cantidades.append(len(nodo.hijos))
+            arena.hijos.extend(indice[id(hijo)] for hijo in nodo.hijos)
+            tipo_semantico, valor_semantico = anotaciones.get(nodo) if anotaciones is not None else (None, None)
+            arena.tipos_semanticos.append(tipo_semantico)
+            arena.valores_semanticos.append(valor_semantico)
+        finales = array("i", range(1, len(orden) + 1))
+        for i in range(len(orden) - 1, -1, -1):
+            if arena.cantidades[i]:
+                finales[i] = finales[arena.hijos[arena.primeros[i] + arena.cantidades[i] - 1]]
+        arena.finales = finales
+        return arena
+
+    def __len__(self):
+        return len(self.tipos)
+
+    @property
+    def raiz(self):
+        return NodoArena(self, 0) if len(self.tipos) else None
+
+    def nodo(self, i):
+        return NodoArena(self, i)
+
+    def tipo(self, i):
+        return self.nombres[self.tipos[i]]
+
+    def hijos_de(self, i):
+        primero = self.primeros[i]
+        return self.hijos[primero:primero + self.cantidades[i]]
+
+    def recorrer(self, inicio=0):
+        # Recorrido en preorden del subárbol de `inicio`, sin crear handles.
+        if not len(self.tipos):
+            return range(0)
+        return range(inicio, self.finales[inicio])
+
+class NodoArena:
+    # Handle de un nodo de ArenaAST con la misma interfaz que NodoAST, para que el
+    # análisis semántico y la generación de código funcionen sobre cualquiera.
+    __slots__ = ("arena", "id")
+
+    def __init__(self, arena, id):
+        self.arena = arena
+        self.id = id
+
+    @property
+    def tipo(self):
+        return self.arena.nombres[self.arena.tipos[self.id]]
+
+    @property
+    def gramatica(self):
+        return self.arena.nombres[self.arena.gramaticas[self.id]]
+
+    @property
+    def valor(self):
+        codigo = self.arena.valores[self.id]
+        return None if codigo < 0 else self.arena.constantes[codigo]
+
+    @property
+    def linea(self):
+        return self.arena.lineas[self.id] or None
+
+    @property
+    def columna(self):
+        return self.arena.columnas[self.id] or None
+
+    @property
+    def hijos(self):
+        arena = self.arena
+        return [NodoArena(arena, h) for h in arena.hijos_de(self.id)]
+
+    @property
+    def tipo_semantico(self):
+        return self.arena.tipos_semanticos[self.id]
+
+    @tipo_semantico.setter
+    def tipo_semantico(self, valor):
+        self.arena.tipos_semanticos[self.id] = valor
+
+    @property
+    def valor_semantico(self):
+        return self.arena.valores_semanticos[self.id]
+
+    @valor_semantico.setter
+    def valor_semantico(self, valor):
+        self.arena.valores_semanticos[self.id] = valor
+
+    def __eq__(self, otro):
+        return isinstance(otro, NodoArena) and self.arena is otro.arena and self.id == otro.id
+
+    def __hash__(self):
+        return hash((id(self.arena), self.id))
+
+    __str__ = NodoAST.__str__
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, trazador=None):
+        # Una lista se convierte a TokenStream; cualquier otro iterable se consume
+        # token a token a través de un LazyTokenStream, que filtra comentarios y
+        # errores sobre la marcha.
+        if isinstance(tokens, (list, tuple)):
+            tokens = TokenStream.desde_diccionarios(tokens)
+        if isinstance(tokens, TokenStream):
+            self.tipos = tokens.tipos
+            self.claves = tokens.claves
+            self.total = len(tokens)
+        else:
+            if not isinstance(tokens, LazyTokenStream):
+                tokens = LazyTokenStream(tokens)
+            self.avanzar = self._avanzar_perezoso
         self.tokens = tokens
-        self.pos = 0
+        self.pos = -1
         self.errores = []
+        self.avanzar()
+        if trazador is not None:
+            for regla in REGLAS:
+                setattr(self, regla, self._trazar(regla, getattr(self, regla), trazador))
+        self.sentencias_reservadas = {
+            K_IF: self.seleccion, K_WHILE: self.iteracion, K_DO: self.repeticion,
+            K_CIN: self.sent_in, K_COUT: self.sent_out
+        }
+
+    def _trazar(self, regla, metodo, trazador):
+        def trazado(*args):
+            trazador.entrar(regla, self.actual)
+            nodo = metodo(*args)
+            trazador.salir(regla, self.actual, nodo)
+            return nodo
+        return trazado
 
     def token_actual(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        return self.actual
 
     def avanzar(self):
+        # Además del token se expone su tipo (`codigo`) y su lexema fijo (`clave`)
+        # como enteros; -1 y 0 cuando ya no quedan tokens.
+        pos = self.pos = self.pos + 1
+        if pos < self.total:
+            self.actual = self.tokens.token(pos)
+            self.codigo = self.tipos[pos]
+            self.clave = self.claves[pos]
+        else:
+            self.actual = None
+            self.codigo = -1
+            self.clave = 0
+
+    def _avanzar_perezoso(self):
         self.pos += 1
+        actual = self.actual = self.tokens.siguiente()
+        if actual is not None:
+            self.codigo = CODIGO_TIPO[actual.tipo]
+            self.clave = CODIGO_LEXEMA.get(actual.lexema, 0)
+        else:
+            self.codigo = -1
+            self.clave = 0
 
     def crear_nodo_token(self, token, tipo=None, gramatica=None):
-        return NodoAST(tipo or token["tipo"], token["lexema"], token["linea"], token["columna"], gramatica)
+        return NodoAST(tipo or token.tipo, token.lexema, token.linea, token.columna, gramatica)
 
-    def coincidir(self, tipo_esperado, lexema_esperado=None):
-        actual = self.token_actual()
-        if actual and actual["tipo"] == tipo_esperado and (lexema_esperado is None or actual["lexema"] == lexema_esperado):
+    def coincidir(self, codigo_esperado, clave_esperada=0):
+        actual = self.actual
+        if self.codigo == codigo_esperado and (not clave_esperada or self.clave == clave_esperada):
             self.avanzar()
             return actual
+        esperado = LEXEMAS_FIJOS[clave_esperada] if clave_esperada else TIPOS_TOKEN[codigo_esperado]
+        if actual:
+            mensaje = f"Se esperaba '{esperado}' pero se encontró '{actual.lexema}' ({actual.tipo}) en línea {actual.linea}, columna {actual.columna}"
+            self.errores.append(mensaje)
+            while self.actual and self.clave not in SINCRONIZADORES:
+                self.avanzar()
+            if self.actual:
+                self.avanzar()
         else:
-            if actual:
-                mensaje = f"Se esperaba '{lexema_esperado or tipo_esperado}' pero se encontró '{actual['lexema']}' ({actual['tipo']}) en línea {actual['linea']}, columna {actual['columna']}"
-                self.errores.append(mensaje)
-                sincronizadores = {";", "}", "end", "while", "do", "if", "else", "cin", "cout", "then", "main", "int", "float", "bool", "until"}
-                while actual and actual["lexema"] not in sincronizadores:
-                    self.avanzar()
-                    actual = self.token_actual()
-                if actual and actual["lexema"] in sincronizadores:
-                    self.avanzar()
-            else:
-                self.errores.append(f"Fin inesperado, se esperaba '{lexema_esperado or tipo_esperado}'")
-            return None
+            self.errores.append(f"Fin inesperado, se esperaba '{esperado}'")
+        return None
 
     def analizar(self):
         ast = self.programa()
         return ast, self.errores
 
+    def reanalizar(self, ast, tokens_previos, cambio):
+        # `cambio` = (indice, eliminados, insertados) sobre los tokens filtrados: los
+        # tokens previos [indice, indice + eliminados) pasaron a ser `insertados`
+        # tokens nuevos. Se re-parsea la lista más interna que contiene la edición
+        # y se empalma en `ast`; si el trozo no cierra limpio en el mismo token,
+        # se sube un nivel, y en la raíz se re-analiza todo.
+        indice, eliminados, insertados = cambio
+        delta = insertados - eliminados
+        ubicacion = self._ubicar(ast, indice, indice + eliminados)
+        while ubicacion is not None:
+            ruta, lista, i, j = ubicacion
+            # Tras la última sentencia la lista puede haber consumido tokens sueltos.
+            hijos = lista.hijos
+            desde = hijos[i - 1].token_fin if i else lista.token_inicio
+            hasta = lista.token_fin if j == len(hijos) else hijos[j].token_inicio
+            nuevos = self._reparsear(lista, desde, hasta + delta)
+            if nuevos is not None:
+                lista.hijos[i:j] = nuevos
+                self._ajustar(ast, tokens_previos, ruta, lista, i + len(nuevos), hasta, delta)
+                return ast, []
+            ubicacion = self._ampliar(ruta)
+        self.pos = -1
+        self.errores = []
+        self.avanzar()
+        return self.analizar()
+
+    def _ubicar(self, ast, a, b):
+        lista = next((h for h in ast.hijos if h.tipo == "lista_declaracion"), None)
+        if lista is None or not lista.token_inicio <= a <= b <= lista.token_fin:
+            return None
+        ruta = []
+        while True:
+            hijos = lista.hijos
+            i = 0
+            while i < len(hijos) and hijos[i].token_fin <= a:
+                i += 1
+            if a == b:
+                # Una inserción en el borde de una sentencia no la toca.
+                j = i + 1 if i < len(hijos) and hijos[i].token_inicio < a else i
+            else:
+                j = i
+                while j < len(hijos) and hijos[j].token_inicio < b:
+                    j += 1
+            if j == i + 1:
+                sentencia = hijos[i]
+                sublista = next((h for h in sentencia.hijos if h.tipo == "lista_sentencias"
+                                 and h.token_inicio <= a and b <= h.token_fin), None)
+                if sublista is not None:
+                    ruta.append((lista, i, sublista))
+                    lista = sublista
+                    continue
+            return self._extender(ruta, lista, i, j)
+
+    def _extender(self, ruta, lista, i, j):
+        # Sólo `do ... until expr` termina mirando el token siguiente, y sólo la
+        # condición de `while` mira el primer token de su cuerpo; en esos casos el
+        # trozo a re-parsear incluye a quien mira.
+        if i and lista.hijos[i - 1].tipo == "repeticion":
+            i -= 1
+        if i == 0 and ruta:
+            padre, k, _ = ruta[-1]
+            if padre.hijos[k].tipo == "iteracion":
+                return self._ampliar(ruta)
+        return ruta, lista, i, j
+
+    def _ampliar(self, ruta):
+        if not ruta:
+            return None
+        lista, k, _ = ruta.pop()
+        return self._extender(ruta, lista, k, k + 1)
+
+    def _reparsear(self, lista, desde, hasta):
+        self.pos = desde - 1
+        self.errores = []
+        self.avanzar()
+        if lista.tipo == "lista_declaracion":
+            elemento = self._elemento_declaracion
+        else:
+            elemento = self._elemento_sentencia
+        nuevos = []
+        while self.pos < hasta:
+            inicio = self.pos
+            hijo = elemento()
+            if not hijo or self.errores:
+                return None
+            hijo.token_inicio = inicio
+            hijo.token_fin = self.pos
+            nuevos.append(hijo)
+        return nuevos if self.pos == hasta else None
+
+    def _ajustar(self, ast, tokens_previos, ruta, lista, despues, hasta, delta):
+        # Lo que sigue al trozo re-parseado se reutiliza: sus rangos de tokens se
+        # corren `delta` y sus posiciones se corrigen con el primer token posterior.
+        sufijo = list(lista.hijos[despues:])
+        lista.token_fin += delta
+        anterior = lista
+        for padre, k, sublista in reversed(ruta):
+            sentencia = padre.hijos[k]
+            sentencia.token_fin += delta
+            padre.token_fin += delta
+            sufijo.extend(sentencia.hijos[sentencia.hijos.index(sublista) + 1:])
+            sufijo.extend(padre.hijos[k + 1:])
+            anterior = padre
+        sufijo.extend(ast.hijos[ast.hijos.index(anterior) + 1:])
+        if delta:
+            for nodo in sufijo:
+                _desplazar_rangos(nodo, delta)
+        if hasta >= len(tokens_previos):
+            return
+        viejo, nuevo = tokens_previos.token(hasta), self.tokens.token(hasta + delta)
+        dlinea, dcolumna = nuevo.linea - viejo.linea, nuevo.columna - viejo.columna
+        if not dlinea and not dcolumna:
+            return
+        for nodo in sufijo:
+            # Sin cambio de líneas sólo se tocan los nodos de la línea editada.
+            if not dlinea and self._primera_linea(nodo) > viejo.linea:
+                break
+            _desplazar_posiciones(nodo, viejo.linea, viejo.columna, dlinea, dcolumna)
+
+    def _primera_linea(self, nodo):
+        inicio, fin = getattr(nodo, "token_inicio", 0), getattr(nodo, "token_fin", 0)
+        if inicio < fin:
+            return self.tokens.token(inicio).linea
+        return nodo.linea or 0
+
     def programa(self):
         nodo = NodoAST("programa", gramatica="programa")
-        token_main = self.coincidir("RESERVADA", "main")
+        token_main = self.coincidir(RESERVADA, K_MAIN)
         if not token_main:
             return nodo
         nodo.agregar_hijo(self.crear_nodo_token(token_main, "main", "programa"))
 
-        token_llave_abrir = self.coincidir("DELIMITADOR", "{")
+        token_llave_abrir = self.coincidir(DELIMITADOR, K_LLAVE_ABRE)
         if not token_llave_abrir:
             return nodo
         nodo.agregar_hijo(self.crear_nodo_token(token_llave_abrir, "{", "programa"))
@@ -77,7 +519,7 @@ class Parser:
         if declaraciones:
             nodo.agregar_hijo(declaraciones)
 
-        token_llave_cerrar = self.coincidir("DELIMITADOR", "}")
+        token_llave_cerrar = self.coincidir(DELIMITADOR, K_LLAVE_CIERRA)
         if not token_llave_cerrar:
             return nodo
         nodo.agregar_hijo(self.crear_nodo_token(token_llave_cerrar, "}", "programa"))
@@ -85,101 +527,104 @@ class Parser:
 
     def lista_declaracion(self):
         nodo = NodoAST("lista_declaracion")
-        while True:
-            actual = self.token_actual()
-            if not actual or actual["lexema"] == "}":
-                break
+        self._llenar_lista(nodo, self._elemento_declaracion)
+        return nodo
 
-            if actual["tipo"] == "RESERVADA" and actual["lexema"] in ("int", "float", "bool"):
-                hijo = self.declaracion_variable()
-            else:
-                hijo = self.sentencia()
+    def _elemento_declaracion(self):
+        if not self.actual or self.clave == K_LLAVE_CIERRA:
+            return None
+        if self.codigo == RESERVADA and self.clave in TIPOS_DECLARACION:
+            return self.declaracion_variable()
+        return self.sentencia()
 
-            if hijo:
-                nodo.agregar_hijo(hijo)
-            else:
+    def _elemento_sentencia(self):
+        if not self.actual or self.clave in FIN_BLOQUE:
+            return None
+        return self.sentencia()
+
+    def _llenar_lista(self, nodo, elemento):
+        # Cada lista y cada sentencia guarda su rango de tokens [token_inicio,
+        # token_fin) para que reanalizar() pueda re-parsear sólo una parte.
+        nodo.token_inicio = self.pos
+        while True:
+            inicio = self.pos
+            hijo = elemento()
+            if not hijo:
                 break
-        return nodo
+            hijo.token_inicio = inicio
+            hijo.token_fin = self.pos
+            nodo.agregar_hijo(hijo)
+        nodo.token_fin = self.pos
 
     def declaracion(self):
-        actual = self.token_actual()
-        if actual is None:
+        if self.actual is None:
             return None
-        if actual["tipo"] == "RESERVADA" and actual["lexema"] in ("int", "float", "bool"):
+        if self.codigo == RESERVADA and self.clave in TIPOS_DECLARACION:
             return self.declaracion_variable()
-        elif actual["tipo"] in ("RESERVADA", "IDENTIFICADOR"):
+        elif self.codigo == RESERVADA or self.codigo == IDENTIFICADOR:
             return self.sentencia()
         return None
 
     def declaracion_variable(self):
-        tipo = self.coincidir("RESERVADA")
+        tipo = self.coincidir(RESERVADA)
         if not tipo:
             return None
         
-        nodo = NodoAST(tipo["lexema"], linea=tipo["linea"], columna=tipo["columna"]) 
+        nodo = NodoAST(tipo.lexema, linea=tipo.linea, columna=tipo.columna) 
 
-        id_token = self.coincidir("IDENTIFICADOR")
+        id_token = self.coincidir(IDENTIFICADOR)
         if id_token:
             nodo.agregar_hijo(self.crear_nodo_token(id_token, "ID"))
 
-        while self.token_actual() and self.token_actual()["lexema"] == ",":
-            self.coincidir("DELIMITADOR", ",")
-            siguiente_id = self.coincidir("IDENTIFICADOR")
+        while self.actual and self.clave == K_COMA:
+            self.coincidir(DELIMITADOR, K_COMA)
+            siguiente_id = self.coincidir(IDENTIFICADOR)
             if siguiente_id:
                 nodo.agregar_hijo(self.crear_nodo_token(siguiente_id, "ID"))
 
-        self.coincidir("DELIMITADOR", ";") 
+        self.coincidir(DELIMITADOR, K_PUNTO_COMA) 
         return nodo
 
     def sentencia(self):
-        actual = self.token_actual()
-        if not actual:
+        if not self.actual:
             return None
-        if actual["tipo"] == "IDENTIFICADOR":
+        if self.codigo == IDENTIFICADOR:
             return self.asignacion()
-        elif actual["tipo"] == "RESERVADA":
-            if actual["lexema"] == "if":
-                return self.seleccion()
-            elif actual["lexema"] == "while":
-                return self.iteracion()
-            elif actual["lexema"] == "do":
-                return self.repeticion()
-            elif actual["lexema"] == "cin":
-                return self.sent_in()
-            elif actual["lexema"] == "cout":
-                return self.sent_out()
+        elif self.codigo == RESERVADA:
+            regla = self.sentencias_reservadas.get(self.clave)
+            if regla:
+                return regla()
         return None
 
     def seleccion(self):
         nodo = NodoAST("seleccion", gramatica="seleccion")
-        si = self.coincidir("RESERVADA", "if")
+        si = self.coincidir(RESERVADA, K_IF)
         if si:
             nodo.agregar_hijo(self.crear_nodo_token(si, "if", "seleccion"))
         expr = self.expresion()
         if expr:
             nodo.agregar_hijo(expr)
-        entonces = self.coincidir("RESERVADA", "then")
+        entonces = self.coincidir(RESERVADA, K_THEN)
         if entonces:
             nodo.agregar_hijo(self.crear_nodo_token(entonces, "then", "seleccion"))
         cuerpo_then = self.lista_sentencias()
         if cuerpo_then:
             nodo.agregar_hijo(cuerpo_then)
-        actual = self.token_actual()
-        if actual and actual["lexema"] == "else":
-            sino = self.coincidir("RESERVADA", "else")
+        if self.actual and self.clave == K_ELSE:
+            sino = self.coincidir(RESERVADA, K_ELSE)
             if sino:
                 nodo.agregar_hijo(self.crear_nodo_token(sino, "else", "seleccion"))
                 cuerpo_else = self.lista_sentencias()
                 if cuerpo_else:
                     nodo.agregar_hijo(cuerpo_else)
-        fin = self.coincidir("RESERVADA", "end")
+        fin = self.coincidir(RESERVADA, K_END)
         if fin:
             nodo.agregar_hijo(self.crear_nodo_token(fin, "end", "seleccion"))
         return nodo
 
     def iteracion(self):
         nodo = NodoAST("iteracion", gramatica="iteracion")
-        mientras = self.coincidir("RESERVADA", "while")
+        mientras = self.coincidir(RESERVADA, K_WHILE)
         if mientras:
             nodo.agregar_hijo(self.crear_nodo_token(mientras, "while", "iteracion"))
         expr = self.expresion()
@@ -188,20 +633,20 @@ class Parser:
         cuerpo = self.lista_sentencias()
         if cuerpo:
             nodo.agregar_hijo(cuerpo)
-        fin = self.coincidir("RESERVADA", "end")
+        fin = self.coincidir(RESERVADA, K_END)
         if fin:
             nodo.agregar_hijo(self.crear_nodo_token(fin, "end", "iteracion"))
         return nodo
 
     def repeticion(self):
         nodo = NodoAST("repeticion", gramatica="repeticion")
-        hacer = self.coincidir("RESERVADA", "do")
+        hacer = self.coincidir(RESERVADA, K_DO)
         if hacer:
             nodo.agregar_hijo(self.crear_nodo_token(hacer, "do", "repeticion"))
         cuerpo = self.lista_sentencias()
         if cuerpo:
             nodo.agregar_hijo(cuerpo)
-        hasta = self.coincidir("RESERVADA", "until")
+        hasta = self.coincidir(RESERVADA, K_UNTIL)
         if hasta:
             nodo.agregar_hijo(self.crear_nodo_token(hasta, "until", "repeticion"))
         expr = self.expresion()
@@ -211,54 +656,50 @@ class Parser:
 
     def sent_in(self):
         nodo = NodoAST("sent_in", gramatica="sent_in")
-        cin = self.coincidir("RESERVADA", "cin")
+        cin = self.coincidir(RESERVADA, K_CIN)
         if cin:
             nodo.agregar_hijo(self.crear_nodo_token(cin, "cin", "sent_in"))
-        flecha = self.coincidir("OP_ENTRADA_SALIDA", ">>")
+        flecha = self.coincidir(OP_ENTRADA_SALIDA, K_ENTRADA)
         if flecha:
             nodo.agregar_hijo(self.crear_nodo_token(flecha, ">>", "sent_in"))
-        identificador = self.coincidir("IDENTIFICADOR")
+        identificador = self.coincidir(IDENTIFICADOR)
         if identificador:
             nodo.agregar_hijo(self.crear_nodo_token(identificador, "id", "sent_in"))
-        fin = self.coincidir("DELIMITADOR", ";")
+        fin = self.coincidir(DELIMITADOR, K_PUNTO_COMA)
         if fin:
             nodo.agregar_hijo(self.crear_nodo_token(fin, ";", "sent_in"))
         return nodo
 
     def sent_out(self):
         nodo = NodoAST("sent_out", gramatica="sent_out")
-        cout = self.coincidir("RESERVADA", "cout")
+        cout = self.coincidir(RESERVADA, K_COUT)
         if cout:
             nodo.agregar_hijo(self.crear_nodo_token(cout, "cout", "sent_out"))
-        actual = self.token_actual()
-        while actual and actual["lexema"] == "<<":
-            op = self.coincidir("OP_ENTRADA_SALIDA", "<<")
+        while self.actual and self.clave == K_SALIDA:
+            op = self.coincidir(OP_ENTRADA_SALIDA, K_SALIDA)
             nodo.agregar_hijo(self.crear_nodo_token(op, "<<", "salida"))
-            actual = self.token_actual()
-            if actual["tipo"] == "CADENA":
-                nodo.agregar_hijo(self.crear_nodo_token(actual, "cadena", "salida"))
+            if self.codigo == CADENA:
+                nodo.agregar_hijo(self.crear_nodo_token(self.actual, "cadena", "salida"))
                 self.avanzar()
             else:
                 expr = self.expresion()
                 if expr:
                     nodo.agregar_hijo(expr)
-            actual = self.token_actual()
-        fin = self.coincidir("DELIMITADOR", ";")
+        fin = self.coincidir(DELIMITADOR, K_PUNTO_COMA)
         if fin:
             nodo.agregar_hijo(self.crear_nodo_token(fin, ";", "sent_out"))
         return nodo
 
     def salida(self):
-        print("Iniciando salida, token actual:", self.token_actual())
         nodo = NodoAST("salida")
         actual = self.token_actual()
         if not actual:
             return nodo
 
         while actual:
-            if actual["tipo"] == "CADENA":
+            if self.codigo == CADENA:
                 self.avanzar()
-                nodo.agregar_hijo(NodoAST("cadena", actual["lexema"]))
+                nodo.agregar_hijo(NodoAST("cadena", actual.lexema))
             else:
                 expr = self.expresion()
                 if expr:
@@ -266,212 +707,134 @@ class Parser:
                 else:
                     break
 
-            actual = self.token_actual()
-            if actual and actual["lexema"] == "<<":
-                self.coincidir("OP_ENTRADA_SALIDA", "<<")
+            actual = self.actual
+            if actual and self.clave == K_SALIDA:
+                self.coincidir(OP_ENTRADA_SALIDA, K_SALIDA)
                 nodo.agregar_hijo(NodoAST("<<", "<<"))
-                actual = self.token_actual()
+                actual = self.actual
             else:
                 break
 
-        print("Fin de salida, token actual:", self.token_actual())
         return nodo
 
     def asignacion(self):
-        id_token = self.coincidir("IDENTIFICADOR")
+        id_token = self.coincidir(IDENTIFICADOR)
         if not id_token:
             return None
 
-        op_token = self.token_actual()
-        if not op_token or op_token["tipo"] != "ASIGNACION":
+        op_token = self.actual
+        if not op_token or self.codigo != ASIGNACION:
             return None
-
+        clave_op = self.clave
         self.avanzar()
 
-        nodo = NodoAST("ASIGNACION", op_token["lexema"], op_token["linea"], op_token["columna"])
+        nodo = NodoAST("ASIGNACION", op_token.lexema, op_token.linea, op_token.columna)
         nodo.agregar_hijo(self.crear_nodo_token(id_token, "ID"))
 
-        if op_token["lexema"] in ("++", "--"):
-            op_aritmetico = NodoAST("OP_ARITMETICO", "+" if op_token["lexema"] == "++" else "-", op_token["linea"], op_token["columna"])
+        if clave_op == K_INCREMENTO or clave_op == K_DECREMENTO:
+            op_aritmetico = NodoAST("OP_ARITMETICO", "+" if clave_op == K_INCREMENTO else "-", op_token.linea, op_token.columna)
             op_aritmetico.agregar_hijo(self.crear_nodo_token(id_token, "ID"))
-            op_aritmetico.agregar_hijo(NodoAST("NUM_ENTERO", "1", op_token["linea"], op_token["columna"]))
+            op_aritmetico.agregar_hijo(NodoAST("NUM_ENTERO", "1", op_token.linea, op_token.columna))
 
-            asignacion_nodo = NodoAST("ASIGNACION", "=", op_token["linea"], op_token["columna"])
+            asignacion_nodo = NodoAST("ASIGNACION", "=", op_token.linea, op_token.columna)
             asignacion_nodo.agregar_hijo(self.crear_nodo_token(id_token, "ID"))
             asignacion_nodo.agregar_hijo(op_aritmetico)
 
-            self.coincidir("DELIMITADOR", ";")
+            self.coincidir(DELIMITADOR, K_PUNTO_COMA)
             return asignacion_nodo
         else:
             expr = self.expresion()
             if expr:
                 nodo.agregar_hijo(expr)
-            self.coincidir("DELIMITADOR", ";")
+            self.coincidir(DELIMITADOR, K_PUNTO_COMA)
             return nodo
 
     def sent_expresion(self):
         nodo = NodoAST("sent_expresion")
-        if self.token_actual() and self.token_actual()["lexema"] == ";":
-            self.coincidir("DELIMITADOR", ";")
+        if self.actual and self.clave == K_PUNTO_COMA:
+            self.coincidir(DELIMITADOR, K_PUNTO_COMA)
             nodo.agregar_hijo(NodoAST(";", ";"))
         else:
             expr = self.expresion()
             if expr:
                 nodo.agregar_hijo(expr)
-            if not self.coincidir("DELIMITADOR", ";"):
+            if not self.coincidir(DELIMITADOR, K_PUNTO_COMA):
                 return nodo
             nodo.agregar_hijo(NodoAST(";", ";"))
         return nodo
 
-    def expresion(self):
-        print("Iniciando expresion, token actual:", self.token_actual())
-        nodo = self.expresion_relacional()
-        if not nodo:
-            return None
-        actual = self.token_actual()
-        while actual and actual["tipo"] == "OP_LOGICO":
-            op_token = self.coincidir("OP_LOGICO")
-            der = self.expresion_relacional()
-            if der:
-                op_nodo = self.crear_nodo_token(op_token, "op_logico", "expresion")
-                op_nodo.agregar_hijo(nodo)
-                op_nodo.agregar_hijo(der)
-                nodo = op_nodo
-            else:
-                self.errores.append(f"Se esperaba una expresión después del operador lógico '{op_token['lexema']}' en línea {op_token['linea']}, columna {op_token['columna']}")
-                break
-            actual = self.token_actual()
-        print("Fin de expresion, token actual:", self.token_actual())
-        return nodo
-
-    def expresion_relacional(self):
-        print("Iniciando expresion_relacional, token actual:", self.token_actual())
-        nodo = self.expresion_simple()
-        if not nodo:
-            return None
-        actual = self.token_actual()
-        if actual and actual["tipo"] == "OP_RELACIONAL":
-            op_token = self.coincidir("OP_RELACIONAL")
-            der = self.expresion_simple()
-            if der:
-                op_nodo = self.crear_nodo_token(op_token, "rel_op", "expresion_relacional")
-                op_nodo.agregar_hijo(nodo)
-                op_nodo.agregar_hijo(der)
-                return op_nodo
-            else:
-                self.errores.append(f"Se esperaba una expresión después del operador relacional '{op_token['lexema']}' en línea {op_token['linea']}, columna {op_token['columna']}")
-        print("Fin de expresion_relacional, token actual:", self.token_actual())
-        return nodo
-
-    def expresion_simple(self):
-        print("Iniciando expresion_simple, token actual:", self.token_actual())
-        nodo = self.termino()
-        if not nodo:
-            return None
-        actual = self.token_actual()
-        while actual and actual["tipo"] == "OP_ARITMETICO" and actual["lexema"] in ("+", "-", "++", "--"):
-            op = self.coincidir("OP_ARITMETICO")
-            der = self.termino()
-            if der:
-                op_nodo = self.crear_nodo_token(op, "arit_op", "expresion_simple")
-                op_nodo.agregar_hijo(nodo)
-                op_nodo.agregar_hijo(der)
-                nodo = op_nodo
-            else:
-                self.errores.append(f"Se esperaba un término después del operador '{op['lexema']}' en línea {op['linea']}, columna {op['columna']}")
-                break
-            actual = self.token_actual()
-        print("Fin de expresion_simple, token actual:", self.token_actual())
-        return nodo
-
-    def termino(self):
-        print("Iniciando termino, token actual:", self.token_actual())
-        nodo = self.factor()
-        if not nodo:
-            return None
-        actual = self.token_actual()
-        while actual and actual["tipo"] == "OP_ARITMETICO" and actual["lexema"] in ("*", "/", "%"):
-            op = self.coincidir("OP_ARITMETICO")
-            der = self.factor()
-            if der:
-                op_nodo = self.crear_nodo_token(op, "arit_op", "termino")
-                op_nodo.agregar_hijo(nodo)
-                op_nodo.agregar_hijo(der)
-                nodo = op_nodo
-            else:
-                self.errores.append(f"Se esperaba un componente después del operador '{op['lexema']}' en línea {op['linea']}, columna {op['columna']}")
-                break
-            actual = self.token_actual()
-        print("Fin de termino, token actual:", self.token_actual())
-        return nodo
-
-    def factor(self):
-        print("Iniciando factor, token actual:", self.token_actual())
+    def expresion(self, minimo=0):
         nodo = self.componente()
         if not nodo:
             return None
-        actual = self.token_actual()
-        while actual and actual["lexema"] == "^":
-            op = self.coincidir("OP_ARITMETICO")
+        return self._combinar(nodo, minimo)
+
+    def _combinar(self, nodo, minimo):
+        # Precedencia por escalada: sólo se combinan operadores con nivel mayor que
+        # `minimo`. Tras un operador relacional, o tras un operando faltante, sólo
+        # se aceptan niveles menores, igual que la antigua cadena de reglas.
+        limite = NIVEL_POTENCIA
+        nivel = _nivel_binario(self.codigo, self.clave)
+        while nivel is not None and minimo < nivel <= limite:
+            codigo_token, tipo_nodo, gramatica, esperado, clase = OPERADORES_BINARIOS[nivel]
+            op = self.actual
+            if self.codigo == codigo_token:
+                self.avanzar()
+            else:
+                op = self.coincidir(codigo_token)
             der = self.componente()
             if der:
-                op_nodo = self.crear_nodo_token(op, "pot_op", "factor")
-                op_nodo.agregar_hijo(nodo)
-                op_nodo.agregar_hijo(der)
+                siguiente = _nivel_binario(self.codigo, self.clave)
+                # Sólo hace falta recursión si el operando derecho liga más fuerte.
+                if siguiente is not None and siguiente > nivel:
+                    der = self._combinar(der, nivel)
+                op_nodo = NodoAST(tipo_nodo, op.lexema, op.linea, op.columna, gramatica)
+                op_nodo.hijos = [nodo, der]
                 nodo = op_nodo
+                limite = nivel - 1 if nivel == NIVEL_RELACIONAL else nivel
             else:
-                self.errores.append(f"Se esperaba un componente después del operador '^' en línea {op['linea']}, columna {op['columna']}")
-                break
-            actual = self.token_actual()
-        print("Fin de factor, token actual:", self.token_actual())
+                self.errores.append(f"Se esperaba {esperado} después del operador {clase}'{op.lexema}' en línea {op.linea}, columna {op.columna}")
+                limite = nivel - 1
+            nivel = _nivel_binario(self.codigo, self.clave)
         return nodo
 
     def componente(self):
-        print("Iniciando componente, token actual:", self.token_actual())
-        actual = self.token_actual()
+        actual = self.actual
         if not actual:
             return None
-        if actual["lexema"] == "(":
-            self.coincidir("DELIMITADOR", "(")
+        codigo = self.codigo
+        if self.clave == K_PAREN_ABRE:
+            self.coincidir(DELIMITADOR, K_PAREN_ABRE)
             nodo = self.expresion()
-            if not self.coincidir("DELIMITADOR", ")"):
-                self.errores.append(f"Se esperaba ')' pero se encontró '{self.token_actual()['lexema']}' en línea {self.token_actual()['linea']}, columna {self.token_actual()['columna']}")
+            if not self.coincidir(DELIMITADOR, K_PAREN_CIERRA):
+                self.errores.append(f"Se esperaba ')' pero se encontró '{self.token_actual().lexema}' en línea {self.token_actual().linea}, columna {self.token_actual().columna}")
             return nodo
-        elif actual["tipo"] in ("NUM_ENTERO", "NUM_FLOTANTE"):
-            nodo = self.crear_nodo_token(actual, actual["tipo"].lower(), "componente")
+        elif codigo in NUMEROS:
+            nodo = self.crear_nodo_token(actual, actual.tipo.lower(), "componente")
             self.avanzar()
             return nodo
-        elif actual["tipo"] == "IDENTIFICADOR":
+        elif codigo == IDENTIFICADOR:
             nodo = self.crear_nodo_token(actual, "id", "componente")
             self.avanzar()
             return nodo
-        elif actual["tipo"] == "RESERVADA" and actual["lexema"] in ("true", "false"):
+        elif codigo == RESERVADA and self.clave in BOOLEANOS:
             nodo = self.crear_nodo_token(actual, "bool_val", "componente")
             self.avanzar()
             return nodo
-        elif actual["tipo"] == "OP_LOGICO" and actual["lexema"] == "!":
-            op = self.coincidir("OP_LOGICO", "!")
+        elif codigo == OP_LOGICO and self.clave == K_NO:
+            op = self.coincidir(OP_LOGICO, K_NO)
             nodo = self.crear_nodo_token(op, "log_op", "componente")
             comp = self.componente()
             if comp:
                 nodo.agregar_hijo(comp)
             else:
-                self.errores.append(f"Se esperaba un componente después del operador lógico '!' en línea {op['linea']}, columna {op['columna']}")
+                self.errores.append(f"Se esperaba un componente después del operador lógico '!' en línea {op.linea}, columna {op.columna}")
             return nodo
-        print("Fin de componente, token actual:", self.token_actual())
         return None
 
     def lista_sentencias(self):
         nodo = NodoAST("lista_sentencias", gramatica="lista_sentencias")
-        while True:
-            actual = self.token_actual()
-            if not actual or actual["lexema"] in ("end", "else", "until", "}"):
-                break
-            sent = self.sentencia()
-            if sent:
-                nodo.agregar_hijo(sent)
-            else:
-                break
+        self._llenar_lista(nodo, self._elemento_sentencia)
         return nodo
 
 def generar_tabla_errores_sintacticos(errores):
@@ -479,7 +842,137 @@ def generar_tabla_errores_sintacticos(errores):
         return "Sin errores sintácticos encontrados."
     return "\n".join(errores)
 
-def analizar_sintacticamente(tokens):
-    parser = Parser(tokens)
+def analizar_sintacticamente(tokens, trazador=None):
+    parser = Parser(tokens, trazador)
     ast, errores = parser.analizar()
-    return ast, errores
\ No newline at end of file
+    return ast, errores
+
+def _desplazar_rangos(nodo, delta):
+    # Sólo listas y sentencias tienen rango; las expresiones no se recorren.
+    pila = [nodo]
+    while pila:
+        nodo = pila.pop()
+        atributos = nodo.__dict__
+        if "token_inicio" in atributos:
+            atributos["token_inicio"] += delta
+            atributos["token_fin"] += delta
+            pila.extend(nodo.hijos)
+
+def _desplazar_posiciones(nodo, linea, columna, dlinea, dcolumna):
+    pila = [nodo]
+    while pila:
+        nodo = pila.pop()
+        fila = nodo.linea
+        if fila is not None:
+            if fila > linea:
+                nodo.linea = fila + dlinea
+            elif fila == linea and nodo.columna >= columna:
+                nodo.columna += dcolumna
+                nodo.linea = fila + dlinea
+        pila.extend(nodo.hijos)
+
+def _prefijo_comun(a, b, limite):
+    i = 0
+    while i < limite:
+        paso = min(1024, limite - i)
+        if a[i:i + paso] != b[i:i + paso]:
+            while a[i] == b[i]:
+                i += 1
+            return i
+        i += paso
+    return limite
+
+def _sufijo_comun(a, b, limite):
+    n, m = len(a), len(b)
+    i = 0
+    while i < limite:
+        paso = min(1024, limite - i)
+        if a[n - i - paso:n - i] != b[m - i - paso:m - i]:
+            while a[n - i - 1] == b[m - i - 1]:
+                i += 1
+            return i
+        i += paso
+    return limite
+
+def _posiciones_comunes(previos, nuevos, limite):
+    # Cuántos de los primeros `limite` tokens conservan línea y columna. Con
+    # índice de líneas basta comparar offsets y los inicios de línea anteriores.
+    if previos.indice is not None and nuevos.indice is not None:
+        q = _prefijo_comun(previos.inicios, nuevos.inicios, limite)
+        if q:
+            lineas_previas, lineas_nuevas = previos.indice.inicios, nuevos.indice.inicios
+            k = bisect_right(lineas_nuevas, nuevos.inicios[q - 1])
+            d = _prefijo_comun(lineas_previas, lineas_nuevas, min(k, len(lineas_previas)))
+            if d < k:
+                corte = lineas_nuevas[d] if d == len(lineas_previas) else min(lineas_previas[d], lineas_nuevas[d])
+                q = bisect_left(nuevos.inicios, corte, 0, q)
+        return q
+    lineas = _prefijo_comun(previos.lineas, nuevos.lineas, limite)
+    return _prefijo_comun(previos.columnas, nuevos.columnas, lineas)
+
+def _desplazamiento_constante(nuevos, previos):
+    # ¿nuevos[i] - previos[i] es igual para todos? Se calcula en C con map().
+    if not nuevos:
+        return True
+    diferencias = array("q", map(sub, nuevos, previos))
+    return diferencias.count(diferencias[-1]) == len(diferencias)
+
+def _sufijo_desplazado(previos, nuevos, sufijo):
+    # El sufijo reutilizable debe estar desplazado en bloque: misma separación
+    # entre tokens y mismos saltos de línea entre ellos. Si no, se acorta.
+    if not sufijo:
+        return 0
+    n, m = len(previos), len(nuevos)
+    if previos.indice is not None and nuevos.indice is not None and previos.inicios[n - 1] >= 0:
+        if _desplazamiento_constante(nuevos.inicios[m - sufijo:], previos.inicios[n - sufijo:]):
+            lineas_previas, lineas_nuevas = previos.indice.inicios, nuevos.indice.inicios
+            cola_previa = lineas_previas[bisect_right(lineas_previas, previos.inicios[n - sufijo]):]
+            cola_nueva = lineas_nuevas[bisect_right(lineas_nuevas, nuevos.inicios[m - sufijo]):]
+            if (len(cola_previa) == len(cola_nueva)
+                    and _desplazamiento_constante(cola_nueva + nuevos.inicios[-1:], cola_previa + previos.inicios[-1:])):
+                return sufijo
+    elif previos.indice is None and nuevos.indice is None:
+        lineas_previas, lineas_nuevas = previos.lineas, nuevos.lineas
+        if _desplazamiento_constante(lineas_nuevas[m - sufijo:], lineas_previas[n - sufijo:]):
+            corte = bisect_right(lineas_previas, lineas_previas[n - sufijo], n - sufijo, n) - n
+            if (previos.columnas[n + corte:] == nuevos.columnas[m + corte:] and _desplazamiento_constante(
+                    nuevos.columnas[m - sufijo:m + corte], previos.columnas[n - sufijo:n + corte])):
+                return sufijo
+    # Camino lento: de atrás hacia adelante mientras cada par de tokens vecinos
+    # guarde la misma separación en ambos flujos.
+    siguiente_previo, siguiente_nuevo = previos.token(n - 1), nuevos.token(m - 1)
+    for k in range(2, sufijo + 1):
+        previo, nuevo = previos.token(n - k), nuevos.token(m - k)
+        salto = siguiente_previo.linea - previo.linea
+        if salto != siguiente_nuevo.linea - nuevo.linea:
+            return k - 1
+        if salto == 0 and siguiente_previo.columna - previo.columna != siguiente_nuevo.columna - nuevo.columna:
+            return k - 1
+        if salto and siguiente_previo.columna != siguiente_nuevo.columna:
+            return k - 1
+        siguiente_previo, siguiente_nuevo = previo, nuevo
+    return sufijo
+
+def diferencia_tokens(previos, nuevos):
+    # (indice, eliminados, insertados) mínimo entre dos flujos: el prefijo común
+    # debe coincidir también en posición y el sufijo estar desplazado en bloque.
+    limite = min(len(previos), len(nuevos))
+    prefijo = _prefijo_comun(previos.lexemas, nuevos.lexemas, limite)
+    prefijo = _prefijo_comun(previos.tipos, nuevos.tipos, prefijo)
+    prefijo = _posiciones_comunes(previos, nuevos, prefijo)
+    sufijo = _sufijo_comun(previos.lexemas, nuevos.lexemas, limite - prefijo)
+    sufijo = _sufijo_comun(previos.tipos, nuevos.tipos, sufijo)
+    sufijo = _sufijo_desplazado(previos, nuevos, sufijo)
+    return prefijo, len(previos) - prefijo - sufijo, len(nuevos) - prefijo - sufijo
+
+def reanalizar_sintacticamente(tokens, tokens_previos, ast_previo, errores_previos, cambio=None):
+    # Reutiliza (y modifica) `ast_previo`. Si el análisis anterior tuvo errores se
+    # parsea todo de nuevo: sus mensajes llevan posiciones que no se recalculan.
+    parser = Parser(tokens)
+    if ast_previo is None or errores_previos:
+        return parser.analizar()
+    if not isinstance(tokens_previos, TokenStream):
+        tokens_previos = TokenStream.desde_diccionarios(tokens_previos)
+    if cambio is None:
+        cambio = diferencia_tokens(tokens_previos, parser.tokens)
+    return parser.reanalizar(ast_previo, tokens_previos, cambio)
@@ -0,0 +1,38 @@
+from typing import Any, Callable, Dict
+
+
+def collect_handlers(cls: type, prefix: str) -> Dict[str, Callable]:
+    # Walks the MRO from the base down so a subclass handler replaces the
+    # inherited one for the same node kind.
+    table: Dict[str, Callable] = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if name.startswith(prefix) and callable(value):
+                table[name[len(prefix):]] = value
+    return table
+
+
+class Visitor:
+    # Maps each table attribute to the method prefix it collects. A method named
+    # `<prefix><kind>` handles nodes whose `tipo` is exactly `kind`. The tables
+    # are built once per class, so dispatching a node is a single dict lookup
+    # instead of formatting a name and probing the instance for it.
+    handler_tables: Dict[str, str] = {"dispatch": "visit_"}
+    dispatch: Dict[str, Callable] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        for attribute, prefix in cls.handler_tables.items():
+            setattr(cls, attribute, collect_handlers(cls, prefix))
+
+    def visit(self, node) -> Any:
+        if node is None:
+            return None
+        handler = self.dispatch.get(node.tipo)
+        if handler is None:
+            return self.generic_visit(node)
+        return handler(self, node)
+
+    def generic_visit(self, node) -> None:
+        for child in node.hijos:
+            self.visit(child)